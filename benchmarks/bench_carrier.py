@@ -0,0 +1,52 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from carrier import Carrier
+
+
+def time_per_call(func, repeat):
+    """返回 func 平均每次调用的耗时(秒)。"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_fleet(fleet_sizes, steps, seed=0):
+    """
+    对不同舰队规模测量 Carrier.move 每步耗时以及各干扰生成函数的耗时。
+    :return: 每个规模一条结果字典的列表
+    """
+    results = []
+    for n in fleet_sizes:
+        carrier = Carrier(n, carrier_speed=0.05, rng=np.random.default_rng(seed))
+        results.append({
+            "ships": n,
+            "move_us": time_per_call(carrier.move, steps) * 1e6,
+            "chaff_us": time_per_call(carrier.generate_chaff, max(1, steps // 10)) * 1e6,
+            "fixed_corner_us": time_per_call(carrier.generate_fixed_corner_reflectors, max(1, steps // 10)) * 1e6,
+            "moving_corner_us": time_per_call(carrier.generate_moving_corner_reflectors, max(1, steps // 10)) * 1e6,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carrier 每步耗时随舰队规模变化的基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000], help="舰队规模")
+    parser.add_argument("--steps", type=int, default=1000, help="每个规模测量的 move 步数")
+    args = parser.parse_args()
+
+    print(f"{'ships':>8} {'move(us)':>10} {'chaff(us)':>10} {'fixed(us)':>10} {'moving(us)':>10}")
+    for r in bench_fleet(args.sizes, args.steps):
+        print(f"{r['ships']:>8} {r['move_us']:>10.1f} {r['chaff_us']:>10.1f} "
+              f"{r['fixed_corner_us']:>10.1f} {r['moving_corner_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from decoys import DECOY_CHAFF, DECOY_MOVING_CORNER, DecoyManager
+
+
+def bench_decoys(decoy_counts, steps, num_ships=100, seed=0):
+    """
+    池中保持约 n 个在场干扰（一半跟随船），测量每步 tick + update_attached + 按类型取坐标的耗时。
+    :return: 结果字典列表
+    """
+    rng = np.random.default_rng(seed)
+    ship_positions = np.zeros((num_ships, 3))
+    ship_positions[:, :2] = rng.uniform(5, 35, (num_ships, 2))
+    results = []
+    for n in decoy_counts:
+        manager = DecoyManager()
+        batch = max(1, n // 50)
+        # 每步释放两批，寿命 50 步 => 稳态约 n 个干扰
+        start = None
+        for k in range(steps + 50):
+            if k == 50:
+                start = time.perf_counter()
+            manager.tick()
+            manager.deploy(DECOY_CHAFF, 50, positions=rng.uniform(0, 40, (batch // 2 + 1, 3)))
+            owners = rng.integers(0, num_ships, batch // 2 + 1)
+            manager.deploy(DECOY_MOVING_CORNER, 50, owners=owners, offsets=rng.uniform(-1, 1, (owners.size, 3)),
+                           ship_positions=ship_positions)
+            manager.update_attached(ship_positions)
+            manager.positions_of(DECOY_CHAFF)
+        results.append({"decoys": len(manager), "step_us": (time.perf_counter() - start) / steps * 1e6})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="干扰池每步耗时随干扰数量变化的基准测试")
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 10000, 100000], help="在场干扰数量")
+    parser.add_argument("--steps", type=int, default=200, help="每个规模测量的步数")
+    args = parser.parse_args()
+
+    print(f"{'decoys':>8} {'step(us)':>10}")
+    for r in bench_decoys(args.counts, args.steps):
+        print(f"{r['decoys']:>8} {r['step_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
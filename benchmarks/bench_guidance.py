@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from guidance import GUIDANCE_LAWS, MissileGuidance
+
+
+def bench_guidance(salvo_sizes, steps, num_ships=100, seed=0):
+    """
+    对不同齐射规模和制导律测量 MissileGuidance.step 每步耗时。
+    :return: 结果字典列表
+    """
+    rng = np.random.default_rng(seed)
+    ship_positions = np.zeros((num_ships, 3))
+    ship_positions[:, :2] = rng.uniform(5, 35, (num_ships, 2))
+    ship_velocities = np.zeros((num_ships, 3))
+    ship_velocities[:, :2] = rng.uniform(-0.01, 0.01, (num_ships, 2))
+
+    results = []
+    for law in GUIDANCE_LAWS:
+        for n in salvo_sizes:
+            positions = np.tile([0.0, 0.0, 15.0], (n, 1))
+            speeds = rng.uniform(0.02, 0.04, n)
+            guidance = MissileGuidance(n, law=law, assignments=rng.integers(0, num_ships, n))
+            start = time.perf_counter()
+            for _ in range(steps):
+                guidance.step(positions, speeds, ship_positions, ship_velocities)
+            results.append({"law": law, "missiles": n,
+                            "step_us": (time.perf_counter() - start) / steps * 1e6})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量化制导每步耗时随导弹数量变化的基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000], help="齐射导弹数量")
+    parser.add_argument("--steps", type=int, default=200, help="每个规模测量的步数")
+    args = parser.parse_args()
+
+    print(f"{'law':>25} {'missiles':>9} {'step(us)':>10}")
+    for r in bench_guidance(args.sizes, args.steps):
+        print(f"{r['law']:>25} {r['missiles']:>9} {r['step_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
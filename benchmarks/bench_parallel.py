@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation_core import SimulationCore
+
+
+def make_core(missiles, carriers, steps, target_selection, seed=0):
+    return SimulationCore(carrier_count=carriers, missile_count=missiles, carrier_speed=0.01, max_steps=steps,
+                          seed=seed, noise="keyed", target_selection=target_selection,
+                          chaff_appear_times=10 ** 6, corner_reflector_appear_times=10 ** 6,
+                          max_active_chaff=4, max_active_corner_reflectors=4)
+
+
+def bench_parallel(workers, missiles, carriers, steps, target_selection):
+    """
+    运行一次仿真；workers 为 0 时串行。
+    :return: (每秒步数, 测量数据列式数组)
+    """
+    core = make_core(missiles, carriers, steps, target_selection)
+    if workers:
+        core.enable_parallel(workers)
+    try:
+        core.step()  # 预热（工作进程启动、首次附加共享内存）
+        start = time.perf_counter()
+        core.run()
+        elapsed = time.perf_counter() - start
+    finally:
+        core.disable_parallel()
+    return (steps - 1) / elapsed, core.missile.measurement_data.to_arrays()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按导弹分片并行测量的加速比（相对串行）")
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="工作进程数列表，默认 1 2 4 ... 直到 CPU 核数")
+    parser.add_argument("--missiles", type=int, default=2000, help="导弹数量")
+    parser.add_argument("--carriers", type=int, default=200, help="船的数量")
+    parser.add_argument("--steps", type=int, default=30, help="仿真步数")
+    parser.add_argument("--target-selection", choices=["first", "nearest"], default="nearest",
+                        help="目标选取方式")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    workers = args.workers or sorted({1, *[2 ** i for i in range(1, cores.bit_length()) if 2 ** i <= cores], cores})
+    serial_rate, serial = bench_parallel(0, args.missiles, args.carriers, args.steps, args.target_selection)
+    print(f"{cores} CPU cores, {args.missiles} missiles, {args.carriers} ships, {args.target_selection}")
+    print(f"{'workers':>8} {'steps/s':>9} {'speedup':>8}  identical")
+    print(f"{'serial':>8} {serial_rate:>9.2f} {1.0:>8.2f}")
+    for n in workers:
+        rate, arrays = bench_parallel(n, args.missiles, args.carriers, args.steps, args.target_selection)
+        identical = all(np.array_equal(serial[k], arrays[k], equal_nan=True) for k in serial)
+        print(f"{n:>8} {rate:>9.2f} {rate / serial_rate:>8.2f}  {identical}")
+
+
+if __name__ == "__main__":
+    main()
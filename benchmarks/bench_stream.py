@@ -0,0 +1,82 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation_core import SimulationCore
+from stream_client import MeasurementStreamClient
+
+
+def consume(address, delay, results):
+    """本地回环消费者进程：读完全部帧后回报收到的帧数、字节数和跳号数。delay 模拟慢客户端。"""
+    client = MeasurementStreamClient(*address) if isinstance(address, tuple) else MeasurementStreamClient(unix_path=address)
+    start = time.perf_counter()
+    for _ in client:
+        if delay:
+            time.sleep(delay)
+    elapsed = time.perf_counter() - start
+    results.put({"frames": client.frames_received, "missed": client.frames_missed,
+                 "bytes": client.bytes_received, "seconds": elapsed})
+    client.close()
+
+
+def bench_stream(num_consumers, steps, missiles, carriers, policy="drop", slow_delay=0.0, unix_path=None, seed=0):
+    """
+    运行一次仿真，同时由 num_consumers 个本地进程订阅；其中第一个消费者每帧睡眠 slow_delay 秒。
+    :return: 结果字典
+    """
+    core = SimulationCore(carrier_count=carriers, missile_count=missiles, max_steps=steps, seed=seed,
+                          chaff_appear_times=10, corner_reflector_appear_times=10)
+    server = core.start_stream_server(unix_path=unix_path, policy=policy)
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    consumers = [ctx.Process(target=consume, args=(server.address, slow_delay if i == 0 else 0.0, results))
+                 for i in range(num_consumers)]
+    for p in consumers:
+        p.start()
+    while len(server.stats()) < num_consumers:
+        time.sleep(0.01)
+
+    start = time.perf_counter()
+    core.run()
+    sim_seconds = time.perf_counter() - start
+    server.stop(timeout=60.0)
+    received = [results.get() for _ in consumers]
+    for p in consumers:
+        p.join()
+
+    frame_bytes = sum(r["bytes"] for r in received) / max(sum(r["frames"] for r in received), 1)
+    return {
+        "consumers": num_consumers,
+        "steps_per_s": steps / sim_seconds,
+        "frame_kb": frame_bytes / 1024,
+        "mb_per_s": [r["bytes"] / max(r["seconds"], 1e-9) / 2 ** 20 for r in received],
+        "frames": [r["frames"] for r in received],
+        "dropped": sum(s["dropped"] for s in server.stats()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="实时推送服务吞吐量基准测试（本地回环消费者）")
+    parser.add_argument("--consumers", type=int, nargs="+", default=[0, 1, 4], help="订阅者数量")
+    parser.add_argument("--steps", type=int, default=2000, help="仿真步数")
+    parser.add_argument("--missiles", type=int, default=20, help="导弹数量")
+    parser.add_argument("--carriers", type=int, default=10, help="船的数量")
+    parser.add_argument("--policy", choices=["drop", "coalesce"], default="drop", help="背压策略")
+    parser.add_argument("--slow-delay", type=float, default=0.0, help="第一个订阅者每帧的额外处理时间(秒)")
+    parser.add_argument("--unix", default=None, help="使用该路径的 Unix socket 代替 TCP")
+    args = parser.parse_args()
+
+    print(f"{'consumers':>9} {'steps/s':>9} {'frame(KB)':>10} {'dropped':>8}  per-consumer MB/s / frames")
+    for n in args.consumers:
+        r = bench_stream(n, args.steps, args.missiles, args.carriers, args.policy, args.slow_delay, args.unix)
+        per = ", ".join(f"{mb:.1f}/{f}" for mb, f in zip(r["mb_per_s"], r["frames"]))
+        print(f"{r['consumers']:>9} {r['steps_per_s']:>9.1f} {r['frame_kb']:>10.1f} {r['dropped']:>8}  {per}")
+
+
+if __name__ == "__main__":
+    main()
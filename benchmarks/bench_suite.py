@@ -0,0 +1,401 @@
+"""
+仿真热点路径的基准测试套件（无界面，不依赖 Tk）。
+
+    python benchmarks/bench_suite.py                      # 运行全部基准，结果写入 benchmarks/results/
+    python benchmarks/bench_suite.py --quick --only measurements carrier
+    python benchmarks/bench_suite.py --compare results/old.json results/new.json
+
+每条结果包含基准名称、参数和指标：seconds（每次调用耗时的中位数）、steps_per_s / rows_per_s（吞吐量）、
+peak_kb（tracemalloc 统计的单次调用峰值内存）。同一基准按规模扫描得到的多条结果另外给出
+耗时随规模变化的对数斜率（scaling），1 表示线性增长。
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import measurement_io
+from carrier import Carrier
+from decoys import DECOY_MOVING_CORNER, DecoyManager
+from fusion import fuse_block
+from missile import Missile
+from simulation_core import SimulationCore
+
+
+def measure(func, repeat, setup=None):
+    """
+    测量 func 的耗时（多次调用取中位数，减少偶发抖动对比较的影响）和单次调用的峰值内存。
+    :param setup: 每次调用前执行（不计时），例如清空累积的数据
+    :return: dict(seconds, peak_kb)
+    """
+    if setup is not None:
+        setup()
+    func()  # 预热
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": float(np.median(times)), "peak_kb": peak / 1024}
+
+
+def record(benchmark, params, metrics):
+    return {"benchmark": benchmark, "params": params, "metrics": metrics}
+
+
+# ========== 各项基准 ==========
+
+def make_missile(num_missiles, num_sensors, seed=0):
+    """按传感器数量构造 Missile（NUM_SENSORS 为类属性，这里用子类覆盖）。"""
+    cls = Missile if num_sensors == Missile.NUM_SENSORS else type("Missile", (Missile,), {"NUM_SENSORS": num_sensors})
+    categories = np.linspace(0.2, 1.0, max(num_sensors, 5)).tolist()
+    positions = np.tile([0.0, 0.0, 15.0], (num_missiles, 1))
+    return cls(positions, sensor_categories=categories, rng=np.random.default_rng(seed))
+
+
+def make_scene(num_ships, with_decoys, seed=0):
+    """船随机分布；有干扰时每艘船旁边各放 1 个箔条和 1 个角反射器。"""
+    rng = np.random.default_rng(seed)
+    ships = np.zeros((num_ships, 3))
+    ships[:, :2] = rng.uniform(5, 35, (num_ships, 2))
+    if not with_decoys:
+        return ships, np.empty((0, 3)), np.empty((0, 3))
+    chaff = ships + np.c_[rng.uniform(-1, 1, (num_ships, 2)), np.zeros(num_ships)]
+    corners = ships + np.c_[rng.uniform(-1, 1, (num_ships, 2)), np.zeros(num_ships)]
+    return ships, chaff, corners
+
+
+def bench_measurements(quick):
+    """Missile.generate_sensor_measurements：扫描导弹数、传感器数、目标数，有/无干扰。"""
+    results = []
+    missile_counts = [1, 10, 100] if quick else [1, 10, 100, 1000]
+    for num_missiles in missile_counts:
+        for num_sensors in (5, 10):
+            for num_ships in (2, 20):
+                for with_decoys in (False, True):
+                    missile = make_missile(num_missiles, num_sensors)
+                    ships, chaff, corners = make_scene(num_ships, with_decoys)
+                    repeat = max(3, 2000 // num_missiles) if not quick else max(2, 200 // num_missiles)
+                    m = measure(lambda: missile.generate_sensor_measurements(ships, chaff, corners, 0),
+                                repeat, setup=missile.measurement_data.clear)
+                    m["steps_per_s"] = 1.0 / m["seconds"]
+                    m["rows_per_s"] = num_missiles * num_sensors / m["seconds"]
+                    m["targets"] = num_ships + len(chaff) + len(corners)
+                    results.append(record("measurements", {
+                        "missiles": num_missiles, "sensors": num_sensors, "ships": num_ships, "decoys": with_decoys,
+                    }, m))
+    return results
+
+
+def bench_carrier(quick):
+    """Carrier.move 以及三种干扰生成函数。"""
+    results = []
+    for num_ships in ([10, 1000, 100000] if quick else [10, 100, 1000, 10000, 100000]):
+        carrier = Carrier(num_ships, carrier_speed=0.05, rng=np.random.default_rng(0))
+        repeat = 50 if quick else 500
+        for name, func in [("move", carrier.move),
+                           ("generate_chaff", carrier.generate_chaff),
+                           ("generate_fixed_corner_reflectors", carrier.generate_fixed_corner_reflectors),
+                           ("generate_moving_corner_reflectors", carrier.generate_moving_corner_reflectors)]:
+            m = measure(func, repeat)
+            m["steps_per_s"] = 1.0 / m["seconds"]
+            results.append(record(f"carrier.{name}", {"ships": num_ships}, m))
+    return results
+
+
+def bench_moving_corners(quick):
+    """
+    跟随船移动的角反射器绝对坐标更新（原 _compute_moving_corner_abs_positions，
+    现为 DecoyManager.update_attached）。
+    """
+    results = []
+    rng = np.random.default_rng(0)
+    num_ships = 100
+    ships = np.zeros((num_ships, 3))
+    ships[:, :2] = rng.uniform(5, 35, (num_ships, 2))
+    for num_decoys in ([100, 10000] if quick else [100, 1000, 10000, 100000]):
+        manager = DecoyManager()
+        owners = rng.integers(0, num_ships, num_decoys)
+        manager.deploy(DECOY_MOVING_CORNER, 10 ** 9, owners=owners, offsets=rng.uniform(-1, 1, (num_decoys, 3)),
+                       ship_positions=ships)
+        m = measure(lambda: manager.update_attached(ships), 50 if quick else 500)
+        m["steps_per_s"] = 1.0 / m["seconds"]
+        results.append(record("decoys.update_attached", {"decoys": num_decoys}, m))
+    return results
+
+
+def filled_missile(num_rows, num_missiles=10, seed=0):
+    """生成约 num_rows 行测量数据的 Missile（每步 num_missiles × 5 行）。"""
+    missile = make_missile(num_missiles, Missile.NUM_SENSORS, seed)
+    ships, chaff, corners = make_scene(4, True, seed)
+    for t in range(max(1, num_rows // (num_missiles * Missile.NUM_SENSORS))):
+        missile.generate_sensor_measurements(ships, chaff, corners, t)
+    return missile
+
+
+def bench_csv(quick, workdir):
+    """export_to_csv 以及 simulation.py 的 CSV 读取路径（measurement_io.load_replay_csv）。"""
+    exports, loads = [], []
+    for num_rows in ([1000, 10000] if quick else [1000, 10000, 100000]):
+        missile = filled_missile(num_rows)
+        rows = len(missile.measurement_data)
+        measurement_file = os.path.join(workdir, f"measurement_{num_rows}.csv")
+        ship_file = os.path.join(workdir, f"ship_{num_rows}.csv")
+
+        def export():
+            with contextlib.redirect_stdout(io.StringIO()):
+                missile.export_to_csv(measurement_file, ship_file)
+
+        m = measure(export, 1 if quick else 3)
+        m["rows_per_s"] = rows / m["seconds"]
+        m["bytes"] = os.path.getsize(measurement_file)
+        exports.append(record("export_to_csv", {"rows": rows}, m))
+
+        m = measure(lambda: measurement_io.load_replay_csv(measurement_file), 1 if quick else 3)
+        m["rows_per_s"] = rows / m["seconds"]
+        loads.append(record("load_replay_csv", {"rows": rows}, m))
+    return exports + loads
+
+
+def bench_records(quick):
+    """宽表与稀疏长表的存储量和记录耗时：扫描探测概率（填充率）。"""
+    results = []
+    steps = 20 if quick else 200
+    ships, chaff, corners = make_scene(6, True)
+    for detection_prob in (0.1, 0.5, 0.9):
+        for record_format in Missile.RECORD_FORMATS:
+            missile = Missile(np.tile([0.0, 0.0, 15.0], (50, 1)), rng=np.random.default_rng(0),
+                              record_format=record_format)
+            missile.detection_prob = detection_prob
+
+            def run():
+                for t in range(steps):
+                    missile.generate_sensor_measurements(ships, chaff, corners, t)
+
+            m = measure(run, 1 if quick else 3, setup=missile.measurement_data.clear)
+            run()
+            table = missile.measurement_data
+            if record_format == "sparse":
+                m["stored_kb"] = table.nbytes / 1024
+                m["fill_rate"] = table.fill_rate()
+            else:
+                m["stored_kb"] = sum(a.nbytes for c in table.iter_chunks() for a in c.values()) / 1024
+            m["rows_per_s"] = len(table) / m["seconds"]
+            results.append(record("records", {"format": record_format, "detection_prob": detection_prob}, m))
+    return results
+
+
+def bench_schedule(quick):
+    """多速率传感器调度：所有传感器采样周期为 period 时 generate_sensor_measurements 的耗时。"""
+    results = []
+    ships, chaff, corners = make_scene(10, True)
+    num_missiles = 100 if quick else 1000
+    for period in (1, 2, 4, 8):
+        missile = Missile(np.tile([0.0, 0.0, 15.0], (num_missiles, 1)), rng=np.random.default_rng(0),
+                          sensor_periods=None if period == 1 else period,
+                          sensor_phases=None if period == 1 else list(range(Missile.NUM_SENSORS)))
+        step = iter(range(10 ** 9))
+        m = measure(lambda: missile.generate_sensor_measurements(ships, chaff, corners, next(step)),
+                    20 if quick else 100, setup=missile.measurement_data.clear)
+        m["steps_per_s"] = 1.0 / m["seconds"]
+        m["rows_per_s"] = num_missiles * Missile.NUM_SENSORS / period / m["seconds"]
+        results.append(record("schedule", {"missiles": num_missiles, "period": period}, m))
+    return results
+
+
+def bench_fusion(quick):
+    """多传感器融合：fuse_block 对一个时间步整块测量的耗时，以及融合后每步输出的行数。"""
+    results = []
+    ships, chaff, corners = make_scene(10, True)
+    for num_missiles in ([10, 100] if quick else [10, 100, 1000]):
+        missile = Missile(np.tile([0.0, 0.0, 15.0], (num_missiles, 1)), rng=np.random.default_rng(0))
+        block, valid, _ = missile.measure_step(ships, chaff, corners, 0.9, 0)
+        for method in ("information", "ci"):
+            m = measure(lambda: fuse_block(block, valid, method), 20 if quick else 100)
+            m["steps_per_s"] = 1.0 / m["seconds"]
+            m["rows_per_s"] = num_missiles / m["seconds"]
+            results.append(record("fusion", {"missiles": num_missiles, "method": method}, m))
+    return results
+
+
+def bench_step(quick):
+    """SimulationCore.step 的整体吞吐量。"""
+    results = []
+    for carriers, missiles in ([(2, 1), (20, 100)] if quick else [(2, 1), (10, 10), (20, 100), (50, 1000)]):
+        core = SimulationCore(carrier_count=carriers, missile_count=missiles, max_steps=None, seed=0,
+                              chaff_appear_times=10 ** 6, corner_reflector_appear_times=10 ** 6)
+        m = measure(core.step, 50 if quick else 300, setup=core.missile.measurement_data.clear)
+        m["steps_per_s"] = 1.0 / m["seconds"]
+        m["rows_per_s"] = missiles * Missile.NUM_SENSORS / m["seconds"]
+        results.append(record("simulation.step", {"carriers": carriers, "missiles": missiles}, m))
+    return results
+
+
+BENCHMARKS = {
+    "measurements": bench_measurements,
+    "carrier": bench_carrier,
+    "moving_corners": bench_moving_corners,
+    "csv": bench_csv,
+    "records": bench_records,
+    "schedule": bench_schedule,
+    "fusion": bench_fusion,
+    "step": bench_step,
+}
+
+
+# ========== 结果整理 ==========
+
+def scaling(results):
+    """
+    对每个基准中只有一个参数变化的结果组，拟合 log(seconds) 对 log(参数) 的斜率。
+    :return: list of dict(benchmark, param, fixed, slope)
+    """
+    curves = []
+    for benchmark in sorted({r["benchmark"] for r in results}):
+        group = [r for r in results if r["benchmark"] == benchmark]
+        for param in group[0]["params"]:
+            if not all(isinstance(r["params"][param], (int, float)) and not isinstance(r["params"][param], bool)
+                       for r in group):
+                continue
+            curves_by_fixed = {}
+            for r in group:
+                fixed = tuple((k, v) for k, v in r["params"].items() if k != param)
+                curves_by_fixed.setdefault(fixed, []).append((r["params"][param], r["metrics"]["seconds"]))
+            for fixed, points in curves_by_fixed.items():
+                if len({x for x, _ in points}) < 2:
+                    continue
+                x, y = np.log([p[0] for p in points]), np.log([p[1] for p in points])
+                curves.append({"benchmark": benchmark, "param": param, "fixed": dict(fixed),
+                               "slope": float(np.polyfit(x, y, 1)[0])})
+    return curves
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(BENCH_DIR),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results):
+    current = None
+    for r in results:
+        if r["benchmark"] != current:
+            current = r["benchmark"]
+            print(f"\n[{current}]")
+        params = " ".join(f"{k}={v}" for k, v in r["params"].items())
+        m = r["metrics"]
+        extra = "".join(f" {key}={m[key]:,.0f}" for key in ("steps_per_s", "rows_per_s", "stored_kb") if key in m)
+        print(f"  {params:<50} {m['seconds'] * 1e3:>10.3f} ms  peak={m['peak_kb']:>10.1f} KB{extra}")
+
+
+def key_of(r):
+    return r["benchmark"], json.dumps(r["params"], sort_keys=True)
+
+
+def compare(base_file, new_file, threshold):
+    """
+    对比两次结果，按 (基准, 参数) 匹配，打印耗时比值；慢于 threshold 的标记为回归。
+    :return: 回归的条目数
+    """
+    with open(base_file) as f:
+        base = {key_of(r): r for r in json.load(f)["results"]}
+    with open(new_file) as f:
+        new = json.load(f)
+    print(f"{'benchmark':<40} {'params':<50} {'base(ms)':>10} {'new(ms)':>10} {'ratio':>7}")
+    regressions = 0
+    for r in new["results"]:
+        old = base.get(key_of(r))
+        if old is None:
+            continue
+        ratio = r["metrics"]["seconds"] / old["metrics"]["seconds"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        params = " ".join(f"{k}={v}" for k, v in r["params"].items())
+        print(f"{r['benchmark']:<40} {params:<50} {old['metrics']['seconds'] * 1e3:>10.3f} "
+              f"{r['metrics']['seconds'] * 1e3:>10.3f} {ratio:>7.2f}{flag}")
+    print(f"\n{regressions} regression(s) above {threshold:.0%}.")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="仿真热点路径基准测试套件")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=None, help="只运行指定的基准")
+    parser.add_argument("--quick", action="store_true", help="缩小规模，快速检查")
+    parser.add_argument("--output", default=None,
+                        help="结果 JSON 文件，默认 benchmarks/results/<commit>-<时间>.json")
+    parser.add_argument("--compare", nargs="+", metavar="JSON",
+                        help="对比结果：BASE [NEW]；只给 BASE 时先运行一遍再与之对比")
+    parser.add_argument("--threshold", type=float, default=0.1, help="判定为回归的耗时增幅")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        sys.exit(1 if compare(args.compare[0], args.compare[1], args.threshold) else 0)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.only or list(BENCHMARKS):
+            func = BENCHMARKS[name]
+            results.extend(func(args.quick, workdir) if name == "csv" else func(args.quick))
+    print_results(results)
+
+    curves = scaling(results)
+    if curves:
+        print("\n[scaling] log-log slope of time vs. size")
+        for c in curves:
+            fixed = " ".join(f"{k}={v}" for k, v in c["fixed"].items())
+            print(f"  {c['benchmark']:<40} vs {c['param']:<10} {fixed:<40} {c['slope']:>6.2f}")
+
+    commit = git_commit()
+    output = args.output or os.path.join(
+        BENCH_DIR, "results", f"{commit}-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "meta": {
+                "commit": commit,
+                "date": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "processor": platform.processor(),
+                "quick": args.quick,
+            },
+            "results": results,
+            "scaling": curves,
+        }, f, indent=1)
+    print(f"\nResults written to {output}.")
+
+    if args.compare:
+        sys.exit(1 if compare(args.compare[0], output, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
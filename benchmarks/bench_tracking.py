@@ -0,0 +1,100 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation_core import SimulationCore
+from tracking import Tracker
+
+
+def synthetic_scene(num_targets, steps, seed=0, extent=None, sigma=0.05, decoy_fraction=0.5):
+    """
+    合成场景：num_targets 个匀速目标，其中 decoy_fraction 比例成簇分布在其他目标附近（模拟船旁的干扰），
+    每步一次扫描，测量为真实位置加高斯噪声（误差椭圆轴长 2σ）。
+    :return: 生成器，每步产出 (block, valid)，形状 (1, 1, num_targets, 8) / (1, 1, num_targets)
+    """
+    rng = np.random.default_rng(seed)
+    extent = extent or 10.0 * np.sqrt(num_targets)  # 目标密度不随数量变化
+    num_decoys = int(num_targets * decoy_fraction)
+    leaders = rng.uniform(0, extent, (num_targets - num_decoys, 2))
+    decoys = leaders[rng.integers(0, len(leaders), num_decoys)] + rng.normal(0, 0.5, (num_decoys, 2))
+    positions = np.concatenate([leaders, decoys])
+    velocities = rng.normal(0, 0.02, (num_targets, 2))
+    for _ in range(steps):
+        positions = positions + velocities
+        block = np.zeros((1, 1, num_targets, 8))
+        block[0, 0, :, :2] = positions + rng.normal(0, sigma, positions.shape)
+        block[0, 0, :, 3] = block[0, 0, :, 4] = 2 * sigma
+        block[0, 0, :, 6] = 0.5
+        block[0, 0, :, 7] = rng.uniform(0, 1, num_targets)
+        yield block, rng.random((1, 1, num_targets)) < 0.9
+
+
+def latency(step_fn, frames):
+    """逐帧调用 step_fn，返回每步耗时数组（秒）。"""
+    times = []
+    for t, frame in enumerate(frames):
+        start = time.perf_counter()
+        step_fn(t, *frame)
+        times.append(time.perf_counter() - start)
+    return np.array(times)
+
+
+def bench_synthetic(target_counts, steps):
+    """单组大量目标：每步关联耗时随目标（测量）数量的变化。"""
+    print(f"{'returns':>8} {'p50(ms)':>9} {'p95(ms)':>9} {'tracks':>7} {'candidates':>11}")
+    points = []
+    for n in target_counts:
+        tracker = Tracker(1, record=False)
+        times = latency(tracker.step, synthetic_scene(n, steps))
+        warm = times[steps // 5:]  # 跳过航迹起始阶段
+        points.append((n, np.median(warm)))
+        print(f"{n:>8} {np.median(warm) * 1e3:>9.3f} {np.percentile(warm, 95) * 1e3:>9.3f} "
+              f"{int(tracker.confirmed.sum()):>7} {tracker.last_stats['candidates']:>11}")
+    if len(points) > 1:
+        x, y = np.log([p[0] for p in points]), np.log([p[1] for p in points])
+        print(f"log-log slope of latency vs returns: {np.polyfit(x, y, 1)[0]:.2f} (1 = linear)")
+
+
+def bench_simulation(missiles, carriers, steps, fusion):
+    """完整仿真中 Tracker.on_frame 的每步耗时（5 个传感器依次扫描，或融合后单次扫描）。"""
+    core = SimulationCore(carrier_count=carriers, missile_count=missiles, max_steps=steps, seed=0,
+                          fusion="instead" if fusion else "off", max_active_chaff=4, max_active_corner_reflectors=4,
+                          chaff_appear_times=10 ** 6, corner_reflector_appear_times=10 ** 6)
+    tracker = Tracker(missiles, record=False)
+    times = []
+
+    def timed(c):
+        start = time.perf_counter()
+        tracker.on_frame(c)
+        times.append(time.perf_counter() - start)
+
+    core.add_frame_listener(timed)
+    core.run()
+    warm = np.array(times[steps // 5:])
+    returns = int(core.missile.last_valid.sum()) if not fusion else int(core.missile.last_fused_valid.sum())
+    print(f"simulation: {missiles} missiles, {carriers} ships, fusion={fusion}: "
+          f"p50 {np.median(warm) * 1e3:.3f} ms, p95 {np.percentile(warm, 95) * 1e3:.3f} ms per step, "
+          f"{returns} returns in last step, {int(tracker.confirmed.sum())} confirmed tracks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="量测-航迹关联的每步延迟")
+    parser.add_argument("--targets", type=int, nargs="+", default=[100, 300, 1000, 3000, 10000],
+                        help="合成场景的目标数列表")
+    parser.add_argument("--steps", type=int, default=50, help="每个规模的步数")
+    parser.add_argument("--missiles", type=int, default=100, help="完整仿真的导弹数量")
+    parser.add_argument("--carriers", type=int, default=10, help="完整仿真的船的数量")
+    args = parser.parse_args()
+
+    bench_synthetic(args.targets, args.steps)
+    for fusion in (False, True):
+        bench_simulation(args.missiles, args.carriers, args.steps, fusion)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,15 @@
 import numpy as np
-import random
 
 class Carrier:
-    def __init__(self, carrier_count, carrier_speed):
+    def __init__(self, carrier_count, carrier_speed, rng=None):
         """
         :param carrier_count: 船的数量
         :param carrier_speed: 船的移动速度（单位：在 x、y 平面上的移动速度）
+        :param rng: numpy.random.Generator，初始位置/方向和干扰生成都从它抽样；为 None 时新建一个
         """
         self.carrier_count = carrier_count
         self.carrier_speed = carrier_speed
+        self.rng = rng if rng is not None else np.random.default_rng()
 
         # 初始化每艘船在 x, y 平面的初始位置 (z=0)
         self.positions = self._initialize_positions()
@@ -20,41 +21,49 @@ class Carrier:
         """
         船初始位置的设定，这里假设随机分布在 [5, 35] 范围内。
         """
-        positions = []
-        for _ in range(self.carrier_count):
-            x = random.uniform(5, 35)
-            y = random.uniform(5, 35)
-            z = 0.0
-            positions.append([x, y, z])
-        return np.array(positions, dtype=np.float64)
+        positions = np.zeros((self.carrier_count, 3), dtype=np.float64)
+        positions[:, :2] = self.rng.uniform(5, 35, (self.carrier_count, 2))
+        return positions
 
     def _initialize_directions(self):
         """
         生成随机的移动方向（只在 x,y 平面），然后乘以速度。
         """
-        directions = []
-        for _ in range(self.carrier_count):
-            angle = random.uniform(0, 2 * np.pi)
-            dx = np.cos(angle)
-            dy = np.sin(angle)
-            # 归一化后乘以 speed
-            norm = np.sqrt(dx**2 + dy**2)
-            dx = (dx / norm) * self.carrier_speed
-            dy = (dy / norm) * self.carrier_speed
-            directions.append([dx, dy, 0.0])  # z方向为0
-        return np.array(directions, dtype=np.float64)
+        angle = self.rng.uniform(0, 2 * np.pi, self.carrier_count)
+        directions = np.zeros((self.carrier_count, 3), dtype=np.float64)
+        directions[:, 0] = np.cos(angle) * self.carrier_speed
+        directions[:, 1] = np.sin(angle) * self.carrier_speed
+        return directions
 
     def move(self):
         """
         每一步让船根据自己的方向移动。如果位置超出一定范围，就让它反弹。
+        :return: (carrier_count, 2) 布尔数组，表示本步在 x / y 方向发生反弹的船
         """
         self.positions += self.directions
 
-        # 如果超出 [0, 40] 区域，就让它反弹
-        for i in range(self.carrier_count):
-            for axis in range(2):  # 只检测 x,y
-                if self.positions[i, axis] < 0 or self.positions[i, axis] > 40:
-                    self.directions[i, axis] = -self.directions[i, axis]
+        # 如果超出 [0, 40] 区域，就让它反弹（只检测 x,y）
+        xy = self.positions[:, :2]
+        bounced = (xy < 0) | (xy > 40)
+        np.negative(self.directions[:, :2], out=self.directions[:, :2], where=bounced)
+        return bounced
+
+    def get_state(self):
+        """
+        导出可恢复的状态（位置、方向、随机数发生器），数组均为拷贝。
+        :return: dict
+        """
+        return {
+            "positions": self.positions.copy(),
+            "directions": self.directions.copy(),
+            "rng": self.rng.bit_generator.state,
+        }
+
+    def set_state(self, state):
+        """从 get_state() 的结果恢复；船的数量必须一致。"""
+        self.positions[...] = state["positions"]
+        self.directions[...] = state["directions"]
+        self.rng.bit_generator.state = state["rng"]
 
     def get_positions(self):
         """
@@ -62,40 +71,37 @@ class Carrier:
         """
         return self.positions
 
+    def _sample_decoy_offsets(self):
+        """
+        对每艘船批量抽取 1~3 个干扰点及其 [-1, 1] 内的 x/y 随机偏移。
+        :return: (owners, offsets)，owners 为 (N,) 所属船索引，offsets 为 (N, 2) 偏移
+        """
+        counts = self.rng.integers(1, 4, self.carrier_count)
+        owners = np.repeat(np.arange(self.carrier_count), counts)
+        offsets = self.rng.uniform(-1, 1, (owners.shape[0], 2))
+        return owners, offsets
+
+    def _decoys_at_ships(self):
+        """根据船的当前位置 + 随机偏移得到干扰点的绝对坐标 (N, 3)，z 固定为 0。"""
+        owners, offsets = self._sample_decoy_offsets()
+        positions = np.zeros((owners.shape[0], 3), dtype=np.float64)
+        positions[:, :2] = self.positions[owners, :2] + offsets
+        return positions
+
     def generate_chaff(self):
         """
         生成箔条干扰点（相对于每艘船做一定随机偏移）。
         这里演示：对每艘船生成 1~3 个箔条点。
         返回的为绝对坐标 (N, 3)。
         """
-        chaff_positions = []
-        for pos in self.positions:
-            for _ in range(random.randint(1, 3)):
-                offset_x = random.uniform(-1, 1)
-                offset_y = random.uniform(-1, 1)
-                chaff_positions.append([
-                    pos[0] + offset_x,
-                    pos[1] + offset_y,
-                    0.0
-                ])
-        return np.array(chaff_positions, dtype=np.float64)
+        return self._decoys_at_ships()
 
     def generate_fixed_corner_reflectors(self):
         """
         生成固定型角反射器（在出现那一刻，根据船的当前位置 + 随机偏移得到绝对坐标），
         之后不随船移动。返回 (N, 3)。
         """
-        fixed_positions = []
-        for pos in self.positions:
-            for _ in range(random.randint(1, 3)):
-                offset_x = random.uniform(-1, 1)
-                offset_y = random.uniform(-1, 1)
-                fixed_positions.append([
-                    pos[0] + offset_x,
-                    pos[1] + offset_y,
-                    0.0
-                ])
-        return np.array(fixed_positions, dtype=np.float64)
+        return self._decoys_at_ships()
 
     def generate_moving_corner_reflectors(self):
         """
@@ -104,12 +110,8 @@ class Carrier:
         表示这是第 ship_idx 条船、相对偏移 (offset_x, offset_y, 0)。
         后续主程序中，会通过船的当前位置 + offset 计算绝对位置，从而实现“跟随船移动”。
         """
-        moving_data = []
-        # 枚举每条船的索引和当前位置
-        for i, pos in enumerate(self.positions):
-            for _ in range(random.randint(1, 3)):
-                offset_x = random.uniform(-1, 1)
-                offset_y = random.uniform(-1, 1)
-                # 记录: 该反射器属于第 i 条船 + 相对偏移
-                moving_data.append([i, offset_x, offset_y, 0.0])
-        return np.array(moving_data, dtype=np.float64)
+        owners, offsets = self._sample_decoy_offsets()
+        moving_data = np.zeros((owners.shape[0], 4), dtype=np.float64)
+        moving_data[:, 0] = owners
+        moving_data[:, 1:3] = offsets
+        return moving_data
@@ -0,0 +1,162 @@
+"""
+仿真状态的检查点：把 SimulationCore.get_state() 的结果保存为 .npz 快照，并可从快照精确恢复运行。
+
+快照中每个 numpy 数组单独保存为一个条目（键为 "组件/字段"，例如 "carrier/positions"），
+其余标量、None 和随机数发生器状态（bit_generator.state 字典）以 JSON 形式保存在 "__meta__" 条目中。
+"""
+import json
+import os
+import queue
+import re
+import threading
+
+import numpy as np
+
+CHECKPOINT_FORMAT_VERSION = 1
+_META_KEY = "__meta__"
+_CHECKPOINT_PATTERN = re.compile(r"checkpoint_(\d+)\.npz$")
+
+
+def _flatten(state, prefix=""):
+    """把嵌套字典拆为 (数组条目, JSON 条目) 两个扁平字典。"""
+    arrays, meta = {}, {}
+    for key, value in state.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, np.ndarray):
+            arrays[name] = value
+        elif isinstance(value, dict) and key != "rng":
+            sub_arrays, sub_meta = _flatten(value, name + "/")
+            arrays.update(sub_arrays)
+            meta.update(sub_meta)
+        else:
+            meta[name] = value
+    return arrays, meta
+
+
+def _unflatten(entries):
+    state = {}
+    for name, value in entries.items():
+        node = state
+        *parents, leaf = name.split("/")
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = value
+    return state
+
+
+def save_checkpoint(filename, state, compressed=False):
+    """
+    保存快照。先写临时文件再改名，中途中断不会留下损坏的快照。
+    :param state: SimulationCore.get_state() 的结果
+    """
+    arrays, meta = _flatten(state)
+    meta["format_version"] = CHECKPOINT_FORMAT_VERSION
+    arrays[_META_KEY] = np.array(json.dumps(meta))
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        (np.savez_compressed if compressed else np.savez)(f, **arrays)
+    os.replace(tmp_filename, filename)
+
+
+def load_checkpoint(filename):
+    """
+    读取快照。
+    :return: 与 SimulationCore.get_state() 相同结构的字典
+    """
+    with np.load(filename, allow_pickle=False) as data:
+        meta = json.loads(str(data[_META_KEY]))
+        version = meta.pop("format_version", None)
+        if version != CHECKPOINT_FORMAT_VERSION:
+            raise ValueError(f"不支持的检查点格式版本{version}")
+        entries = {name: data[name] for name in data.files if name != _META_KEY}
+    entries.update(meta)
+    return _unflatten(entries)
+
+
+def checkpoint_filename(directory, time_step):
+    return os.path.join(directory, f"checkpoint_{time_step:09d}.npz")
+
+
+def list_checkpoints(directory):
+    """按时间步从早到晚返回目录中的快照路径。"""
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        match = _CHECKPOINT_PATTERN.match(name)
+        if match:
+            found.append((int(match.group(1)), os.path.join(directory, name)))
+    return [path for _, path in sorted(found)]
+
+
+def latest_checkpoint(directory):
+    """目录中最新的快照路径，没有时返回 None。"""
+    checkpoints = list_checkpoints(directory)
+    return checkpoints[-1] if checkpoints else None
+
+
+class CheckpointWriter:
+    """
+    每 every 步保存一次快照。仿真线程只做 get_state()（小数组拷贝），
+    序列化和写盘在后台线程中进行；后台还在写上一个快照时跳过本次，不让仿真等待。
+    """
+
+    def __init__(self, directory, every=1000, keep=3, compressed=False):
+        """
+        :param directory: 快照目录，不存在时创建
+        :param every: 每多少个时间步保存一次
+        :param keep: 保留最近的快照个数，None 表示全部保留
+        :param compressed: 是否压缩
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        self.compressed = compressed
+        self.saved = 0
+        self.skipped = 0
+
+        self._queue = queue.Queue(maxsize=1)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="CheckpointWriter", daemon=True)
+        self._thread.start()
+
+    def on_step(self, core):
+        """SimulationCore 每步结束后调用。"""
+        if core.time_step % self.every == 0:
+            self.submit(core.time_step, core.get_state())
+
+    def submit(self, time_step, state):
+        if self._error is not None:
+            raise self._error
+        try:
+            self._queue.put_nowait((time_step, state))
+        except queue.Full:
+            self.skipped += 1
+
+    def close(self):
+        """等待正在写的快照完成。"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                continue
+            try:
+                time_step, state = item
+                save_checkpoint(checkpoint_filename(self.directory, time_step), state, self.compressed)
+                self.saved += 1
+                if self.keep is not None:
+                    for path in list_checkpoints(self.directory)[:-self.keep]:
+                        os.remove(path)
+            except Exception as e:
+                self._error = e
@@ -0,0 +1,170 @@
+import numpy as np
+
+# 干扰类型编码
+DECOY_CHAFF = 0           # 箔条：绝对坐标，不随船移动
+DECOY_FIXED_CORNER = 1    # 固定角反射器：绝对坐标，不随船移动
+DECOY_MOVING_CORNER = 2   # 移动角反射器：跟随所属船移动，位置 = 船位置 + 偏移
+
+
+class DecoyManager:
+    """
+    干扰池：用预分配数组保存所有在场干扰点的位置、所属船、偏移、类型、剩余寿命和所属批次，
+    支持同一艘船多次、重叠地释放干扰。
+    - tick() 把剩余寿命减一，并用掩码一次性移除到期的干扰
+    - update_attached() 用一次 gather（positions[owner] + offset）更新所有跟随船的干扰
+    容量不足时按倍数扩容，单步代价只和数组运算有关，不随干扰数量增加 Python 循环。
+    """
+
+    def __init__(self, capacity=256):
+        """
+        :param capacity: 初始容量（干扰点数）
+        """
+        self.size = 0
+        self._next_deployment = 0
+        self._active_deployments = {}  # 在场批次 id -> 干扰类型
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self._positions = np.zeros((capacity, 3), dtype=np.float64)
+        self._owners = np.full(capacity, -1, dtype=np.int64)
+        self._offsets = np.zeros((capacity, 3), dtype=np.float64)
+        self._kinds = np.zeros(capacity, dtype=np.int8)
+        self._lifetimes = np.zeros(capacity, dtype=np.int32)
+        self._deployments = np.zeros(capacity, dtype=np.int64)
+
+    def _fields(self):
+        return ("_positions", "_owners", "_offsets", "_kinds", "_lifetimes", "_deployments")
+
+    def _reserve(self, extra):
+        """确保还能再放入 extra 个干扰点。"""
+        needed = self.size + extra
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, 2 * self.capacity)
+        old = {name: getattr(self, name)[:self.size] for name in self._fields()}
+        self._allocate(capacity)
+        for name, values in old.items():
+            getattr(self, name)[:self.size] = values
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def positions(self):
+        """(N, 3) 所有在场干扰的当前绝对坐标（视图）。"""
+        return self._positions[:self.size]
+
+    @property
+    def owners(self):
+        """(N,) 所属船索引，-1 表示不跟随船（视图）。"""
+        return self._owners[:self.size]
+
+    @property
+    def kinds(self):
+        """(N,) 干扰类型编码（视图）。"""
+        return self._kinds[:self.size]
+
+    @property
+    def lifetimes(self):
+        """(N,) 剩余寿命（时间步，视图）。"""
+        return self._lifetimes[:self.size]
+
+    def deploy(self, kind, lifetime, positions=None, owners=None, offsets=None, ship_positions=None):
+        """
+        释放一批干扰。
+        - 不跟随船的干扰（箔条、固定角反射器）传入 positions
+        - 跟随船的干扰（移动角反射器）传入 owners、offsets 以及当前船位置 ship_positions
+
+        :param kind: 干扰类型编码
+        :param lifetime: 寿命（时间步）
+        :return: 批次 id
+        """
+        if owners is not None:
+            owners = np.asarray(owners, dtype=np.int64)
+            offsets = np.asarray(offsets, dtype=np.float64).reshape(-1, 3)
+            positions = ship_positions[owners] + offsets
+        else:
+            positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+            owners = np.full(positions.shape[0], -1, dtype=np.int64)
+            offsets = np.zeros_like(positions)
+
+        n = positions.shape[0]
+        self._reserve(n)
+        s = slice(self.size, self.size + n)
+        self._positions[s] = positions
+        self._owners[s] = owners
+        self._offsets[s] = offsets
+        self._kinds[s] = kind
+        self._lifetimes[s] = lifetime
+        deployment = self._next_deployment
+        self._deployments[s] = deployment
+        self._next_deployment += 1
+        self._active_deployments[deployment] = kind
+        self.size += n
+        return deployment
+
+    def tick(self):
+        """
+        所有干扰寿命减一，移除到期（寿命 <= 0）的干扰。
+        :return: 本步移除的干扰点数
+        """
+        lifetimes = self.lifetimes
+        lifetimes -= 1
+        keep = lifetimes > 0
+        if keep.all():
+            return 0
+        for deployment in np.unique(self._deployments[:self.size][~keep]):
+            self._active_deployments.pop(int(deployment), None)
+        n_keep = int(keep.sum())
+        for name in self._fields():
+            array = getattr(self, name)
+            array[:n_keep] = array[:self.size][keep]
+        removed = self.size - n_keep
+        self.size = n_keep
+        return removed
+
+    def update_attached(self, ship_positions):
+        """用当前船位置更新所有跟随船的干扰坐标：positions[owner] + offset。"""
+        owners = self.owners
+        attached = owners >= 0
+        if attached.any():
+            self._positions[:self.size][attached] = ship_positions[owners[attached]] + self._offsets[:self.size][attached]
+
+    def positions_of(self, *kinds):
+        """返回指定类型干扰的坐标 (N, 3)，按池中顺序排列。"""
+        mask = np.isin(self.kinds, kinds)
+        return self.positions[mask]
+
+    def active_deployments(self, *kinds):
+        """在场的指定类型干扰批次数；不指定类型时统计全部。"""
+        if not kinds:
+            return len(self._active_deployments)
+        return sum(1 for k in self._active_deployments.values() if k in kinds)
+
+    def get_state(self):
+        """
+        导出可恢复的状态：在场干扰的各列（拷贝）、下一个批次 id 以及在场批次。
+        :return: dict
+        """
+        state = {name.lstrip("_"): getattr(self, name)[:self.size].copy() for name in self._fields()}
+        state["next_deployment"] = self._next_deployment
+        state["active_deployment_ids"] = np.array(list(self._active_deployments), dtype=np.int64)
+        state["active_deployment_kinds"] = np.array(list(self._active_deployments.values()), dtype=np.int8)
+        return state
+
+    def set_state(self, state):
+        """从 get_state() 的结果恢复。"""
+        size = len(state["positions"])
+        self.size = 0
+        self._reserve(size)
+        for name in self._fields():
+            getattr(self, name)[:size] = state[name.lstrip("_")]
+        self.size = size
+        self._next_deployment = int(state["next_deployment"])
+        self._active_deployments = {int(d): int(k) for d, k in zip(state["active_deployment_ids"],
+                                                                   state["active_deployment_kinds"])}
+
+    def clear(self):
+        self.size = 0
+        self._active_deployments = {}
@@ -0,0 +1,107 @@
+"""
+多传感器融合：把同一枚导弹 5 个传感器对同一目标（同一槽位）的测量合并为一个估计和误差椭圆。
+
+每个传感器测量的 xy 协方差由误差椭圆还原：C = R(θ) · diag((major/2)², (minor/2)²) · R(θ)ᵀ。
+- "information"：逆协方差加权（信息滤波形式），P = (Σ Cᵢ⁻¹)⁻¹，x = P · Σ Cᵢ⁻¹ xᵢ；
+  假设各传感器误差相互独立时为最优估计。
+- "ci"：协方差交叉（快速近似权重 ωᵢ ∝ 1/tr(Cᵢ)），P = (Σ ωᵢ Cᵢ⁻¹)⁻¹；
+  误差相关性未知时给出不乐观（保守）的椭圆。
+z 没有协方差输出，按 1/scatter² （角度误差的平方）加权平均；置信度取参与融合的传感器的平均值。
+
+全部计算对 (导弹, 传感器, 槽位) 张量向量化，输出字段与原始测量相同（8 个字段），
+写入测量表时 sensor_id 为 FUSED_SENSOR_ID。
+"""
+import numpy as np
+
+from missile import error_ellipse
+
+FUSION_METHODS = ("information", "ci")
+
+# 融合行在测量表中的 sensor_id（原始传感器编号为 0..NUM_SENSORS-1）
+FUSED_SENSOR_ID = -1
+
+# 误差椭圆退化（短轴为 0）时，短轴方差的下限相对长轴方差的比例
+_MIN_AXIS_RATIO = 1e-6
+_MIN_VARIANCE = 1e-12
+
+
+def ellipse_covariance(major_axis, minor_axis, angle_rad):
+    """
+    误差椭圆对应的 xy 协方差，C = R(θ) · diag((major/2)², (minor/2)²) · R(θ)ᵀ。
+    :return: (c_xx, c_xy, c_yy)，与输入同形状
+    """
+    var_major, var_minor = (0.5 * major_axis) ** 2, (0.5 * minor_axis) ** 2
+    c, s = np.cos(angle_rad), np.sin(angle_rad)
+    return (c * c * var_major + s * s * var_minor,
+            c * s * (var_major - var_minor),
+            s * s * var_major + c * c * var_minor)
+
+
+def ellipse_information(major_axis, minor_axis, angle_rad):
+    """
+    误差椭圆对应的 xy 信息矩阵（协方差的逆）。
+    :return: (y_xx, y_xy, y_yy)，与输入同形状
+    """
+    var_major = np.maximum((0.5 * major_axis) ** 2, _MIN_VARIANCE)
+    var_minor = np.maximum((0.5 * minor_axis) ** 2, _MIN_AXIS_RATIO * var_major)
+    c, s = np.cos(angle_rad), np.sin(angle_rad)
+    inv_major, inv_minor = 1.0 / var_major, 1.0 / var_minor
+    return (c * c * inv_major + s * s * inv_minor,
+            c * s * (inv_major - inv_minor),
+            s * s * inv_major + c * c * inv_minor)
+
+
+def fuse_block(block, valid, method="information"):
+    """
+    融合一个时间步的测量块。
+    :param block: (num_missiles, NUM_SENSORS, MAX_TARGETS, 8) 测量块，无效处为 NaN
+    :param valid: (num_missiles, NUM_SENSORS, MAX_TARGETS) 有效掩码
+    :param method: "information" 或 "ci"
+    :return: (fused, fused_valid)
+             fused 形状 (num_missiles, MAX_TARGETS, 8)，没有任何传感器探测到的槽位为 NaN；
+             fused_valid 形状 (num_missiles, MAX_TARGETS)
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"method必须是{FUSION_METHODS}之一")
+    fused_valid = valid.any(axis=1)
+    # 无效槽位的字段换成中性值，再用权重 0 排除，避免 NaN 传播
+    values = np.where(valid[..., None], block, 1.0)
+    x, y, z = values[..., 0], values[..., 1], values[..., 2]
+    major_axis, minor_axis, angle_rad = values[..., 3], values[..., 4], values[..., 5]
+    scatter, confidence = values[..., 6], values[..., 7]
+
+    y_xx, y_xy, y_yy = ellipse_information(major_axis, minor_axis, angle_rad)
+    weight = valid.astype(np.float64)
+    if method == "ci":
+        # 快速协方差交叉：ωᵢ = (1/tr Cᵢ) / Σⱼ (1/tr Cⱼ)，tr C = (major² + minor²) / 4
+        inv_trace = weight / np.maximum(0.25 * (major_axis ** 2 + minor_axis ** 2), _MIN_VARIANCE)
+        weight = inv_trace / np.maximum(inv_trace.sum(axis=1, keepdims=True), _MIN_VARIANCE)
+
+    # 信息矩阵与信息向量按传感器求和 => (M, T)
+    i_xx = (weight * y_xx).sum(axis=1)
+    i_xy = (weight * y_xy).sum(axis=1)
+    i_yy = (weight * y_yy).sum(axis=1)
+    v_x = (weight * (y_xx * x + y_xy * y)).sum(axis=1)
+    v_y = (weight * (y_xy * x + y_yy * y)).sum(axis=1)
+
+    # 2×2 求逆：P = [[i_yy, -i_xy], [-i_xy, i_xx]] / det
+    det = i_xx * i_yy - i_xy * i_xy
+    det = np.where(fused_valid, det, 1.0)
+    p_xx, p_xy, p_yy = i_yy / det, -i_xy / det, i_xx / det
+    fused_x = p_xx * v_x + p_xy * v_y
+    fused_y = p_xy * v_x + p_yy * v_y
+    fused_major, fused_minor, fused_angle = error_ellipse(p_xx, p_xy, p_yy)
+
+    # z 与 scatter：按 1/scatter² 加权（scatter 为传感器角度误差，距离相同时 z 方差与其平方成正比）
+    z_weight = weight / np.maximum(scatter * scatter, _MIN_VARIANCE)
+    z_total = np.where(fused_valid, z_weight.sum(axis=1), 1.0)
+    fused_z = (z_weight * z).sum(axis=1) / z_total
+    fused_scatter = np.sqrt(1.0 / z_total)
+
+    count = np.maximum(valid.sum(axis=1), 1)
+    fused_confidence = np.where(valid, confidence, 0.0).sum(axis=1) / count
+
+    fused = np.stack([fused_x, fused_y, fused_z, fused_major, fused_minor, fused_angle,
+                      fused_scatter, fused_confidence], axis=-1)
+    fused[~fused_valid] = np.nan
+    return fused, fused_valid
@@ -0,0 +1,132 @@
+import numpy as np
+
+
+def pure_pursuit(positions, velocities, speeds, target_positions, target_velocities, **kwargs):
+    """
+    纯追踪：每步直接朝目标当前位置飞行 speed 距离。
+    :return: (M, 3) 本步位移
+    """
+    direction = target_positions - positions
+    # 逐行内积用 matmul 计算，与逐枚导弹调用 np.linalg.norm 的结果逐位一致
+    norm = np.sqrt(direction[:, None, :] @ direction[:, :, None])[:, 0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        step = np.where(norm > 0, speeds[:, None] * direction / norm, 0.0)
+    return step
+
+
+def lead_pursuit(positions, velocities, speeds, target_positions, target_velocities, **kwargs):
+    """
+    前置追踪：假设目标匀速直线运动，求解拦截时间 t 使 |r + v_t·t| = speed·t，
+    然后朝预测拦截点飞行；无解时退化为按 t = |r| / speed 估计的前置点。
+    :return: (M, 3) 本步位移
+    """
+    r = target_positions - positions
+    a = np.einsum("ij,ij->i", target_velocities, target_velocities) - speeds ** 2
+    b = 2.0 * np.einsum("ij,ij->i", r, target_velocities)
+    c = np.einsum("ij,ij->i", r, r)
+    t_fallback = np.sqrt(c) / np.maximum(speeds, 1e-12)
+
+    disc = b * b - 4.0 * a * c
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sqrt_disc = np.sqrt(np.maximum(disc, 0.0))
+        roots = np.stack([(-b - sqrt_disc) / (2.0 * a), (-b + sqrt_disc) / (2.0 * a)])
+    roots = np.where((roots > 0) & (disc >= 0) & (np.abs(a) > 1e-12), roots, np.inf)
+    t_go = roots.min(axis=0)
+    t_go = np.where(np.isfinite(t_go), t_go, t_fallback)
+
+    aim_points = target_positions + target_velocities * t_go[:, None]
+    return pure_pursuit(positions, velocities, speeds, aim_points, target_velocities)
+
+
+def proportional_navigation(positions, velocities, speeds, target_positions, target_velocities,
+                            nav_constant=3.0, **kwargs):
+    """
+    比例导引：指令加速度 a = N · Ω × v_m，其中 Ω = (r × v_rel) / |r|² 为视线角速度。
+    加速度垂直于导弹速度，加上后再把速度大小归一化为 speed。
+    尚无速度（刚发射）或与目标距离小于一步时，退化为纯追踪。
+    :param nav_constant: 导航比 N
+    :return: (M, 3) 本步位移
+    """
+    pursuit = pure_pursuit(positions, velocities, speeds, target_positions, target_velocities)
+
+    r = target_positions - positions
+    r2 = np.einsum("ij,ij->i", r, r)
+    v_rel = target_velocities - velocities
+    with np.errstate(invalid="ignore", divide="ignore"):
+        omega = np.cross(r, v_rel) / r2[:, None]
+    accel = nav_constant * np.cross(omega, velocities)
+    new_velocities = velocities + accel
+    norm = np.sqrt(np.einsum("ij,ij->i", new_velocities, new_velocities))[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        step = speeds[:, None] * new_velocities / norm
+
+    has_velocity = np.einsum("ij,ij->i", velocities, velocities) > 0
+    use_pn = has_velocity & (r2 > speeds ** 2) & np.isfinite(step).all(axis=1)
+    return np.where(use_pn[:, None], step, pursuit)
+
+
+# 制导律注册表：名称 -> 函数(positions, velocities, speeds, target_positions, target_velocities, **params)
+GUIDANCE_LAWS = {
+    "pure_pursuit": pure_pursuit,
+    "proportional_navigation": proportional_navigation,
+    "lead_pursuit": lead_pursuit,
+}
+
+
+def register_guidance_law(name, func):
+    """注册自定义制导律，func 的签名与 GUIDANCE_LAWS 中的函数相同，返回 (M, 3) 本步位移。"""
+    GUIDANCE_LAWS[name] = func
+
+
+class MissileGuidance:
+    """
+    对所有导弹做一次数组运算的制导模块。
+    每枚导弹有自己的目标分配（assignments[i] 为所追踪船的索引），制导律可从 GUIDANCE_LAWS 中选择。
+    """
+
+    def __init__(self, num_missiles, law="pure_pursuit", assignments=None, **law_params):
+        """
+        :param num_missiles: 导弹数量
+        :param law: 制导律名称，见 GUIDANCE_LAWS
+        :param assignments: (num_missiles,) 目标船索引；None 时第 i 枚导弹追踪第 i % 船数 艘船
+        :param law_params: 传给制导律的参数，例如比例导引的 nav_constant
+        """
+        if law not in GUIDANCE_LAWS:
+            raise ValueError(f"law必须是{tuple(GUIDANCE_LAWS)}之一")
+        self.num_missiles = num_missiles
+        self.law = law
+        self.law_params = law_params
+        self.assignments = None if assignments is None else np.asarray(assignments, dtype=np.intp)
+        # 每枚导弹上一步的位移，作为比例导引的导弹速度
+        self.velocities = np.zeros((num_missiles, 3), dtype=np.float64)
+
+    def get_state(self):
+        """导出可恢复的状态（上一步的位移）。"""
+        return {"velocities": self.velocities.copy()}
+
+    def set_state(self, state):
+        self.velocities = np.array(state["velocities"], dtype=np.float64)
+
+    def step(self, positions, speeds, target_positions, target_velocities):
+        """
+        推进一步：就地更新 positions。
+        :param positions: (M, 3) 导弹位置，就地修改
+        :param speeds: 标量或 (M,) 每枚导弹每步的飞行距离
+        :param target_positions: (C, 3) 所有船的位置
+        :param target_velocities: (C, 3) 所有船每步的位移
+        :return: (M, 3) 本步位移
+        """
+        num_targets = target_positions.shape[0]
+        if self.num_missiles == 0 or num_targets == 0:
+            return np.zeros_like(positions)
+        assignments = self.assignments
+        if assignments is None:
+            assignments = np.arange(self.num_missiles) % num_targets
+
+        speeds = np.broadcast_to(np.asarray(speeds, dtype=np.float64), (self.num_missiles,))
+        step = GUIDANCE_LAWS[self.law](positions, self.velocities, speeds,
+                                       target_positions[assignments], target_velocities[assignments],
+                                       **self.law_params)
+        positions += step
+        self.velocities = step
+        return step
@@ -0,0 +1,268 @@
+"""
+仿真步骤的轻量级插桩：分阶段高精度计时、计数器、可插拔输出端（日志 / CSV / 回调，例如 GUI 统计面板），
+以及每 N 步用 cProfile 采样一步。
+
+未启用时 SimulationCore 使用 NULL_INSTRUMENTATION：phase() 返回同一个空的上下文管理器，
+count() 等直接返回，每步额外开销只有几次空函数调用。
+"""
+import cProfile
+import csv
+import io
+import logging
+import pstats
+import threading
+import time
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class NullInstrumentation:
+    """未启用插桩时使用的空实现，接口与 Instrumentation 相同。"""
+    enabled = False
+
+    def phase(self, name):
+        return _NULL_PHASE
+
+    def count(self, name, n=1):
+        pass
+
+    def gauge(self, name, value):
+        pass
+
+    def begin_step(self, time_step):
+        pass
+
+    def end_step(self, time_step):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+class _Phase:
+    """一次计时：退出时把耗时累加到所属 Instrumentation。"""
+    __slots__ = ("owner", "name", "start")
+
+    def __init__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.owner._add_time(self.name, time.perf_counter_ns() - self.start)
+        return False
+
+
+class Instrumentation:
+    """
+    分阶段计时 + 计数器。每 report_every 步汇总一次窗口内的统计，交给所有输出端：
+
+        report = {
+            "time_step": 当前时间步, "steps": 窗口内步数, "wall_s": 窗口墙钟时间,
+            "phases": {阶段: {"calls", "total_ms", "mean_us", "max_us"}},
+            "counters": {计数器: 窗口内累计值}, "gauges": {名称: 最新值},
+        }
+
+    计时可以来自多个线程（例如仿真线程和 GUI 绘制线程），内部用锁保护。
+    """
+    enabled = True
+
+    def __init__(self, sinks=(), report_every=100, profile_every=None, profile_file=None):
+        """
+        :param sinks: 输出端列表，每个输出端提供 emit(report)，可选 close()
+        :param report_every: 每多少步汇总输出一次
+        :param profile_every: 不为 None 时每 profile_every 步用 cProfile 采样一步
+        :param profile_file: close() 时把累计的采样结果保存到该文件（pstats 格式）
+        """
+        self.sinks = list(sinks)
+        self.report_every = report_every
+        self.profile_every = profile_every
+        self.profile_file = profile_file
+        self.last_report = None
+        self.profiled_steps = 0
+
+        self._lock = threading.Lock()
+        self._profiler = None
+        self._profile_stats = None
+        self._reset_window()
+
+    def _reset_window(self):
+        self._phases = {}    # 阶段 -> [调用次数, 总耗时 ns, 最大耗时 ns]
+        self._counters = {}
+        self._gauges = {}
+        self._steps = 0
+        self._window_start = time.perf_counter()
+
+    def phase(self, name):
+        """上下文管理器：with inst.phase("carrier.move"): ..."""
+        return _Phase(self, name)
+
+    def _add_time(self, name, ns):
+        with self._lock:
+            entry = self._phases.get(name)
+            if entry is None:
+                self._phases[name] = [1, ns, ns]
+            else:
+                entry[0] += 1
+                entry[1] += ns
+                if ns > entry[2]:
+                    entry[2] = ns
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    # ========== 每步 ==========
+
+    def begin_step(self, time_step):
+        """步开始时调用；需要采样的步启动 cProfile。"""
+        if self.profile_every and time_step % self.profile_every == 0:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def end_step(self, time_step):
+        """步结束时调用；停止采样，每 report_every 步输出一次汇总。"""
+        if self._profiler is not None:
+            self._profiler.disable()
+            if self._profile_stats is None:
+                self._profile_stats = pstats.Stats(self._profiler)
+            else:
+                self._profile_stats.add(self._profiler)
+            self._profiler = None
+            self.profiled_steps += 1
+
+        self._steps += 1
+        if self._steps >= self.report_every:
+            self.flush(time_step)
+
+    def flush(self, time_step):
+        """立即汇总当前窗口并交给输出端。"""
+        with self._lock:
+            phases, counters, gauges, steps = self._phases, self._counters, self._gauges, self._steps
+            wall = time.perf_counter() - self._window_start
+            self._reset_window()
+        if steps == 0 and not phases:
+            return None
+        report = {
+            "time_step": time_step,
+            "steps": steps,
+            "wall_s": wall,
+            "phases": {name: {"calls": calls, "total_ms": total / 1e6, "mean_us": total / calls / 1e3,
+                              "max_us": worst / 1e3}
+                       for name, (calls, total, worst) in phases.items()},
+            "counters": counters,
+            "gauges": gauges,
+        }
+        self.last_report = report
+        for sink in self.sinks:
+            sink.emit(report)
+        return report
+
+    # ========== 采样结果 ==========
+
+    def profile_stats(self):
+        """累计的 cProfile 采样结果（pstats.Stats），尚未采样时为 None。"""
+        return self._profile_stats
+
+    def profile_summary(self, limit=20, sort="cumulative"):
+        """采样结果中耗时最多的 limit 个函数（文本）。"""
+        if self._profile_stats is None:
+            return ""
+        out = io.StringIO()
+        self._profile_stats.stream = out
+        self._profile_stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def close(self):
+        """保存采样结果并关闭输出端。"""
+        if self.profile_file and self._profile_stats is not None:
+            self._profile_stats.dump_stats(self.profile_file)
+        for sink in self.sinks:
+            close = getattr(sink, "close", None)
+            if close is not None:
+                close()
+
+
+# ========== 输出端 ==========
+
+def format_report(report):
+    """把一次汇总格式化为一行文本。"""
+    steps_per_s = report["steps"] / max(report["wall_s"], 1e-9)
+    phases = " ".join(f"{name}={p['mean_us']:.0f}us" for name, p in report["phases"].items())
+    counters = " ".join(f"{name}={value}" for name, value in {**report["counters"], **report["gauges"]}.items())
+    return f"step {report['time_step']}: {steps_per_s:.1f} steps/s | {phases} | {counters}"
+
+
+class LogSink:
+    """用 logging 输出每次汇总。"""
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger("missile_simulation.instrumentation")
+        self.level = level
+
+    def emit(self, report):
+        self.logger.log(self.level, format_report(report))
+
+
+class CsvSink:
+    """
+    每次汇总写一行 CSV：time_step, steps, wall_s, steps_per_s，每个阶段的 mean_us / max_us，以及计数器。
+    列在第一次汇总时确定，之后新出现的阶段/计数器不再加列。
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, mode='w', newline='')
+        self._writer = None
+
+    def emit(self, report):
+        row = {
+            "time_step": report["time_step"],
+            "steps": report["steps"],
+            "wall_s": f"{report['wall_s']:.6f}",
+            "steps_per_s": f"{report['steps'] / max(report['wall_s'], 1e-9):.3f}",
+        }
+        for name, p in report["phases"].items():
+            row[f"{name}_mean_us"] = f"{p['mean_us']:.3f}"
+            row[f"{name}_max_us"] = f"{p['max_us']:.3f}"
+        row.update(report["counters"])
+        row.update(report["gauges"])
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._file, fieldnames=list(row), extrasaction="ignore")
+            self._writer.writeheader()
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class CallbackSink:
+    """把每次汇总交给回调函数，例如 GUI 统计面板（注意回调可能在仿真线程中执行）。"""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def emit(self, report):
+        self.callback(report)
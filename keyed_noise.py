@@ -0,0 +1,83 @@
+"""
+按 (时间步, 导弹, 传感器, 目标槽位) 寻址的计数器式随机数。
+
+普通的 numpy Generator 是顺序流：要得到第 t 步的测量噪声，必须先把前面所有步的随机数抽完。
+KeyedNoise 中每个随机数都是 (key, 时间步, 导弹, 传感器, 槽位, 抽样序号) 的纯函数（SplitMix64 混合），
+因此任意时间段、任意导弹/传感器的测量都可以单独重新生成，结果与完整运行逐位一致，
+也与按导弹分片并行计算的结果一致。
+
+KeyedNoise 提供 measure_pairs 用到的 random / uniform / normal 三个方法，可以直接替代 rng 参数。
+"""
+import numpy as np
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+# 各个坐标的乘数（大奇数），把多个计数器合成一个 64 位输入
+_STEP_MUL = np.uint64(0xD6E8FEB86659FD93)
+_MISSILE_MUL = np.uint64(0xA0761D6478BD642F)
+_SENSOR_MUL = np.uint64(0xE7037ED1A0B428DB)
+_SLOT_MUL = np.uint64(0x8EBC6AF09C88C6E3)
+_DRAW_MUL = np.uint64(0x589965CC75374CC3)
+
+
+def _mix(x):
+    """SplitMix64 的输出混合函数（就地修改 uint64 数组）。"""
+    x ^= x >> np.uint64(30)
+    x *= _MIX1
+    x ^= x >> np.uint64(27)
+    x *= _MIX2
+    x ^= x >> np.uint64(31)
+    return x
+
+
+def make_noise_key(seed_sequence):
+    """从 SeedSequence 派生 64 位噪声密钥（Python int，便于写入 JSON）。"""
+    return int(seed_sequence.generate_state(1, np.uint64)[0])
+
+
+class KeyedNoise:
+    """
+    一个时间步、一组 (导弹, 传感器) 观测点上的计数器式随机数源。
+    每调用一次 random / uniform 消耗一个抽样序号，normal 消耗两个（Box-Muller），
+    因此调用顺序必须固定（measure_pairs 中的顺序）。
+    """
+
+    def __init__(self, key, time_step, missile_ids, sensor_ids):
+        """
+        :param key: 64 位噪声密钥
+        :param time_step: 时间步
+        :param missile_ids: (P,) 每个观测点的导弹编号
+        :param sensor_ids: (P,) 每个观测点的传感器编号
+        """
+        with np.errstate(over="ignore"):
+            base = (np.uint64(key) + np.uint64(time_step) * _STEP_MUL)
+            rows = (np.asarray(missile_ids, dtype=np.uint64) * _MISSILE_MUL
+                    ^ np.asarray(sensor_ids, dtype=np.uint64) * _SENSOR_MUL)
+            self._rows = _mix(rows ^ base)
+        self._draw = 0
+
+    def _bits(self, shape):
+        P, T = shape
+        with np.errstate(over="ignore"):
+            slots = np.arange(T, dtype=np.uint64) * _SLOT_MUL
+            x = self._rows[:, None] ^ slots[None, :]
+            x ^= np.uint64(self._draw) * _DRAW_MUL
+            x += _GOLDEN
+            x = _mix(_mix(x))
+        self._draw += 1
+        return x
+
+    def random(self, shape):
+        """[0, 1) 均匀分布，形状 (P, T)。"""
+        return (self._bits(shape) >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+    def uniform(self, low, high, shape):
+        return low + (high - low) * self.random(shape)
+
+    def normal(self, loc, scale, shape):
+        """正态分布（Box-Muller）。"""
+        u1 = 1.0 - self.random(shape)  # (0, 1]
+        u2 = self.random(shape)
+        z = np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+        return loc + scale * z
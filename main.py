@@ -1,13 +1,36 @@
+import math
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk
-import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-# 从 carrier.py 和 missile.py 引入相关类
-from carrier import Carrier
-from missile import Missile
+# 仿真逻辑全部在无界面的 SimulationCore 中，本文件只负责显示
+from decoys import DECOY_CHAFF, DECOY_FIXED_CORNER, DECOY_MOVING_CORNER
+from instrumentation import Instrumentation
+from simulation_core import SimulationCore
+
+# 各类干扰的显示样式：(颜色, 标记, 图例)
+DECOY_STYLES = {
+    DECOY_CHAFF: ("yellow", "o", "Chaff"),
+    DECOY_FIXED_CORNER: ("green", "x", "Fixed Corner"),
+    DECOY_MOVING_CORNER: ("purple", "^", "Moving Corner"),
+}
+
+# 每个散点最多绘制的点数，超过时等间隔抽稀显示
+MAX_DRAW_POINTS = 2000
+
+# 统计面板每多少步刷新一次
+STATS_EVERY = 20
+
+
+def subsample(points, limit=MAX_DRAW_POINTS):
+    """点数超过 limit 时等间隔抽取，降低 3D 重绘开销。"""
+    if len(points) <= limit:
+        return points
+    return points[::math.ceil(len(points) / limit)]
+
 
 class MissileCarrierSimulation3D:
     def __init__(self, root):
@@ -46,6 +69,14 @@ class MissileCarrierSimulation3D:
         self.corner_reflector_appear_times_var = tk.IntVar(value=2)
         ttk.Entry(control_frame, textvariable=self.corner_reflector_appear_times_var).pack()
 
+        ttk.Label(control_frame, text="Sim Steps/s (0 = max):").pack()
+        self.sim_rate_var = tk.DoubleVar(value=10)
+        ttk.Entry(control_frame, textvariable=self.sim_rate_var).pack()
+
+        ttk.Label(control_frame, text="Max FPS:").pack()
+        self.max_fps_var = tk.IntVar(value=20)
+        ttk.Entry(control_frame, textvariable=self.max_fps_var).pack()
+
         ttk.Button(control_frame, text="Start Simulation", command=self.start_simulation).pack(pady=5)
         ttk.Button(control_frame, text="Reset Simulation", command=self.reset_simulation).pack(pady=5)
 
@@ -53,44 +84,39 @@ class MissileCarrierSimulation3D:
         self.time_label = ttk.Label(control_frame, text=f"Time Step: {self.time_step}")
         self.time_label.pack(pady=5)
 
+        # 统计面板：各阶段平均耗时与计数器，每 STATS_EVERY 步刷新
+        self.stats_label = ttk.Label(control_frame, text="", justify=tk.LEFT, font="TkFixedFont")
+        self.stats_label.pack(pady=5, anchor=tk.W)
+        self.shown_report = None
+
         # ========== Matplotlib 3D画布 ==========
         self.fig = plt.figure(figsize=(8, 8))
         self.ax = self.fig.add_subplot(111, projection='3d')
         self.canvas_frame = ttk.Frame(self.root)
         self.canvas_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
         self.canvas = None
-        self.animation = None
         self.create_canvas()
 
-        # ========== 仿真对象与数据存储 ==========
+        # ========== 仿真核心与散点 ==========
         self.is_running = False
-        self.carrier = None
-        self.missile = None  # Missile对象
-        self.missiles = []   # 导弹位置数组
-        self.max_steps = None
+        self.core = None  # SimulationCore 对象，负责全部仿真逻辑
+
+        # 仿真在工作线程中推进，界面按帧率上限绘制最新快照
+        self.core_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.worker = None
+        self.snapshot = None         # 工作线程发布的最新状态快照
+        self.drawn_snapshot = None   # 上一次绘制的快照
+        self.render_job = None
+        self.sim_rate = 10.0
+        self.max_fps = 20
 
         # 载具 + 导弹 散点
         self.carrier_scatter = None
         self.missile_scatter = None
 
-        # 干扰相关
-        self.chaff_appear_times = 0
-        self.chaff_appear_count = 0
-        self.is_chaff_active = False
-        self.chaff_timer = 0
-        self.chaff_scatter = None
-        # 记录当前帧箔条干扰的绝对坐标，用于给导弹测量
-        self.chaff_positions = np.array([])
-
-        self.corner_reflector_appear_times = 0
-        self.corner_reflector_appear_count = 0
-        self.is_corner_reflector_active = False
-        self.corner_reflector_timer = 0
-        self.corner_reflector_scatter = None
-        self.corner_reflector_type = None
-        self.corner_reflector_positions = None  # fixed => (N,3); moving => (N,4)
-        # 用于保存本帧的角反射器绝对坐标，以便导弹测量
-        self.current_corner_abs_positions = np.array([])
+        # 干扰散点：每类干扰一个散点对象，重复使用（状态由 core 维护）
+        self.decoy_scatters = {}
 
     def create_canvas(self):
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.canvas_frame)
@@ -103,25 +129,23 @@ class MissileCarrierSimulation3D:
         self.is_running = True
 
         self.reset_simulation_data()
-        self.time_step = 0
         self.update_time_label()
+        # 运行过程中由后台线程流式写出 CSV，结束时不再需要一次性导出
+        self.core.start_streaming("measurement_data.csv", "ship_loc.csv")
 
-        self.max_steps = self.max_steps_var.get()
-        self.chaff_appear_times = self.chaff_appear_times_var.get()
-        self.corner_reflector_appear_times = self.corner_reflector_appear_times_var.get()
-
-        self.animation = FuncAnimation(self.fig, self.update, interval=100, blit=False, cache_frame_data=False)
-        self.canvas.draw()
+        self.read_live_settings()
+        self.stop_event.clear()
+        self.worker = threading.Thread(target=self.simulation_loop, name="SimulationLoop", daemon=True)
+        self.worker.start()
+        self.schedule_render()
 
     def reset_simulation(self):
         self.is_running = False
-        if self.animation:
-            self.animation.event_source.stop()
-            self.animation = None
+        self.stop_worker()
 
         # 在这里也可以选择将测量数据导出到CSV
-        if self.missile:
-            self.missile.export_to_csv("measurement_data.csv")
+        if self.core:
+            self.core.export_to_csv("measurement_data.csv")
 
         self.reset_simulation_data()
         self.canvas.draw()
@@ -133,215 +157,151 @@ class MissileCarrierSimulation3D:
         self.ax.set_zlim(0, 60)
         self.ax.set_title("Missile and Carrier Simulation 3D")
 
-        # (1) 初始化载具
-        carrier_count = self.carrier_count_var.get()
-        carrier_speed = self.carrier_speed_var.get()
-        self.carrier = Carrier(carrier_count, carrier_speed)
-
-        # (2) 初始化导弹
-        missile_count = self.missile_count_var.get()
-        # 示例：所有导弹初始都在 (0,0,15) 附近
-        self.missiles = np.array([[0, 0, 15] for _ in range(missile_count)], dtype=np.float64)
-
-        # 创建 Missile 对象，后面用来采集测量数据
-        self.missile = Missile(self.missiles)
-
-        # (3) 重置散点对象
-        if self.carrier_scatter:
-            self.carrier_scatter.remove()
-        if self.missile_scatter:
-            self.missile_scatter.remove()
-
-        self.carrier_scatter = self.ax.scatter(*self.carrier.get_positions().T, c="blue", label="Carriers")
-        self.missile_scatter = self.ax.scatter(self.missiles[:,0], self.missiles[:,1], self.missiles[:,2],
+        # (1) 按控制面板参数创建仿真核心
+        self.core = SimulationCore(
+            carrier_count=self.carrier_count_var.get(),
+            missile_count=self.missile_count_var.get(),
+            carrier_speed=self.carrier_speed_var.get(),
+            missile_speed=self.missile_speed_var.get(),
+            max_steps=self.max_steps_var.get(),
+            chaff_appear_times=self.chaff_appear_times_var.get(),
+            corner_reflector_appear_times=self.corner_reflector_appear_times_var.get(),
+        )
+        self.core.set_instrumentation(Instrumentation(report_every=STATS_EVERY))
+        self.time_step = self.core.time_step
+        self.snapshot = None
+        self.drawn_snapshot = None
+
+        # (2) 重置散点对象（ax.clear() 已移除旧的散点）
+        missiles = self.core.missiles
+        self.carrier_scatter = self.ax.scatter(*self.core.carrier.get_positions().T, c="blue", label="Carriers")
+        self.missile_scatter = self.ax.scatter(missiles[:,0], missiles[:,1], missiles[:,2],
                                                c="red", label="Missiles")
 
-        # (4) 重置干扰相关
-        self.chaff_appear_count = 0
-        self.is_chaff_active = False
-        self.chaff_timer = 0
-        if self.chaff_scatter:
-            self.chaff_scatter.remove()
-        self.chaff_scatter = None
-        self.chaff_positions = np.array([])
-
-        self.corner_reflector_appear_count = 0
-        self.is_corner_reflector_active = False
-        self.corner_reflector_timer = 0
-        if self.corner_reflector_scatter:
-            self.corner_reflector_scatter.remove()
-        self.corner_reflector_scatter = None
-        self.corner_reflector_type = None
-        self.corner_reflector_positions = None
-        self.current_corner_abs_positions = np.array([])
+        # (3) 重置干扰散点，初始为空
+        self.decoy_scatters = {
+            kind: self.ax.scatter([], [], [], c=color, marker=marker, label=label)
+            for kind, (color, marker, label) in DECOY_STYLES.items()
+        }
 
         self.ax.legend()
 
-    def update(self, frame):
-        # 1) 载具移动
-        self.carrier.move()
-
-        # 2) 随机生成或移除干扰
-        self.update_chaff()
-        self.update_corner_reflector()
-
-        # 3) 更新导弹位置（朝载具前进示例）
-        missile_speed = self.missile_speed_var.get()
-        carrier_positions = self.carrier.get_positions()
-        for i in range(len(self.missiles)):
-            target_idx = i % len(carrier_positions)
-            direction = carrier_positions[target_idx] - self.missiles[i]
-            norm = np.linalg.norm(direction)
-            if norm > 0:
-                self.missiles[i] += missile_speed * direction / norm
-
-        # 4) 更新载具和导弹散点
-        self.carrier_scatter._offsets3d = (*carrier_positions.T,)
-        self.missile_scatter._offsets3d = (self.missiles[:,0], self.missiles[:,1], self.missiles[:,2])
-
-        # 5) 如果是 moving corner，就计算本帧的绝对坐标，更新散点
-        self.update_moving_reflector_positions()
-
-        # 6) ★★ 让导弹执行一次“测量” ★★
-        #    - 船的当前位置：carrier_positions
-        #    - 箔条干扰：self.chaff_positions（如果无箔条则为空数组）
-        #    - 角反射器：self.current_corner_abs_positions（如果无角反射器则为空数组）
-        self.missile.generate_sensor_measurements(
-            carriers_positions=carrier_positions,
-            chaff_positions=self.chaff_positions,
-            corner_positions=self.current_corner_abs_positions,
-            time_step=self.time_step
-        )
+    # ========== 仿真线程 ==========
+
+    def simulation_loop(self):
+        """工作线程：按 sim_rate 推进仿真并发布快照，与绘制速度无关。"""
+        next_time = time.perf_counter()
+        while not self.stop_event.is_set():
+            with self.core_lock:
+                if self.core.finished:
+                    break
+                self.core.step()
+                self.snapshot = self.take_snapshot()
+
+            rate = self.sim_rate
+            if rate > 0:
+                next_time += 1.0 / rate
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    self.stop_event.wait(delay)
+                else:
+                    # 跟不上设定速率时不追赶，避免之后突发连跑
+                    next_time = time.perf_counter()
+
+    def take_snapshot(self):
+        """复制绘制所需的状态，绘制时不再访问仿真核心。"""
+        return {
+            "time_step": self.core.time_step,
+            "finished": self.core.finished,
+            "carriers": self.core.carrier.get_positions().copy(),
+            "missiles": self.core.missiles.copy(),
+            "decoys": {kind: self.core.decoys.positions_of(kind) for kind in DECOY_STYLES},
+        }
+
+    def stop_worker(self):
+        self.stop_event.set()
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+        if self.render_job is not None:
+            self.root.after_cancel(self.render_job)
+            self.render_job = None
+
+    def read_live_settings(self):
+        """读取运行中允许修改的参数（导弹速度、仿真速率、帧率上限）。输入框内容无效时保持原值。"""
+        try:
+            missile_speed = self.missile_speed_var.get()
+            with self.core_lock:
+                self.core.missile_speed = missile_speed
+            self.sim_rate = self.sim_rate_var.get()
+            self.max_fps = max(1, self.max_fps_var.get())
+        except tk.TclError:
+            pass
+
+    # ========== 绘制 ==========
+
+    def schedule_render(self):
+        self.render_job = self.root.after(int(1000 / self.max_fps), self.render)
+
+    def render(self):
+        """界面定时器：绘制最新快照；仿真结束后导出数据并停止定时器。"""
+        self.render_job = None
+        self.read_live_settings()
+
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot is not self.drawn_snapshot:
+            with self.core.instrumentation.phase("draw"):
+                self.draw_snapshot(snapshot)
+            self.drawn_snapshot = snapshot
+        self.update_stats_panel()
+
+        if self.worker is not None and not self.worker.is_alive():
+            self.finish_simulation()
+        else:
+            self.schedule_render()
 
-        # 7) 时间步+1，检查是否到达最大步数
-        self.time_step += 1
+    def draw_snapshot(self, snapshot):
+        # 1) 更新载具和导弹散点（点数过多时抽稀）
+        carriers = subsample(snapshot["carriers"])
+        missiles = subsample(snapshot["missiles"])
+        self.carrier_scatter._offsets3d = (carriers[:,0], carriers[:,1], carriers[:,2])
+        self.missile_scatter._offsets3d = (missiles[:,0], missiles[:,1], missiles[:,2])
+
+        # 2) 同步干扰散点
+        self.update_decoy_scatters(snapshot["decoys"])
+
+        # 3) 时间步显示
+        self.time_step = snapshot["time_step"]
         self.update_time_label()
+        self.canvas.draw()
 
-        if self.max_steps is not None and self.time_step >= self.max_steps:
-            self.is_running = False
-            if self.animation:
-                self.animation.event_source.stop()
-                self.animation = None
-            # 仿真结束 => 导出测量数据
-            self.missile.export_to_csv("measurement_data.csv")
-
-    # ========== 箔条干扰（Chaff） ==========
-
-    def update_chaff(self):
-        """
-        随机生成或移除箔条干扰：
-        - 每次出现持续 50 个时间步
-        - 总共可出现 chaff_appear_times 次
-        """
-        if self.is_chaff_active:
-            self.chaff_timer -= 1
-            if self.chaff_timer <= 0:
-                # 移除散点
-                if self.chaff_scatter:
-                    self.chaff_scatter.remove()
-                self.chaff_scatter = None
-                self.is_chaff_active = False
-                self.chaff_positions = np.array([])
-        else:
-            # 如果当前没有箔条，且出现次数还不超限，则有一定概率生成一次
-            if self.chaff_appear_count < self.chaff_appear_times:
-                if np.random.rand() < 0.01:
-                    self.spawn_chaff()
-
-    def spawn_chaff(self):
-        self.is_chaff_active = True
-        self.chaff_timer = 50
-        self.chaff_appear_count += 1
-
-        # 由 carrier.generate_chaff() 生成箔条的绝对坐标
-        chaff = self.carrier.generate_chaff()
-        self.chaff_positions = chaff  # 存储，给导弹测量用
-        self.chaff_scatter = self.ax.scatter(chaff[:,0], chaff[:,1], chaff[:,2],
-                                             c="yellow", marker="o", label="Chaff")
-        self.ax.legend()
+    def finish_simulation(self):
+        self.worker = None
+        self.is_running = False
+        # 仿真结束 => 导出测量数据
+        if self.core.finished:
+            self.core.export_to_csv("measurement_data.csv")
 
-    # ========== 角反射器（Corner Reflector） ==========
-
-    def update_corner_reflector(self):
-        """
-        随机生成或移除角反射器：
-        - 每次出现持续 100 个时间步
-        - 总共可出现 corner_reflector_appear_times 次
-        - 出现时随机决定 "fixed" 或 "moving"
-        """
-        if self.is_corner_reflector_active:
-            self.corner_reflector_timer -= 1
-            if self.corner_reflector_timer <= 0:
-                if self.corner_reflector_scatter:
-                    self.corner_reflector_scatter.remove()
-                self.corner_reflector_scatter = None
-                self.is_corner_reflector_active = False
-                self.corner_reflector_type = None
-                self.corner_reflector_positions = None
-                self.current_corner_abs_positions = np.array([])
-        else:
-            if self.corner_reflector_appear_count < self.corner_reflector_appear_times:
-                if np.random.rand() < 0.01:
-                    self.spawn_corner_reflector()
-
-    def spawn_corner_reflector(self):
-        self.is_corner_reflector_active = True
-        self.corner_reflector_timer = 100
-        self.corner_reflector_appear_count += 1
-
-        self.corner_reflector_type = np.random.choice(["fixed", "moving"])
-        if self.corner_reflector_type == "fixed":
-            corner_positions = self.carrier.generate_fixed_corner_reflectors()
-            color = "green"
-            marker = "x"
-            # 固定角反射器直接是绝对坐标
-            self.corner_reflector_positions = corner_positions
-        else:
-            corner_positions = self.carrier.generate_moving_corner_reflectors()
-            color = "purple"
-            marker = "^"
-            # 移动角反射器保存相对数据
-            self.corner_reflector_positions = corner_positions
-
-        # 初次绘制散点
-        if self.corner_reflector_type == "fixed":
-            self.current_corner_abs_positions = self.corner_reflector_positions
-        else:
-            # 先根据船位置 + offset 计算一次绝对坐标
-            self.current_corner_abs_positions = self._compute_moving_corner_abs_positions()
+    # ========== 干扰显示 ==========
 
-        xs = self.current_corner_abs_positions[:,0]
-        ys = self.current_corner_abs_positions[:,1]
-        zs = self.current_corner_abs_positions[:,2]
+    def update_decoy_scatters(self, decoys):
+        """按类型把快照中的干扰坐标写入对应散点。"""
+        for kind, scatter in self.decoy_scatters.items():
+            positions = subsample(decoys[kind])
+            scatter._offsets3d = (positions[:,0], positions[:,1], positions[:,2])
 
-        self.corner_reflector_scatter = self.ax.scatter(xs, ys, zs,
-                                                        c=color, marker=marker,
-                                                        label=f"{self.corner_reflector_type.capitalize()} Corner")
-        self.ax.legend()
+    # ========== 统计面板 ==========
 
-    def update_moving_reflector_positions(self):
-        """如果是 moving，就实时更新它的绝对坐标 + 散点。"""
-        if self.is_corner_reflector_active and self.corner_reflector_type == "moving":
-            self.current_corner_abs_positions = self._compute_moving_corner_abs_positions()
-            xs = self.current_corner_abs_positions[:,0]
-            ys = self.current_corner_abs_positions[:,1]
-            zs = self.current_corner_abs_positions[:,2]
-            if self.corner_reflector_scatter:
-                self.corner_reflector_scatter._offsets3d = (xs, ys, zs)
-
-    def _compute_moving_corner_abs_positions(self):
-        """
-        根据 self.corner_reflector_positions (N,4) => [ship_idx, offset_x, offset_y, 0]，
-        结合当前船位置，计算出绝对坐标。
-        """
-        carrier_positions = self.carrier.get_positions()
-        abs_positions = []
-        for row in self.corner_reflector_positions:
-            ship_idx, offx, offy, _ = row
-            ship_idx = int(ship_idx)
-            sx, sy, sz = carrier_positions[ship_idx]
-            abs_positions.append([sx + offx, sy + offy, sz])
-        return np.array(abs_positions)
+    def update_stats_panel(self):
+        """显示插桩最近一次汇总：仿真速率、各阶段平均耗时和计数器。"""
+        report = self.core.instrumentation.last_report
+        if report is None or report is self.shown_report:
+            return
+        self.shown_report = report
+        lines = [f"{report['steps'] / max(report['wall_s'], 1e-9):8.1f} steps/s"]
+        lines += [f"{name:<13}{p['mean_us'] / 1e3:8.2f} ms" for name, p in report["phases"].items()]
+        lines += [f"{name:<19}{value:>10}" for name, value in report["counters"].items()]
+        self.stats_label.config(text="\n".join(lines))
 
     # ========== 时间步显示 ==========
 
@@ -0,0 +1,591 @@
+import csv
+import json
+import queue
+import re
+import threading
+
+import numpy as np
+
+# 二进制格式版本号，格式变化时递增
+NPZ_FORMAT_VERSION = 1
+
+# 每个目标的 8 个字段名（与 CSV 表头中 TargetN_ 之后的部分一致）
+FIELD_NAMES = ["x", "y", "z", "MajorAxis", "MinorAxis", "AngleRad", "Scatter", "Confidence"]
+
+
+def rows_to_arrays(rows, max_targets, num_fields=len(FIELD_NAMES), value_dtype=np.float64):
+    """
+    将 measurement_data 的行 [time_step, missile_id, sensor_id, 8 × max_targets 个字段] 转为列式数组。
+    :return: dict，包含 time_step / missile_id / sensor_id 整数列，
+             values (R, max_targets, num_fields) 浮点数组以及 valid (R, max_targets) 有效掩码
+    """
+    table = np.array(rows, dtype=np.float64).reshape(len(rows), 3 + max_targets * num_fields)
+    values = table[:, 3:].reshape(len(rows), max_targets, num_fields)
+    return {
+        "time_step": table[:, 0].astype(np.int32),
+        "missile_id": table[:, 1].astype(np.int32),
+        "sensor_id": table[:, 2].astype(np.int16),
+        "values": values.astype(value_dtype),
+        "valid": ~np.isnan(values[..., 0]),
+    }
+
+
+def arrays_to_rows(arrays):
+    """
+    rows_to_arrays 的逆变换：把列式数组还原为行列表，无效槽位填 None。
+    """
+    num_rows, max_targets, num_fields = arrays["values"].shape
+    rows = np.empty((num_rows, 3 + max_targets * num_fields), dtype=object)
+    rows[:, 0] = arrays["time_step"].tolist()
+    rows[:, 1] = arrays["missile_id"].tolist()
+    rows[:, 2] = arrays["sensor_id"].tolist()
+    values = arrays["values"].reshape(num_rows, max_targets * num_fields).astype(np.float64).astype(object)
+    values[~np.repeat(arrays["valid"], num_fields, axis=1)] = None
+    rows[:, 3:] = values
+    return rows.tolist()
+
+
+class MeasurementTable:
+    """
+    按列分块存储的测量数据。
+    接口与原来的行列表兼容（append / extend / len / 迭代得到行），
+    但向量化引擎通过 append_block 直接存入整块数组，不再逐行构造 Python 列表。
+    """
+
+    def __init__(self, max_targets, num_fields=len(FIELD_NAMES)):
+        self.max_targets = max_targets
+        self.num_fields = num_fields
+        self._chunks = []        # 已转为数组的数据块，每块是 rows_to_arrays 格式的 dict
+        self._pending_rows = []  # 通过 append 加入、尚未转为数组的行
+        self._num_rows = 0
+
+    def __len__(self):
+        return self._num_rows
+
+    def __iter__(self):
+        for chunk in self.iter_chunks():
+            yield from arrays_to_rows(chunk)
+
+    def append(self, row):
+        """追加一行 [time_step, missile_id, sensor_id, ...]。"""
+        self._pending_rows.append(row)
+        self._num_rows += 1
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def append_block(self, time_step, block, valid, row_mask=None, sensor_ids=None):
+        """
+        追加一个时间步的测量块。
+        :param block: (num_missiles, num_sensors, max_targets, num_fields)
+        :param valid: (num_missiles, num_sensors, max_targets)
+        :param row_mask: (num_missiles, num_sensors) 布尔数组，只追加为 True 的行（多速率调度）；None 表示全部
+        :param sensor_ids: (num_sensors,) 各列写入的 sensor_id，None 表示 0..num_sensors-1
+        """
+        self._flush_pending()
+        M, S = block.shape[:2]
+        sensor_ids = np.arange(S, dtype=np.int16) if sensor_ids is None else np.asarray(sensor_ids, dtype=np.int16)
+        chunk = {
+            "time_step": np.full(M * S, time_step, dtype=np.int32),
+            "missile_id": np.repeat(np.arange(M, dtype=np.int32), S),
+            "sensor_id": np.tile(sensor_ids, M),
+            "values": block.reshape(M * S, self.max_targets, self.num_fields),
+            "valid": valid.reshape(M * S, self.max_targets),
+        }
+        if row_mask is not None:
+            rows = row_mask.reshape(-1)
+            chunk = {key: column[rows] for key, column in chunk.items()}
+            if not rows.any():
+                return
+        self._chunks.append(chunk)
+        self._num_rows += len(chunk["time_step"])
+
+    def iter_chunks(self):
+        """按写入顺序逐块返回列式数组。"""
+        self._flush_pending()
+        return iter(self._chunks)
+
+    def to_arrays(self, value_dtype=np.float64):
+        """把所有数据块拼接为一组列式数组（格式同 rows_to_arrays）。"""
+        chunks = list(self.iter_chunks())
+        if not chunks:
+            return rows_to_arrays([], self.max_targets, self.num_fields, value_dtype)
+        arrays = {key: np.concatenate([c[key] for c in chunks]) for key in chunks[0]}
+        arrays["values"] = arrays["values"].astype(value_dtype, copy=False)
+        return arrays
+
+    def clear(self):
+        self._chunks = []
+        self._pending_rows = []
+        self._num_rows = 0
+
+    def _flush_pending(self):
+        if self._pending_rows:
+            self._chunks.append(rows_to_arrays(self._pending_rows, self.max_targets, self.num_fields))
+            self._pending_rows = []
+
+
+# ========== 稀疏长表 ==========
+
+# 每次实际探测一条记录：时间步、导弹、传感器、目标槽位和 8 个字段
+DETECTION_DTYPE = np.dtype([("time_step", np.int32), ("missile_id", np.int32), ("sensor_id", np.int16),
+                            ("slot", np.int16), ("values", np.float64, (len(FIELD_NAMES),))])
+# 每个宽表行一条索引：该行的 (时间步, 导弹, 传感器) 以及该行的探测数，用于还原没有探测的空行
+ROW_KEY_DTYPE = np.dtype([("time_step", np.int32), ("missile_id", np.int32), ("sensor_id", np.int16),
+                          ("num_detections", np.int16)])
+
+
+def wide_to_sparse(arrays):
+    """
+    把 rows_to_arrays 格式的宽表转为稀疏长表。
+    :return: (row_keys, detections)，分别为 ROW_KEY_DTYPE 和 DETECTION_DTYPE 结构化数组；
+             detections 按行、行内按槽位排序
+    """
+    valid = arrays["valid"]
+    row_keys = np.empty(len(valid), dtype=ROW_KEY_DTYPE)
+    row_keys["time_step"] = arrays["time_step"]
+    row_keys["missile_id"] = arrays["missile_id"]
+    row_keys["sensor_id"] = arrays["sensor_id"]
+    row_keys["num_detections"] = valid.sum(axis=1)
+
+    rows, slots = np.nonzero(valid)
+    detections = np.empty(len(rows), dtype=DETECTION_DTYPE)
+    detections["time_step"] = arrays["time_step"][rows]
+    detections["missile_id"] = arrays["missile_id"][rows]
+    detections["sensor_id"] = arrays["sensor_id"][rows]
+    detections["slot"] = slots
+    detections["values"] = arrays["values"][rows, slots]
+    return row_keys, detections
+
+
+def sparse_to_wide(row_keys, detections, max_targets, value_dtype=np.float64):
+    """
+    wide_to_sparse 的逆变换：还原为 rows_to_arrays 格式的宽表，没有探测的槽位为 NaN。
+    detections 必须与 row_keys 的行顺序一致（每行的探测连续存放）。
+    """
+    num_rows = len(row_keys)
+    rows = np.repeat(np.arange(num_rows), row_keys["num_detections"])
+    values = np.full((num_rows, max_targets, DETECTION_DTYPE["values"].shape[0]), np.nan, dtype=value_dtype)
+    valid = np.zeros((num_rows, max_targets), dtype=bool)
+    values[rows, detections["slot"]] = detections["values"]
+    valid[rows, detections["slot"]] = True
+    return {
+        "time_step": row_keys["time_step"].copy(),
+        "missile_id": row_keys["missile_id"].copy(),
+        "sensor_id": row_keys["sensor_id"].copy(),
+        "values": values,
+        "valid": valid,
+    }
+
+
+def sparse_to_compact(row_keys, detections, max_targets, value_dtype=np.float64):
+    """
+    稀疏长表 -> write_measurement_npz 的紧凑形式（values 只含有效槽位，形状 (N, 8)），不经过完整宽表。
+    """
+    rows = np.repeat(np.arange(len(row_keys)), row_keys["num_detections"])
+    valid = np.zeros((len(row_keys), max_targets), dtype=bool)
+    valid[rows, detections["slot"]] = True
+    return {
+        "time_step": row_keys["time_step"].copy(),
+        "missile_id": row_keys["missile_id"].copy(),
+        "sensor_id": row_keys["sensor_id"].copy(),
+        "values": detections["values"].astype(value_dtype),
+        "valid": valid,
+    }
+
+
+class _GrowableArray:
+    """预分配、按倍数扩容的结构化数组，追加为摊还 O(1) 的整块拷贝。"""
+
+    def __init__(self, dtype, capacity=1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def extend(self, records):
+        n = len(records)
+        if self.size + n > len(self._data):
+            grown = np.empty(max(2 * len(self._data), self.size + n), dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:self.size + n] = records
+        self.size += n
+
+    def view(self):
+        return self._data[:self.size]
+
+    @property
+    def nbytes(self):
+        return self.size * self._data.dtype.itemsize
+
+    def clear(self):
+        self.size = 0
+
+
+class SparseDetectionTable:
+    """
+    稀疏长表形式的测量数据：每次实际探测存一条 DETECTION_DTYPE 记录，每个宽表行另存一条小的行索引。
+    未探测/无目标的槽位不占空间，内存和写出量与探测填充率成正比。
+    接口与 MeasurementTable 相同（append / extend / append_block / len / 迭代 / iter_chunks / to_arrays），
+    iter_chunks 和 to_arrays 按需还原为宽表，现有的 CSV 导出和流式输出无需修改。
+    """
+
+    def __init__(self, max_targets, num_fields=len(FIELD_NAMES), capacity=4096, chunk_rows=65536):
+        """
+        :param capacity: 预分配的探测记录数
+        :param chunk_rows: iter_chunks 每块还原的宽表行数
+        """
+        if num_fields != DETECTION_DTYPE["values"].shape[0]:
+            raise ValueError(f"稀疏长表只支持{DETECTION_DTYPE['values'].shape[0]}个字段")
+        self.max_targets = max_targets
+        self.num_fields = num_fields
+        self.chunk_rows = chunk_rows
+        self._row_keys = _GrowableArray(ROW_KEY_DTYPE, capacity)
+        self._detections = _GrowableArray(DETECTION_DTYPE, capacity)
+
+    def __len__(self):
+        return self._row_keys.size
+
+    def __iter__(self):
+        for chunk in self.iter_chunks():
+            yield from arrays_to_rows(chunk)
+
+    def append(self, row):
+        """追加一行 [time_step, missile_id, sensor_id, ...]。"""
+        self.append_arrays(rows_to_arrays([row], self.max_targets, self.num_fields))
+
+    def extend(self, rows):
+        rows = list(rows)
+        if rows:
+            self.append_arrays(rows_to_arrays(rows, self.max_targets, self.num_fields))
+
+    def append_arrays(self, arrays):
+        """追加 rows_to_arrays 格式的宽表数据。"""
+        row_keys, detections = wide_to_sparse(arrays)
+        self._row_keys.extend(row_keys)
+        self._detections.extend(detections)
+
+    def append_block(self, time_step, block, valid, row_mask=None, sensor_ids=None):
+        """
+        追加一个时间步的测量块，只保存 valid 为 True 的槽位。
+        :param block: (num_missiles, num_sensors, max_targets, num_fields)
+        :param valid: (num_missiles, num_sensors, max_targets)
+        :param row_mask: (num_missiles, num_sensors) 布尔数组，只追加为 True 的行；None 表示全部。
+                         不在 row_mask 中的行的 valid 必须为 False
+        :param sensor_ids: (num_sensors,) 各列写入的 sensor_id，None 表示 0..num_sensors-1
+        """
+        M, S = valid.shape[:2]
+        sensor_ids = np.arange(S, dtype=np.int16) if sensor_ids is None else np.asarray(sensor_ids, dtype=np.int16)
+        row_keys = np.empty(M * S, dtype=ROW_KEY_DTYPE)
+        row_keys["time_step"] = time_step
+        row_keys["missile_id"] = np.repeat(np.arange(M, dtype=np.int32), S)
+        row_keys["sensor_id"] = np.tile(sensor_ids, M)
+        row_keys["num_detections"] = valid.sum(axis=2).reshape(-1)
+        if row_mask is not None:
+            row_keys = row_keys[row_mask.reshape(-1)]
+
+        missile_ids, sensor_slots, slots = np.nonzero(valid)
+        detections = np.empty(len(slots), dtype=DETECTION_DTYPE)
+        detections["time_step"] = time_step
+        detections["missile_id"] = missile_ids
+        detections["sensor_id"] = sensor_ids[sensor_slots]
+        detections["slot"] = slots
+        detections["values"] = block[valid]
+        self._row_keys.extend(row_keys)
+        self._detections.extend(detections)
+
+    def detections(self):
+        """所有探测记录（DETECTION_DTYPE 结构化数组的视图，追加后失效）。"""
+        return self._detections.view()
+
+    def row_keys(self):
+        """所有宽表行的索引（ROW_KEY_DTYPE 结构化数组的视图，追加后失效）。"""
+        return self._row_keys.view()
+
+    @property
+    def nbytes(self):
+        """已用的存储字节数。"""
+        return self._row_keys.nbytes + self._detections.nbytes
+
+    def fill_rate(self):
+        """有探测的槽位占全部槽位的比例。"""
+        return self._detections.size / max(self._row_keys.size * self.max_targets, 1)
+
+    def iter_chunks(self):
+        """按写入顺序逐块还原为宽表（rows_to_arrays 格式），每块最多 chunk_rows 行。"""
+        row_keys, detections = self.row_keys(), self.detections()
+        offsets = np.concatenate([[0], np.cumsum(row_keys["num_detections"], dtype=np.int64)])
+        for start in range(0, len(row_keys), self.chunk_rows):
+            stop = min(start + self.chunk_rows, len(row_keys))
+            yield sparse_to_wide(row_keys[start:stop], detections[offsets[start]:offsets[stop]], self.max_targets)
+
+    def to_arrays(self, value_dtype=np.float64):
+        """还原为一组宽表列式数组（格式同 rows_to_arrays）。"""
+        return sparse_to_wide(self.row_keys(), self.detections(), self.max_targets, value_dtype)
+
+    def to_compact_arrays(self, value_dtype=np.float64):
+        """write_measurement_npz 用的紧凑形式，见 sparse_to_compact。"""
+        return sparse_to_compact(self.row_keys(), self.detections(), self.max_targets, value_dtype)
+
+    def clear(self):
+        """清空数据，保留已分配的空间。"""
+        self._row_keys.clear()
+        self._detections.clear()
+
+
+def write_detections_csv(filename, detection_chunks):
+    """
+    以长表 CSV 写出探测记录：每次探测一行 TimeStep, MissileID, SensorID, Slot 以及 8 个字段。
+    :param detection_chunks: DETECTION_DTYPE 结构化数组的可迭代对象
+    :return: 写出的记录数
+    """
+    count = 0
+    with open(filename, mode='w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["TimeStep", "MissileID", "SensorID", "Slot"] + FIELD_NAMES)
+        for detections in detection_chunks:
+            if len(detections) == 0:
+                continue
+            table = np.empty((len(detections), 4 + len(FIELD_NAMES)), dtype=object)
+            table[:, 0] = detections["time_step"].tolist()
+            table[:, 1] = detections["missile_id"].tolist()
+            table[:, 2] = detections["sensor_id"].tolist()
+            table[:, 3] = detections["slot"].tolist()
+            table[:, 4:] = detections["values"].tolist()
+            writer.writerows(table.tolist())
+            count += len(detections)
+    return count
+
+
+def read_detections_csv(filename):
+    """读取 write_detections_csv 写出的文件，返回 DETECTION_DTYPE 结构化数组。"""
+    table = np.loadtxt(filename, delimiter=",", skiprows=1, ndmin=2)
+    detections = np.empty(len(table), dtype=DETECTION_DTYPE)
+    detections["time_step"] = table[:, 0]
+    detections["missile_id"] = table[:, 1]
+    detections["sensor_id"] = table[:, 2]
+    detections["slot"] = table[:, 3]
+    detections["values"] = table[:, 4:]
+    return detections
+
+
+def measurement_csv_headers(max_targets):
+    """measurement_data.csv 的表头。"""
+    headers = ["TimeStep", "MissileID", "SensorID"]
+    for i in range(1, max_targets + 1):
+        headers.extend(f"Target{i}_{name}" for name in FIELD_NAMES)
+    return headers
+
+
+def ship_csv_headers(max_ships):
+    """ship_loc.csv 的表头。"""
+    headers = ["TimeStep"]
+    for i in range(1, max_ships + 1):
+        headers.extend([f"ship{i}_x", f"ship{i}_y", f"ship{i}_z"])
+    return headers
+
+
+class CsvStreamWriter:
+    """
+    后台线程写 CSV 的流式输出端，输出格式与 Missile.export_to_csv 完全相同。
+    仿真线程每 K 步调用一次 put() 把数据块交给写线程；队列有界，
+    写盘跟不上时 put() 会阻塞，从而保证驻留内存不随运行长度增长。
+    """
+
+    def __init__(self, measurement_filename, ship_loc_filename, max_targets, max_queue=8):
+        """
+        :param max_targets: 每行的目标槽位数（决定表头）
+        :param max_queue: 队列中最多等待写出的批次数
+        """
+        self.measurement_filename = measurement_filename
+        self.ship_loc_filename = ship_loc_filename
+        self.bytes_written = 0
+        self.rows_written = 0
+
+        self._measurement_file = open(measurement_filename, mode='w', newline='')
+        self._ship_file = open(ship_loc_filename, mode='w', newline='')
+        self._measurement_writer = csv.writer(self._measurement_file)
+        self._ship_writer = csv.writer(self._ship_file)
+        self._measurement_writer.writerow(measurement_csv_headers(max_targets))
+        self._ship_header_written = False
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="CsvStreamWriter", daemon=True)
+        self._thread.start()
+
+    def put(self, measurement_chunks, ship_rows, max_ships):
+        """
+        提交一批数据。
+        :param measurement_chunks: MeasurementTable.iter_chunks() 格式的列式数据块列表
+        :param ship_rows: ship_locations_data 格式的行列表
+        :param max_ships: 当前最大船舶数量（首次写船舶数据时用于生成表头）
+        """
+        if self._error is not None:
+            raise self._error
+        self._queue.put((measurement_chunks, ship_rows, max_ships))
+
+    def close(self):
+        """写完队列中剩余的数据并关闭文件。"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._measurement_file.close()
+        self._ship_file.close()
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                continue
+            try:
+                self._write(*item)
+            except Exception as e:  # 记录错误，在仿真线程下一次 put/close 时抛出
+                self._error = e
+
+    def _write(self, measurement_chunks, ship_rows, max_ships):
+        start = self._measurement_file.tell()
+        for chunk in measurement_chunks:
+            self._measurement_writer.writerows(arrays_to_rows(chunk))
+            self.rows_written += len(chunk["time_step"])
+        self._measurement_file.flush()
+        self.bytes_written += self._measurement_file.tell() - start
+
+        if ship_rows:
+            start = self._ship_file.tell()
+            if not self._ship_header_written:
+                self._ship_writer.writerow(ship_csv_headers(max_ships))
+                self._ship_header_written = True
+            self._ship_writer.writerows(ship_rows)
+            self._ship_file.flush()
+            self.bytes_written += self._ship_file.tell() - start
+
+
+def ship_rows_to_arrays(ship_rows, max_ships):
+    """
+    将 ship_locations_data 的行 [time_step, x1, y1, z1, ...] 转为数组，不足 max_ships 的部分为 NaN。
+    :return: dict，包含 ship_time_step (K,)、ship_positions (K, max_ships, 3) 和 ship_valid (K, max_ships)
+    """
+    table = np.full((len(ship_rows), 1 + 3 * max_ships), np.nan)
+    for i, row in enumerate(ship_rows):
+        table[i, :len(row)] = np.array(row, dtype=np.float64)
+    positions = table[:, 1:].reshape(len(ship_rows), max_ships, 3)
+    return {
+        "ship_time_step": table[:, 0].astype(np.int32),
+        "ship_positions": positions,
+        "ship_valid": ~np.isnan(positions[..., 0]),
+    }
+
+
+def write_measurement_npz(filename, measurement_arrays, ship_arrays, header, compressed=False):
+    """
+    写出列式二进制文件（NumPy .npz）。只保存有效槽位的测量值：
+    - valid (R, MAX_TARGETS) 有效掩码，values (N, 8) 为按行优先顺序排列的 N 个有效槽位的测量值
+    - time_step / missile_id / sensor_id 为整数列
+    - ship_time_step / ship_positions / ship_valid 为船舶真实位置
+    - header 为 JSON 格式的运行元数据
+
+    :param measurement_arrays: rows_to_arrays / MeasurementTable.to_arrays 的返回值，
+                               或 SparseDetectionTable.to_compact_arrays 的返回值（values 已是 (N, 8)）
+    :param ship_arrays: ship_rows_to_arrays 的返回值
+    :param header: 运行元数据字典（传感器误差表、MAX_TARGETS、NUM_SENSORS 等）
+    :param compressed: 是否使用 zip 压缩（更小但更慢）
+    """
+    header = dict(header, format_version=NPZ_FORMAT_VERSION, field_names=FIELD_NAMES)
+    arrays = dict(measurement_arrays)
+    if arrays["values"].ndim == 3:
+        arrays["values"] = measurement_arrays["values"][measurement_arrays["valid"]]
+    save = np.savez_compressed if compressed else np.savez
+    save(filename, header=np.array(json.dumps(header)), **arrays, **ship_arrays)
+
+
+def read_measurement_npz(filename, expand=True):
+    """
+    读取 write_measurement_npz 写出的文件。
+    :param expand: 为 True 时把 values 还原为 (R, MAX_TARGETS, 8)，无效槽位为 NaN；
+                   为 False 时保留文件中紧凑的 (N, 8) 形式
+    :return: (header, arrays)，header 为元数据字典，arrays 为数组名到数组的字典
+    """
+    with np.load(filename) as data:
+        header = json.loads(str(data["header"]))
+        arrays = {key: data[key] for key in data.files if key != "header"}
+    if header.get("format_version") != NPZ_FORMAT_VERSION:
+        raise ValueError(f"不支持的文件格式版本: {header.get('format_version')}")
+    if expand:
+        compact = arrays["values"]
+        values = np.full(arrays["valid"].shape + (compact.shape[-1],), np.nan, dtype=compact.dtype)
+        values[arrays["valid"]] = compact
+        arrays["values"] = values
+    return header, arrays
+
+
+class ReplayData:
+    """
+    回放用的测量数据：按行保存为 (行, 目标, 字段) 数组，并预先建立时间步索引，
+    按帧取数据为 O(1)。
+    """
+
+    def __init__(self, time_steps, row_starts, row_stops, values, target_names):
+        """
+        :param time_steps: (F,) 升序的时间步
+        :param row_starts: (F,) 每个时间步在 values 中的起始行
+        :param row_stops: (F,) 每个时间步在 values 中的结束行（不含）
+        :param values: (R, T, 8) 按时间步排序后的测量值，缺失为 NaN
+        :param target_names: 长度为 T 的目标名（Target1、Target2 ...）
+        """
+        self.time_steps = time_steps
+        self.row_starts = row_starts
+        self.row_stops = row_stops
+        self.values = values
+        self.target_names = target_names
+        self._frame_of_step = {int(t): i for i, t in enumerate(time_steps)}
+
+    def __len__(self):
+        return len(self.time_steps)
+
+    def frame(self, i):
+        """第 i 帧（第 i 个时间步的第一行）的测量值 (T, 8)。"""
+        return self.values[self.row_starts[i]]
+
+    def frame_rows(self, i):
+        """第 i 帧所有行的测量值 (rows, T, 8)。"""
+        return self.values[self.row_starts[i]:self.row_stops[i]]
+
+    def frame_index(self, time_step):
+        """时间步 -> 帧序号。"""
+        return self._frame_of_step[int(time_step)]
+
+
+def load_replay_csv(filename):
+    """
+    一次向量化解析宽表测量 CSV（measurement_data.csv / measurement_data_vis.csv 格式），
+    返回 ReplayData。表头之外多出的列会被忽略，空字段解析为 NaN。
+    """
+    import pandas as pd
+
+    with open(filename, newline='', encoding='utf-8-sig') as f:
+        header = [name.strip() for name in next(csv.reader(f))]
+    df = pd.read_csv(filename, usecols=range(len(header)), encoding='utf-8-sig', skipinitialspace=True)
+    df.columns = header
+
+    # 提取所有目标的前缀（Target1、Target2 ...），按编号排序
+    target_names = sorted({m.group(1) for m in (re.match(r'(Target\d+)_x$', c) for c in header) if m},
+                          key=lambda name: int(name[len("Target"):]))
+    columns = [f"{tp}_{field}" for tp in target_names for field in FIELD_NAMES]
+    values = df.reindex(columns=columns).to_numpy(dtype=np.float64)
+    values = values.reshape(len(df), len(target_names), len(FIELD_NAMES))
+
+    steps = pd.to_numeric(df["TimeStep"], errors="coerce").to_numpy()
+    keep = ~np.isnan(steps)
+    order = np.argsort(steps[keep], kind="stable")
+    steps = steps[keep][order]
+    values = values[keep][order]
+    time_steps, row_starts = np.unique(steps, return_index=True)
+    row_stops = np.append(row_starts[1:], len(steps))
+    return ReplayData(time_steps, row_starts, row_stops, values, target_names)
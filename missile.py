@@ -1,18 +1,190 @@
 import numpy as np
 import csv
-import random
 import math
 
+import measurement_io
+from instrumentation import NULL_INSTRUMENTATION
+from keyed_noise import KeyedNoise
+from sensor_schedule import SensorSchedule
+from spatial_index import UniformGridIndex
+from truth import TruthRecorder
+
+# 目标类型编码（向量化引擎内部使用，顺序与 all_targets 中的 ship/chaff/corner 一致）
+TARGET_SHIP = 0
+TARGET_CHAFF = 1
+TARGET_CORNER = 2
+
+# 不同目标类型置信度的高斯分布参数，下标为目标类型编码
+CONFIDENCE_MEAN = np.array([0.8, 0.3, 0.3])
+CONFIDENCE_STD = np.array([0.1, 0.2, 0.2])
+
+# 每个目标的输出字段数: x, y, z, major_axis, minor_axis, angle_rad, scatter, confidence
+NUM_FIELDS = 8
+
+
+def error_ellipse(c_xx, c_xy, c_yy):
+    """
+    2×2 对称协方差矩阵 [[c_xx, c_xy], [c_xy, c_yy]] 的误差椭圆（逐元素向量化）。
+    闭式特征值：λ = (a+c)/2 ± sqrt(((a-c)/2)² + b²)，主轴方向 θ = atan2(2b, a-c) / 2
+    :return: (major_axis, minor_axis, angle_rad)，轴长为 2·sqrt(λ)
+    """
+    half_trace = 0.5 * (c_xx + c_yy)
+    disc = np.sqrt((0.5 * (c_xx - c_yy)) ** 2 + c_xy * c_xy)
+    eig_major = half_trace + disc
+    eig_minor = half_trace - disc
+    major_axis = np.where(eig_major > 0, 2.0 * np.sqrt(np.maximum(eig_major, 0.0)), 0.0)
+    minor_axis = np.where(eig_minor > 0, 2.0 * np.sqrt(np.maximum(eig_minor, 0.0)), 0.0)
+    angle_rad = 0.5 * np.arctan2(2.0 * c_xy, c_xx - c_yy)
+    return major_axis, minor_axis, angle_rad
+
+
+def measure_pairs(origins, errors_deg, targets, kinds, detection_prob, rng):
+    """
+    批量测量核心：对 P 个 (导弹, 传感器) 观测点和 T 个目标一次性完成
+    距离/方位/仰角计算、角度误差抽样、反投影以及误差椭圆计算。
+
+    误差椭圆使用 2×2 对称矩阵的闭式特征分解，代替逐目标调用 np.linalg.eig。
+
+    :param origins: (P, 3) 观测点(导弹)位置
+    :param errors_deg: (P,) 每个观测点传感器的角度误差(度)
+    :param targets: (T, 3) 所有观测点共用的目标真实位置，或 (P, T, 3) 每个观测点各自的目标
+    :param kinds: (T,) 或 (P, T) 目标类型编码 (TARGET_SHIP / TARGET_CHAFF / TARGET_CORNER)
+    :param detection_prob: 探测概率
+    :param rng: numpy.random.Generator，所有随机误差从它抽样
+    :return: (values, detected)
+             values 形状 (P, T, 8)：x, y, z, major_axis, minor_axis, angle_rad, scatter, confidence
+             detected 形状 (P, T) 的布尔数组
+    """
+    P = origins.shape[0]
+    T = targets.shape[-2]
+    if targets.ndim == 2:
+        targets = targets[None, :, :]
+
+    # (A) 是否探测到目标
+    detected = rng.random((P, T)) <= detection_prob
+
+    # 1) 导弹->目标的 3D 距离 & 真实方位角 / 仰角
+    d = targets - origins[:, None, :]
+    dx, dy, dz = d[..., 0], d[..., 1], d[..., 2]
+    xy_dist = np.sqrt(dx * dx + dy * dy)
+    r_true = np.sqrt(dx * dx + dy * dy + dz * dz)
+    az_true = np.arctan2(dy, dx)
+    el_true = np.where(xy_dist > 1e-8, np.arctan2(dz, xy_dist), 0.0)
+
+    # 2) 角度误差：半径 [0, err] 均匀、相位 [0, 2π) 均匀
+    err = errors_deg[:, None]
+    r_rand = rng.uniform(0.0, 1.0, (P, T)) * err
+    phi = rng.uniform(0.0, 2 * np.pi, (P, T))
+    az_meas = az_true + np.radians(r_rand * np.cos(phi))
+    el_meas = el_true + np.radians(r_rand * np.sin(phi))
+
+    # 3) 反投影到 (x_meas, y_meas, z_meas)
+    cos_el_meas = np.cos(el_meas)
+    x_meas = origins[:, 0:1] + r_true * cos_el_meas * np.cos(az_meas)
+    y_meas = origins[:, 1:2] + r_true * cos_el_meas * np.sin(az_meas)
+    z_meas = origins[:, 2:3] + r_true * np.sin(el_meas)
+
+    # 4) 误差传播：Cov_xy = J · diag(σ², σ²) · Jᵀ = σ² · J·Jᵀ
+    cos_el, sin_el = np.cos(el_true), np.sin(el_true)
+    cos_az, sin_az = np.cos(az_true), np.sin(az_true)
+    dx_daz = -r_true * cos_el * sin_az
+    dx_del = -r_true * sin_el * cos_az
+    dy_daz = r_true * cos_el * cos_az
+    dy_del = -r_true * sin_el * sin_az
+
+    sigma2 = np.radians(err) ** 2
+    c_xx = sigma2 * (dx_daz * dx_daz + dx_del * dx_del)
+    c_xy = sigma2 * (dx_daz * dy_daz + dx_del * dy_del)
+    c_yy = sigma2 * (dy_daz * dy_daz + dy_del * dy_del)
+
+    major_axis, minor_axis, angle_rad = error_ellipse(c_xx, c_xy, c_yy)
+
+    scatter = np.broadcast_to(err, (P, T))
+
+    # 5) 置信度（不同目标类型 => 不同分布），截断到 [0, 1]
+    kinds = np.asarray(kinds, dtype=np.intp)
+    confidence = rng.normal(CONFIDENCE_MEAN[kinds], CONFIDENCE_STD[kinds], (P, T))
+    confidence = np.clip(confidence, 0.0, 1.0)
+
+    values = np.stack([x_meas, y_meas, z_meas, major_axis, minor_axis, angle_rad, scatter, confidence], axis=-1)
+    return values, detected
+
+
 class Missile:
     MAX_TARGETS = 20   # 每个传感器测量的最大目标数
     NUM_SENSORS = 5    # 每个导弹拥有的传感器数量
+    ENGINES = ("vectorized", "loop")  # 可选的测量引擎
 
-    def __init__(self, missile_positions, sensor_categories=None):
+    TARGET_SELECTIONS = ("first", "nearest")  # 目标选取方式
+    NOISE_MODES = ("stream", "keyed")  # 测量噪声来源
+    RECORD_FORMATS = ("wide", "sparse")  # 测量数据的存储方式
+    FUSION_MODES = ("off", "alongside", "instead")  # 多传感器融合行：不输出 / 与原始行一起输出 / 代替原始行
+
+    def __init__(self, missile_positions, sensor_categories=None, engine="vectorized", rng=None,
+                 target_selection="first", max_range=None, fov_deg=None, noise="stream", noise_key=None,
+                 record_format="wide", sensor_periods=None, sensor_phases=None, fusion="off",
+                 fusion_method="information"):
         """
         :param missile_positions: (N, 3) 数组，表示所有导弹在三维空间的初始位置
         :param sensor_categories: 传感器类别列表, 例如 [0.1, 0.2, 0.3, 0.4, 0.6]
                                  表示不同的角度测量误差(度)可供选用
+        :param engine: 测量引擎。"vectorized" 对整个 (导弹, 传感器, 目标) 张量做批量 NumPy 计算；
+                       "loop" 为逐目标计算的原始实现，用于统计特性的交叉验证
+        :param rng: numpy.random.Generator，传感器误差分配和测量噪声都从它抽样；为 None 时新建一个
+        :param target_selection: "first" 按 船/箔条/角反射器 顺序取前 MAX_TARGETS 个目标；
+                                 "nearest" 用空间索引为每枚导弹取最近的 MAX_TARGETS 个目标（仅向量化引擎）
+        :param max_range: "nearest" 模式下的最大探测距离，None 表示不限
+        :param fov_deg: "nearest" 模式下的视场全角(度)，以 headings 为轴；None 表示不限
+        :param noise: "stream" 测量噪声从 rng 顺序抽样；"keyed" 由 (noise_key, 时间步, 导弹, 传感器, 槽位)
+                      决定（见 keyed_noise），任意时间段可单独重新生成（仅向量化引擎）
+        :param noise_key: "keyed" 模式的 64 位噪声密钥
+        :param record_format: "wide" 每行固定 MAX_TARGETS 个槽位（MeasurementTable）；
+                              "sparse" 每次实际探测一条记录（measurement_io.SparseDetectionTable），
+                              内存与探测填充率成正比，导出时按需还原为宽表
+        :param sensor_periods: 传感器采样周期（时间步）：整数、按传感器编号的序列或 {误差类别: 周期} 字典，
+                               见 sensor_schedule；None 表示每步都采样。只输出到期传感器的行（仅向量化引擎）
+        :param sensor_phases: 采样相位偏移，格式同 sensor_periods
+        :param fusion: "off" 只输出每个传感器的行；"alongside" 每枚导弹每步再输出一行 5 个传感器的融合估计
+                       （sensor_id 为 fusion.FUSED_SENSOR_ID）；"instead" 只输出融合行（仅向量化引擎）
+        :param fusion_method: 融合方法，"information"（逆协方差加权）或 "ci"（协方差交叉），见 fusion.fuse_block
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f"engine必须是{self.ENGINES}之一")
+        if target_selection not in self.TARGET_SELECTIONS:
+            raise ValueError(f"target_selection必须是{self.TARGET_SELECTIONS}之一")
+        if target_selection != "first" and engine != "vectorized":
+            raise ValueError("只有向量化引擎支持按最近距离选取目标")
+        if noise not in self.NOISE_MODES:
+            raise ValueError(f"noise必须是{self.NOISE_MODES}之一")
+        if noise == "keyed" and (engine != "vectorized" or noise_key is None):
+            raise ValueError("keyed 噪声需要向量化引擎和 noise_key")
+        if record_format not in self.RECORD_FORMATS:
+            raise ValueError(f"record_format必须是{self.RECORD_FORMATS}之一")
+        if (sensor_periods is not None or sensor_phases is not None) and engine != "vectorized":
+            raise ValueError("只有向量化引擎支持多速率传感器调度")
+        if fusion not in self.FUSION_MODES:
+            raise ValueError(f"fusion必须是{self.FUSION_MODES}之一")
+        if fusion != "off":
+            from fusion import FUSION_METHODS
+            if engine != "vectorized":
+                raise ValueError("只有向量化引擎支持多传感器融合")
+            if fusion_method not in FUSION_METHODS:
+                raise ValueError(f"fusion_method必须是{FUSION_METHODS}之一")
+        self.fusion = fusion
+        self.fusion_method = fusion_method
+        self.sensor_periods = sensor_periods
+        self.sensor_phases = sensor_phases
+        self.noise = noise
+        self.noise_key = noise_key
+        self.engine = engine
+        self.target_selection = target_selection
+        self.max_range = max_range
+        self.fov_deg = fov_deg
+        self.target_index = UniformGridIndex()
+        # 每枚导弹当前的朝向 (N, 3)，由主程序在制导后更新；用于视场门限
+        self.headings = None
+        self.rng = rng if rng is not None else np.random.default_rng()
+
         self.missiles = missile_positions
         self.num_missiles = self.missiles.shape[0]
 
@@ -28,16 +200,47 @@ class Missile:
         # 对于每枚导弹，随机选取 "NUM_SENSORS" 个互不相同的误差，分别对应 5 个传感器
         self.missile_sensor_errors = []  # 形状: [ [err_sen1, err_sen2, ..., err_sen5], [...], ... ]
         for _ in range(self.num_missiles):
-            chosen_errors = random.sample(self.sensor_categories, self.NUM_SENSORS)
+            chosen_errors = self.rng.choice(self.sensor_categories, self.NUM_SENSORS, replace=False).tolist()
             self.missile_sensor_errors.append(chosen_errors)
+        # 向量化引擎使用的误差矩阵，形状 (num_missiles, NUM_SENSORS)
+        self.sensor_error_matrix = np.array(self.missile_sensor_errors, dtype=np.float64).reshape(
+            self.num_missiles, self.NUM_SENSORS)
+        # 多速率调度（按类别设定时依赖上面的误差分配）；None 表示所有传感器每步采样
+        self.schedule = None
+        self._build_schedule()
+
+        # 用于输出的测量数据（每元素是一行：time_step, missile_id, sensor_id, ...），按列分块或按探测稀疏存储
+        self.record_format = record_format
+        if record_format == "sparse":
+            self.measurement_data = measurement_io.SparseDetectionTable(self.MAX_TARGETS, NUM_FIELDS)
+        else:
+            self.measurement_data = measurement_io.MeasurementTable(self.MAX_TARGETS, NUM_FIELDS)
 
-        # 用于输出到 CSV 的测量数据（每元素是一行：time_step, missile_id, sensor_id, ...）
-        self.measurement_data = []
-
-        # 用于记录船舶真实位置数据
-        self.ship_locations_data = []
+        # 用于记录船舶真实位置数据（按块预分配的数组，迭代得到 [time_step, x1, y1, z1, ...] 行）；
+        # record_truth 为 False 时不记录（例如由 SimulationCore 以压缩形式记录）
+        self.ship_locations_data = TruthRecorder()
+        self.record_truth = True
         self.max_ships = 0  # 动态追踪最大船舶数量
 
+        # 最近一个时间步的测量块，供实时接口（如共享内存环形缓冲区）读取：
+        # last_block (num_missiles, NUM_SENSORS, MAX_TARGETS, 8)，last_valid (num_missiles, NUM_SENSORS, MAX_TARGETS)
+        self.last_block = None
+        self.last_valid = None
+        # fusion 不为 "off" 时最近一步的融合结果：last_fused (num_missiles, MAX_TARGETS, 8)，last_fused_valid
+        self.last_fused = None
+        self.last_fused_valid = None
+
+        # 插桩：计数器（测量的目标数、因 detection_prob 未探测到的数量、输出行数、写出字节数）
+        self.instrumentation = NULL_INSTRUMENTATION
+
+        # 并行测量：ShardedMeasurement 工作进程池，见 enable_parallel()
+        self.parallel = None
+
+        # 流式输出：设置后每 stream_flush_every 步把内存中的数据交给后台写线程
+        self.stream_writer = None
+        self.stream_flush_every = 0
+        self._steps_since_flush = 0
+
     def generate_sensor_measurements(
         self,
         carriers_positions,
@@ -64,9 +267,140 @@ class Missile:
         ]
         """
 
-        # 将所有可能目标(船 + 箔条 + 角反射器)汇总
         detection_prob = getattr(self, "detection_prob", 0.9)
 
+        # 更新最大船舶数量
+        num_ships = carriers_positions.shape[0]
+        if num_ships > self.max_ships:
+            self.max_ships = num_ships
+
+        # 记录当前时间步的船舶真实位置（船舶数量少于之前的最大数量时，输出行补 None）
+        if self.record_truth:
+            self.ship_locations_data.append(time_step, carriers_positions, width=self.max_ships)
+
+        # 对每枚导弹进行测量
+        if self.engine == "vectorized":
+            measured = self._generate_measurements_vectorized(
+                carriers_positions, chaff_positions, corner_positions, detection_prob, time_step)
+        else:
+            measured = self._generate_measurements_loop(
+                carriers_positions, chaff_positions, corner_positions, detection_prob, time_step)
+
+        inst = self.instrumentation
+        if inst.enabled:
+            due = np.ones((self.num_missiles, self.NUM_SENSORS), dtype=bool) if self.schedule is None \
+                else self.schedule.due_mask(time_step)
+            rows = 0 if self.fusion == "instead" else int(due.sum())
+            if self.fusion != "off":
+                rows += int(due.any(axis=1).sum())
+            inst.count("rows_emitted", rows)
+            inst.count("targets_measured", measured)
+            inst.count("detections_dropped", measured - int(self.last_valid.sum()))
+
+        if self.stream_writer is not None:
+            self._steps_since_flush += 1
+            if self._steps_since_flush >= self.stream_flush_every:
+                self.flush_stream()
+            if inst.enabled:
+                inst.gauge("bytes_written", self.stream_writer.bytes_written)
+
+    def start_streaming(self, measurement_filename="measurement_data.csv", ship_loc_filename="ship_loc.csv",
+                        flush_every=50, max_queue=8):
+        """
+        开启流式输出模式：每 flush_every 步把测量数据和船舶位置交给后台线程写入 CSV，
+        然后清空内存中的数据，驻留内存不随运行长度增长。输出格式与 export_to_csv 相同。
+        注意：船舶位置表头在首次写出时按当时的 max_ships 生成。
+
+        :param flush_every: 每多少个时间步写出一次
+        :param max_queue: 后台写线程的队列上限（批次数），写盘跟不上时仿真会等待
+        """
+        if self.stream_writer is not None:
+            self.stop_streaming()
+        self.stream_writer = measurement_io.CsvStreamWriter(
+            measurement_filename, ship_loc_filename, self.MAX_TARGETS, max_queue=max_queue)
+        self.stream_flush_every = flush_every
+        self._steps_since_flush = 0
+        # 开启前已经积累的数据也一并写出
+        self.flush_stream()
+
+    def flush_stream(self):
+        """把内存中尚未写出的数据交给后台写线程。"""
+        chunks = list(self.measurement_data.iter_chunks())
+        ship_rows = self.ship_locations_data.rows()
+        self.measurement_data.clear()
+        self.ship_locations_data.clear()
+        self._steps_since_flush = 0
+        if chunks or ship_rows:
+            self.stream_writer.put(chunks, ship_rows, self.max_ships)
+
+    def stop_streaming(self):
+        """写出剩余数据，等待后台线程结束并关闭文件。"""
+        if self.stream_writer is None:
+            return
+        self.flush_stream()
+        writer = self.stream_writer
+        self.stream_writer = None
+        writer.close()
+        print(f"Measurement data streamed to {writer.measurement_filename} ({writer.rows_written} rows).")
+        print(f"Ship locations streamed to {writer.ship_loc_filename}.")
+
+    def get_state(self):
+        """
+        导出可恢复的状态：传感器误差、朝向、最大船舶数量和随机数发生器。
+        导弹位置由调用方（SimulationCore）保存；已记录的测量数据不包含在内。
+        :return: dict
+        """
+        return {
+            "sensor_error_matrix": self.sensor_error_matrix.copy(),
+            "headings": None if self.headings is None else self.headings.copy(),
+            "max_ships": self.max_ships,
+            "rng": self.rng.bit_generator.state,
+        }
+
+    def set_state(self, state):
+        """从 get_state() 的结果恢复；导弹数量必须一致。"""
+        self.set_sensor_errors(state["sensor_error_matrix"])
+        self.headings = None if state["headings"] is None else np.array(state["headings"], dtype=np.float64)
+        self.max_ships = int(state["max_ships"])
+        self.rng.bit_generator.state = state["rng"]
+
+    def enable_parallel(self, num_workers):
+        """
+        按导弹分片，由 num_workers 个常驻工作进程并行计算测量（需要 keyed 噪声，结果与串行逐位一致）。
+        结束后调用 disable_parallel() 停止工作进程。
+        :return: parallel_measure.ShardedMeasurement
+        """
+        from parallel_measure import ShardedMeasurement
+
+        self.disable_parallel()
+        self.parallel = ShardedMeasurement(self, num_workers)
+        return self.parallel
+
+    def disable_parallel(self):
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
+
+    def set_sensor_errors(self, sensor_error_matrix):
+        """替换传感器误差分配 (num_missiles, NUM_SENSORS)，按类别设定的调度随之更新。"""
+        self.sensor_error_matrix = np.array(sensor_error_matrix, dtype=np.float64).reshape(
+            self.num_missiles, self.NUM_SENSORS)
+        self.missile_sensor_errors = self.sensor_error_matrix.tolist()
+        self._build_schedule()
+
+    def _build_schedule(self):
+        schedule = None
+        if self.sensor_periods is not None or self.sensor_phases is not None:
+            schedule = SensorSchedule.from_spec(self.sensor_error_matrix, self.sensor_periods, self.sensor_phases)
+        self.schedule = schedule
+
+    def _generate_measurements_loop(self, carriers_positions, chaff_positions, corner_positions,
+                                    detection_prob, time_step):
+        """
+        原始的逐目标测量实现：导弹 × 传感器 × 目标 三重循环。
+        :return: 本步测量的 (传感器, 目标) 对数
+        """
+        # 将所有可能目标(船 + 箔条 + 角反射器)汇总
         all_targets = []
         for pos in carriers_positions:
             all_targets.append((pos, "ship"))
@@ -75,22 +409,7 @@ class Missile:
         for pos in corner_positions:
             all_targets.append((pos, "corner"))
 
-        # 更新最大船舶数量
-        num_ships = carriers_positions.shape[0]
-        if num_ships > self.max_ships:
-            self.max_ships = num_ships
-
-        # 记录当前时间步的船舶真实位置
-        ship_row = [time_step]
-        for pos in carriers_positions:
-            ship_row.extend([pos[0], pos[1], pos[2]])
-        # 如果当前时间步船舶数量少于之前的最大数量，填充 None
-        if num_ships < self.max_ships:
-            padding_ships = self.max_ships - num_ships
-            ship_row.extend([None, None, None] * padding_ships)
-        self.ship_locations_data.append(ship_row)
-
-        # 对每枚导弹进行测量
+        step_rows = []
         for missile_id, missile_pos in enumerate(self.missiles):
 
             # 对该导弹的每个传感器都做测量
@@ -105,7 +424,7 @@ class Missile:
                         break  # 达到最大目标数量
 
                     # (A) 是否探测到目标
-                    if random.random() > detection_prob:
+                    if self.rng.random() > detection_prob:
                         # 探测失败 => 填充 None
                         sub_result.extend([None, None, None, None, None, None, None, None])
                     else:
@@ -123,8 +442,8 @@ class Missile:
                             el_true = math.atan2(dz, xy_dist)
 
                         # 2) 生成角度误差
-                        r_rand = random.uniform(0, sensor_error_deg)
-                        phi = random.uniform(0, 2*math.pi)
+                        r_rand = self.rng.uniform(0, sensor_error_deg)
+                        phi = self.rng.uniform(0, 2*math.pi)
 
                         error_az_deg = r_rand * math.cos(phi)
                         error_el_deg = r_rand * math.sin(phi)
@@ -169,18 +488,18 @@ class Missile:
                         if eigvals[1] > 0:
                             minor_axis = 2.0 * math.sqrt(eigvals[1])
 
-                        v_major = eigvecs[:, 0]
+                        v_major = eigvecs[:, idx[0]]  # 与排序后的最大特征值对应的特征向量
                         angle_rad = math.atan2(v_major[1], v_major[0])
 
                         measurement_scatter = sensor_error_deg
 
                         # 5) 置信度（不同目标类型 => 不同分布）
                         if target_type == "ship":
-                            confidence = random.gauss(0.8, 0.1)
+                            confidence = self.rng.normal(0.8, 0.1)
                         elif target_type == "chaff":
-                            confidence = random.gauss(0.3, 0.2)
+                            confidence = self.rng.normal(0.3, 0.2)
                         else:  # corner
-                            confidence = random.gauss(0.3, 0.2)
+                            confidence = self.rng.normal(0.3, 0.2)
 
                         confidence = max(0.0, min(1.0, confidence))
 
@@ -200,6 +519,153 @@ class Missile:
                 # 组装行 => [time_step, missile_id, sensor_id, ...sub_result...]
                 row = [time_step, missile_id, sensor_id] + sub_result
                 self.measurement_data.append(row)
+                step_rows.append(row)
+
+        arrays = measurement_io.rows_to_arrays(step_rows, self.MAX_TARGETS, NUM_FIELDS)
+        shape = (self.num_missiles, self.NUM_SENSORS, self.MAX_TARGETS)
+        self.last_block = arrays["values"].reshape(shape + (NUM_FIELDS,))
+        self.last_valid = arrays["valid"].reshape(shape)
+        return self.num_missiles * self.NUM_SENSORS * min(len(all_targets), self.MAX_TARGETS)
+
+    def _generate_measurements_vectorized(self, carriers_positions, chaff_positions, corner_positions,
+                                          detection_prob, time_step):
+        """
+        向量化测量实现：一次性计算整个 (导弹, 传感器, 目标) 张量，输出行格式与循环实现完全相同。
+        :return: 本步测量的 (传感器, 目标) 对数
+        """
+        if self.parallel is not None:
+            block, valid, measured = self.parallel.measure(carriers_positions, chaff_positions, corner_positions,
+                                                           detection_prob, time_step)
+        else:
+            block, valid, measured = self.measure_step(carriers_positions, chaff_positions, corner_positions,
+                                                       detection_prob, time_step)
+        due = None if self.schedule is None else self.schedule.due_mask(time_step)
+        if self.fusion != "instead":
+            self.measurement_data.append_block(time_step, block, valid, due)
+        if self.fusion != "off":
+            # 每枚导弹一行融合估计；有调度时只对有到期传感器的导弹输出
+            from fusion import FUSED_SENSOR_ID, fuse_block
+            with self.instrumentation.phase("measurements.fusion"):
+                fused, fused_valid = fuse_block(block, valid, self.fusion_method)
+            row_mask = None if due is None else due.any(axis=1, keepdims=True)
+            self.measurement_data.append_block(time_step, fused[:, None], fused_valid[:, None], row_mask,
+                                               sensor_ids=[FUSED_SENSOR_ID])
+            self.last_fused, self.last_fused_valid = fused, fused_valid
+        self.last_block, self.last_valid = block, valid
+        return measured
+
+    def measure_step(self, carriers_positions, chaff_positions, corner_positions, detection_prob, time_step,
+                     missile_ids=None):
+        """
+        计算一个时间步的测量块，不记录到 measurement_data。
+        :param missile_ids: 只计算这些导弹（下标数组）；None 表示全部。"keyed" 噪声下结果与全部计算时的对应行相同
+        :return: (block, valid, measured)，block/valid 的第一维是 missile_ids 中的导弹；
+                 有调度时未到期传感器的槽位全部无效
+        """
+        due = None if self.schedule is None else self.schedule.due_mask(time_step, missile_ids)
+        if self.target_selection == "nearest":
+            # 用空间索引为每枚导弹挑选最近的 MAX_TARGETS 个目标（可选距离/视场门限）
+            targets, kinds = self.collect_targets(carriers_positions, chaff_positions, corner_positions,
+                                                  truncate=False)
+            self.target_index.build(targets)
+            missiles = self.missiles if missile_ids is None else self.missiles[missile_ids]
+            headings = self.headings
+            if headings is not None and missile_ids is not None:
+                headings = headings[missile_ids]
+            idx, _ = self.target_index.query_knn(missiles, self.MAX_TARGETS, max_range=self.max_range,
+                                                 headings=headings, fov_deg=self.fov_deg)
+            slot_mask = idx >= 0
+            idx = np.where(slot_mask, idx, 0)
+            if len(targets) == 0:
+                targets, kinds = np.zeros((1, 3)), np.zeros(1, dtype=np.int8)
+            block, valid = self.compute_measurement_block(targets[idx], kinds[idx], detection_prob, slot_mask,
+                                                          time_step, missile_ids, due)
+            if due is None:
+                measured = int(slot_mask.sum()) * self.NUM_SENSORS
+            else:
+                measured = int((slot_mask.sum(axis=1) * due.sum(axis=1)).sum())
+        else:
+            targets, kinds = self.collect_targets(carriers_positions, chaff_positions, corner_positions)
+            block, valid = self.compute_measurement_block(targets, kinds, detection_prob, None,
+                                                          time_step, missile_ids, due)
+            num_due = block.shape[0] * self.NUM_SENSORS if due is None else int(due.sum())
+            measured = num_due * len(targets)
+        return block, valid, measured
+
+    def collect_targets(self, carriers_positions, chaff_positions, corner_positions, truncate=True):
+        """
+        将船、箔条、角反射器按顺序拼接为目标数组，truncate 为 True 时截断到 MAX_TARGETS 个。
+        :return: (targets, kinds)，targets 形状 (T, 3)，kinds 为 (T,) 的目标类型编码
+        """
+        groups = [
+            (np.asarray(carriers_positions, dtype=np.float64).reshape(-1, 3), TARGET_SHIP),
+            (np.asarray(chaff_positions, dtype=np.float64).reshape(-1, 3), TARGET_CHAFF),
+            (np.asarray(corner_positions, dtype=np.float64).reshape(-1, 3), TARGET_CORNER),
+        ]
+        targets = np.concatenate([g for g, _ in groups])
+        kinds = np.concatenate([np.full(len(g), k, dtype=np.int8) for g, k in groups])
+        if truncate:
+            targets, kinds = targets[:self.MAX_TARGETS], kinds[:self.MAX_TARGETS]
+        return targets, kinds
+
+    def compute_measurement_block(self, targets, kinds, detection_prob=0.9, slot_mask=None, time_step=0,
+                                  missile_ids=None, due=None):
+        """
+        计算所有导弹所有传感器对给定目标的测量块。
+        :param targets: (T, 3) 所有导弹共用的目标真实位置，或 (num_missiles, T, 3) 每枚导弹各自的目标，
+                        T <= MAX_TARGETS
+        :param kinds: (T,) 或 (num_missiles, T) 目标类型编码
+        :param slot_mask: (num_missiles, T) 布尔数组，False 的槽位没有目标；None 表示全部有目标
+        :param time_step: 时间步（"keyed" 噪声的寻址坐标之一）
+        :param missile_ids: 只计算这些导弹；此时上面各参数中的 num_missiles 维为 len(missile_ids)
+        :param due: (num_missiles, NUM_SENSORS) 布尔数组，只计算为 True 的传感器；None 表示全部
+        :return: (block, valid)
+                 block 形状 (num_missiles, NUM_SENSORS, MAX_TARGETS, 8)，未探测/无目标处为 NaN；
+                 valid 形状 (num_missiles, NUM_SENSORS, MAX_TARGETS)，True 表示该槽位有测量值
+        """
+        S = self.NUM_SENSORS
+        missiles, errors = np.asarray(self.missiles, dtype=np.float64), self.sensor_error_matrix
+        if missile_ids is not None:
+            missile_ids = np.asarray(missile_ids, dtype=np.int64)
+            missiles, errors = missiles[missile_ids], errors[missile_ids]
+        M = len(missiles)
+        origins = np.repeat(missiles, S, axis=0)  # (M*S, 3)
+        errors = errors.reshape(-1)               # (M*S,)
+        missile_of_row = np.repeat(np.arange(self.num_missiles) if missile_ids is None else missile_ids, S)
+        sensor_of_row = np.tile(np.arange(S), M)
+        if targets.ndim == 3:
+            # 每枚导弹各自的目标 => 展开到 (导弹, 传感器) 观测点
+            targets = np.repeat(targets, S, axis=0)
+            kinds = np.repeat(kinds, S, axis=0)
+        if slot_mask is not None:
+            slot_mask = np.repeat(slot_mask, S, axis=0)
+
+        # 多速率调度：只对到期的 (导弹, 传感器) 观测点计算
+        rows = None
+        if due is not None:
+            rows = np.flatnonzero(due)
+            origins, errors = origins[rows], errors[rows]
+            missile_of_row, sensor_of_row = missile_of_row[rows], sensor_of_row[rows]
+            if targets.ndim == 3:
+                targets, kinds = targets[rows], kinds[rows]
+            if slot_mask is not None:
+                slot_mask = slot_mask[rows]
+
+        if self.noise == "keyed":
+            rng = KeyedNoise(self.noise_key, time_step, missile_of_row, sensor_of_row)
+        else:
+            rng = self.rng
+        values, detected = measure_pairs(origins, errors, targets, kinds, detection_prob, rng)
+        T = values.shape[1]
+        if slot_mask is not None:
+            detected &= slot_mask
+
+        block = np.full((M * S, self.MAX_TARGETS, NUM_FIELDS), np.nan)
+        valid = np.zeros((M * S, self.MAX_TARGETS), dtype=bool)
+        out = slice(None) if rows is None else rows
+        block[out, :T] = np.where(detected[..., None], values, np.nan)
+        valid[out, :T] = detected
+        return block.reshape(M, S, self.MAX_TARGETS, NUM_FIELDS), valid.reshape(M, S, self.MAX_TARGETS)
 
     def export_to_csv(self, measurement_filename="measurement_data.csv", ship_loc_filename="ship_loc.csv"):
         """
@@ -212,7 +678,14 @@ class Missile:
         
         ship_loc.csv 格式:
         [TimeStep, ship1_x, ship1_y, ship1_z, ship2_x, ship2_y, ship2_z, ..., shipN_x, shipN_y, shipN_z]
+
+        若已通过 start_streaming 开启流式输出，数据已在运行过程中写入 start_streaming 指定的文件，
+        这里只写出剩余部分并关闭文件，忽略文件名参数。
         """
+        if self.stream_writer is not None:
+            self.stop_streaming()
+            return
+
         # 导出 measurement_data.csv
         if self.measurement_data:
             with open(measurement_filename, mode='w', newline='') as csv_file:
@@ -230,8 +703,8 @@ class Missile:
 
                 writer.writerow(headers)  # 写入表头
 
-                for row in self.measurement_data:
-                    writer.writerow(row)
+                for chunk in self.measurement_data.iter_chunks():
+                    writer.writerows(measurement_io.arrays_to_rows(chunk))
 
             print(f"Measurement data exported to {measurement_filename}.")
 
@@ -250,7 +723,59 @@ class Missile:
 
                 writer.writerow(headers)  # 写入表头
 
-                for ship_row in self.ship_locations_data:
-                    writer.writerow(ship_row)
+                for ship_rows in self._iter_ship_rows():
+                    writer.writerows(ship_rows)
+
+            print(f"Ship locations exported to {ship_loc_filename}.")
+
+    def _iter_ship_rows(self, chunk_steps=4096):
+        truth = self.ship_locations_data
+        for start in range(0, len(truth), chunk_steps):
+            yield truth.rows(start, min(start + chunk_steps, len(truth)))
 
-            print(f"Ship locations exported to {ship_loc_filename}.")
\ No newline at end of file
+    def export_to_npz(self, filename="measurement_data.npz", value_dtype=np.float32, compressed=False):
+        """
+        以列式二进制格式导出测量数据和船舶真实位置（单个 .npz 文件），代替宽表 CSV：
+        - time_step / missile_id / sensor_id 为整数列
+        - valid (R, MAX_TARGETS) 为有效掩码，values 只保存有效槽位的 8 个字段（value_dtype 浮点数）
+        - ship_time_step / ship_positions / ship_valid 为船舶真实位置
+        - header 保存传感器误差表、MAX_TARGETS、NUM_SENSORS 等运行元数据
+        读取请使用 measurement_io.read_measurement_npz。
+
+        :param value_dtype: 测量值的浮点类型，np.float32 或 np.float64
+        :param compressed: 是否额外做 zip 压缩
+        """
+        header = {
+            "MAX_TARGETS": self.MAX_TARGETS,
+            "NUM_SENSORS": self.NUM_SENSORS,
+            "num_missiles": self.num_missiles,
+            "max_ships": self.max_ships,
+            "engine": self.engine,
+            "sensor_categories": [float(e) for e in self.sensor_categories],
+            "missile_sensor_errors": [[float(e) for e in errors] for errors in self.missile_sensor_errors],
+            "value_dtype": np.dtype(value_dtype).name,
+        }
+        if self.fusion != "off":
+            header["fusion"] = self.fusion
+            header["fusion_method"] = self.fusion_method
+        if self.record_format == "sparse":
+            measurement_arrays = self.measurement_data.to_compact_arrays(value_dtype)
+        else:
+            measurement_arrays = self.measurement_data.to_arrays(value_dtype)
+        ship_arrays = self.ship_locations_data.to_arrays(self.max_ships)
+        measurement_io.write_measurement_npz(filename, measurement_arrays, ship_arrays, header,
+                                             compressed=compressed)
+        print(f"Measurement data exported to {filename}.")
+
+    def export_detections_csv(self, filename="detections.csv", chunk_size=65536):
+        """
+        以长表 CSV 导出测量数据：每次实际探测一行（TimeStep, MissileID, SensorID, Slot, 8 个字段），
+        不输出未探测的槽位。读取请使用 measurement_io.read_detections_csv。
+        """
+        if self.record_format == "sparse":
+            detections = self.measurement_data.detections()
+            chunks = (detections[i:i + chunk_size] for i in range(0, len(detections), chunk_size))
+        else:
+            chunks = (measurement_io.wide_to_sparse(chunk)[1] for chunk in self.measurement_data.iter_chunks())
+        count = measurement_io.write_detections_csv(filename, chunks)
+        print(f"Detections exported to {filename} ({count} records).")
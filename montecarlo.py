@@ -0,0 +1,103 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from simulation_core import SimulationCore
+
+
+def make_scenarios(num_runs, base_seed=0, **params):
+    """
+    生成 num_runs 个场景，第 k 个场景的种子为 base_seed + k，其余参数相同。
+    :param params: 传给 SimulationCore 的参数（carrier_count、missile_count 等）
+    :return: 场景字典列表，每个字典包含 run_id、seed 和 params
+    """
+    return [{"run_id": k, "seed": base_seed + k, "params": dict(params)} for k in range(num_runs)]
+
+
+def run_scenario(scenario, output_dir=None, keep_data=False):
+    """
+    在当前进程中运行一个场景（进程池的工作函数）。
+    每个场景用自己的种子构造 SimulationCore，因此同一种子的结果与在哪个进程、以何种顺序运行无关。
+
+    :param scenario: make_scenarios 生成的场景字典
+    :param output_dir: 若给定，则把该场景的测量数据和船舶位置导出到此目录
+    :param keep_data: 是否在结果中返回完整的测量行和船舶位置（会经过进程间序列化）
+    :return: 结果字典
+    """
+    core = SimulationCore(seed=scenario["seed"], **scenario["params"])
+    start = time.perf_counter()
+    steps = core.run()
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "run_id": scenario["run_id"],
+        "seed": scenario["seed"],
+        "params": scenario["params"],
+        "steps": steps,
+        "elapsed": elapsed,
+        "measurement_rows": len(core.missile.measurement_data),
+        "chaff_appear_count": core.chaff_appear_count,
+        "corner_reflector_appear_count": core.corner_reflector_appear_count,
+    }
+    if output_dir is not None:
+        prefix = os.path.join(output_dir, f"run_{scenario['run_id']:05d}")
+        core.export_to_csv(f"{prefix}_measurement_data.csv", f"{prefix}_ship_loc.csv")
+    if keep_data:
+        result["measurement_data"] = core.missile.measurement_data
+        result["ship_locations_data"] = core.missile.ship_locations_data
+    return result
+
+
+def _run_scenario_star(args):
+    return run_scenario(*args)
+
+
+def run_batch(scenarios, workers=None, output_dir=None, keep_data=False):
+    """
+    把多个相互独立的场景分发到进程池并行运行。
+    :param scenarios: 场景字典列表
+    :param workers: 进程数，None 时为 CPU 核数；1 时在当前进程串行运行
+    :return: 按 run_id 排序的结果列表
+    """
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    tasks = [(scenario, output_dir, keep_data) for scenario in scenarios]
+
+    if workers == 1:
+        results = [_run_scenario_star(task) for task in tasks]
+    else:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_scenario_star, tasks, chunksize=chunksize))
+    return sorted(results, key=lambda r: r["run_id"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="蒙特卡洛批量仿真：多进程并行运行多个独立场景")
+    parser.add_argument("--runs", type=int, default=16, help="场景数量")
+    parser.add_argument("--base-seed", type=int, default=0, help="第 k 个场景使用种子 base_seed + k")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认 CPU 核数")
+    parser.add_argument("--carriers", type=int, default=2, help="船的数量")
+    parser.add_argument("--missiles", type=int, default=1, help="导弹数量")
+    parser.add_argument("--steps", type=int, default=500, help="每个场景的时间步数")
+    parser.add_argument("--output-dir", default=None, help="每个场景的 CSV 输出目录，不指定则不导出")
+    args = parser.parse_args()
+
+    scenarios = make_scenarios(
+        args.runs, base_seed=args.base_seed,
+        carrier_count=args.carriers, missile_count=args.missiles, max_steps=args.steps,
+    )
+    start = time.perf_counter()
+    results = run_batch(scenarios, workers=args.workers, output_dir=args.output_dir)
+    elapsed = time.perf_counter() - start
+
+    for r in results:
+        print(f"run {r['run_id']:5d}  seed {r['seed']:6d}  steps {r['steps']}  rows {r['measurement_rows']}  "
+              f"{r['elapsed']:.3f} s")
+    print(f"{len(results)} runs in {elapsed:.3f} s ({len(results) / max(elapsed, 1e-9):.2f} runs/s).")
+
+
+if __name__ == "__main__":
+    main()
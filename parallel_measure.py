@@ -0,0 +1,215 @@
+"""
+单次仿真内的并行测量：把 Missile.missiles 按导弹切分为若干分片，由常驻的工作进程分别计算测量块。
+
+每个时间步主进程把导弹位置、朝向、传感器误差以及船/箔条/角反射器位置写入共享内存，
+通过管道向各工作进程发送一条很小的控制消息（时间步、各类目标数量）；工作进程调用
+Missile.measure_step(..., missile_ids=分片) 把结果直接写入共享的输出缓冲区，不做任何 pickle。
+
+测量噪声必须是 "keyed" 模式（按 时间步/导弹/传感器/槽位 寻址，见 keyed_noise）：
+这样每个分片的结果与串行计算的对应行逐位一致，与分片数无关。
+"""
+import multiprocessing
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from missile import NUM_FIELDS, Missile
+
+
+class _SharedArray:
+    """一块共享内存上的 numpy 数组。"""
+
+    def __init__(self, shape, dtype, name=None):
+        nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=nbytes if name is None else 0)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+        self.spec = (self.shm.name, tuple(shape), np.dtype(dtype).str)
+
+    @classmethod
+    def attach(cls, spec):
+        name, shape, dtype = spec
+        return cls(shape, dtype, name=name)
+
+    def close(self, unlink=False):
+        self.array = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _missile_spec(missile):
+    """在工作进程中重建 Missile 所需的构造参数（传感器误差另经共享内存同步）。"""
+    return {
+        "num_missiles": missile.num_missiles,
+        "sensor_categories": list(missile.sensor_categories),
+        "target_selection": missile.target_selection,
+        "max_range": missile.max_range,
+        "fov_deg": missile.fov_deg,
+        "noise": missile.noise,
+        "noise_key": missile.noise_key,
+        "sensor_periods": missile.sensor_periods,
+        "sensor_phases": missile.sensor_phases,
+    }
+
+
+def _worker_main(conn, spec, shard, buffers):
+    """
+    工作进程：等待主进程的每步消息，计算本分片的测量块写入共享输出缓冲区。
+    :param shard: 本进程负责的导弹下标（连续区间）
+    :param buffers: 各共享数组的 (名称, 形状, dtype)
+    """
+    arrays = {key: _SharedArray.attach(value) for key, value in buffers.items()}
+    targets = None
+    try:
+        M = spec.pop("num_missiles")
+        missile = Missile(np.zeros((M, 3)), engine="vectorized", **spec)
+        missile.missiles = arrays["missiles"].array
+        errors_version = -1
+        lo, hi = int(shard[0]), int(shard[-1]) + 1
+        while True:
+            message = conn.recv()
+            if message[0] == "stop":
+                break
+            _, time_step, counts, detection_prob, headings, version, targets_spec = message
+            try:
+                if targets is None or targets.spec != targets_spec:
+                    if targets is not None:
+                        targets.close()
+                    targets = _SharedArray.attach(targets_spec)
+                if version != errors_version:
+                    missile.set_sensor_errors(arrays["errors"].array)
+                    errors_version = version
+                missile.headings = arrays["headings"].array if headings else None
+
+                n_ships, n_chaff, n_corner = counts
+                positions = targets.array
+                block, valid, measured = missile.measure_step(
+                    positions[:n_ships], positions[n_ships:n_ships + n_chaff],
+                    positions[n_ships + n_chaff:n_ships + n_chaff + n_corner],
+                    detection_prob, time_step, shard)
+                arrays["block"].array[lo:hi] = block
+                arrays["valid"].array[lo:hi] = valid
+                conn.send(("done", measured))
+            except Exception:
+                conn.send(("error", traceback.format_exc()))
+    finally:
+        if targets is not None:
+            targets.close()
+        for shared in arrays.values():
+            shared.close()
+        conn.close()
+
+
+class ShardedMeasurement:
+    """
+    常驻工作进程池，并行计算 Missile 的测量块。由 Missile.enable_parallel 创建，
+    结束时调用 close()。导弹数量和测量配置在创建后不能改变；传感器误差的变化（如从检查点恢复）会自动同步。
+    """
+
+    def __init__(self, missile, num_workers, start_method="spawn"):
+        """
+        :param missile: 使用 keyed 噪声的向量化 Missile
+        :param num_workers: 工作进程数（分片数），不超过导弹数
+        :param start_method: multiprocessing 启动方式；默认 spawn，避免 fork 时复制仿真线程的锁状态
+        """
+        if missile.engine != "vectorized" or missile.noise != "keyed":
+            raise ValueError("并行测量需要向量化引擎和 keyed 噪声，才能与串行结果一致")
+        M, S, T = missile.num_missiles, missile.NUM_SENSORS, missile.MAX_TARGETS
+        self.missile = missile
+        self.num_workers = max(1, min(num_workers, M))
+        self.shards = np.array_split(np.arange(M), self.num_workers)
+
+        self._arrays = {
+            "missiles": _SharedArray((M, 3), np.float64),
+            "headings": _SharedArray((M, 3), np.float64),
+            "errors": _SharedArray((M, S), np.float64),
+            "block": _SharedArray((M, S, T, NUM_FIELDS), np.float64),
+            "valid": _SharedArray((M, S, T), np.bool_),
+        }
+        self._targets = _SharedArray((64, 3), np.float64)
+        self._retired = []  # 已被替换、等工作进程重新附加后释放的目标缓冲区
+        self._errors_version = 0
+        self._arrays["errors"].array[...] = missile.sensor_error_matrix
+        self._errors_snapshot = missile.sensor_error_matrix.copy()
+
+        ctx = multiprocessing.get_context(start_method)
+        buffers = {key: shared.spec for key, shared in self._arrays.items()}
+        spec = _missile_spec(missile)
+        self._conns, self._processes = [], []
+        for shard in self.shards:
+            parent, child = ctx.Pipe()
+            process = ctx.Process(target=_worker_main, args=(child, dict(spec), shard, buffers),
+                                  name="MeasurementWorker", daemon=True)
+            process.start()
+            child.close()
+            self._conns.append(parent)
+            self._processes.append(process)
+
+    def _write_targets(self, groups):
+        n = sum(len(g) for g in groups)
+        if n > len(self._targets.array):
+            # 容量不足时换一块更大的共享内存，工作进程按消息中的名称重新附加
+            old = self._targets
+            self._targets = _SharedArray((max(2 * len(old.array), n), 3), np.float64)
+            self._retired.append(old)
+        offset = 0
+        for g in groups:
+            self._targets.array[offset:offset + len(g)] = g
+            offset += len(g)
+
+    def measure(self, carriers_positions, chaff_positions, corner_positions, detection_prob, time_step):
+        """
+        与 Missile.measure_step 相同的结果，由各工作进程分片计算。
+        :return: (block, valid, measured)，block/valid 为主进程自己的拷贝
+        """
+        missile = self.missile
+        groups = [np.asarray(g, dtype=np.float64).reshape(-1, 3)
+                  for g in (carriers_positions, chaff_positions, corner_positions)]
+        self._write_targets(groups)
+        self._arrays["missiles"].array[...] = missile.missiles
+        has_headings = missile.headings is not None
+        if has_headings:
+            self._arrays["headings"].array[...] = missile.headings
+        if not np.array_equal(missile.sensor_error_matrix, self._errors_snapshot):
+            self._arrays["errors"].array[...] = missile.sensor_error_matrix
+            self._errors_snapshot = missile.sensor_error_matrix.copy()
+            self._errors_version += 1
+
+        message = ("step", time_step, tuple(len(g) for g in groups), detection_prob, has_headings,
+                   self._errors_version, self._targets.spec)
+        for conn in self._conns:
+            conn.send(message)
+        measured, errors = 0, []
+        for conn in self._conns:
+            status, value = conn.recv()
+            if status == "done":
+                measured += value
+            else:
+                errors.append(value)
+        if errors:
+            raise RuntimeError("测量工作进程出错:\n" + errors[0])
+        for old in self._retired:
+            old.close(unlink=True)
+        self._retired = []
+        return self._arrays["block"].array.copy(), self._arrays["valid"].array.copy(), measured
+
+    def close(self):
+        """停止工作进程并释放共享内存。"""
+        if not self._processes:
+            return
+        for conn in self._conns:
+            try:
+                conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._conns:
+            conn.close()
+        self._processes, self._conns = [], []
+        for shared in list(self._arrays.values()) + [self._targets] + self._retired:
+            shared.close(unlink=True)
+        self._retired = []
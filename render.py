@@ -0,0 +1,174 @@
+"""
+离线渲染回放：把测量 CSV 的时间步范围切成若干段，由进程池中的工作进程用 Agg 后端（无需显示器）并行渲染，
+每帧的内容与 simulation.py 的动画相同（当前点、误差椭圆、置信度文本）。
+
+- 找得到 ffmpeg 时，每段帧以原始 RGBA 通过管道送给一个 ffmpeg 进程编码为分段视频，最后无重新编码地拼接成一个视频；
+- 找不到 ffmpeg 时，每帧保存为 PNG（frame_000000.png ...），可以之后自行编码。
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.image as mpimg  # noqa: E402
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+
+from measurement_io import load_replay_csv  # noqa: E402
+from simulation import draw_frame, setup_figure  # noqa: E402
+
+# 工作进程中的回放数据（由 _init_worker 设置，每个进程只传一次）
+_replay = None
+
+
+def _init_worker(replay):
+    global _replay
+    _replay = replay
+
+
+def split_frames(num_frames, parts):
+    """把 [0, num_frames) 切成最多 parts 段连续区间 [(start, stop), ...]。"""
+    bounds = np.linspace(0, num_frames, max(1, parts) + 1).astype(int)
+    return [(int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+
+def iter_frames(replay, start, stop, dpi=100):
+    """
+    渲染 [start, stop) 帧，逐帧产出 (H, W, 4) uint8 RGBA 图像。
+    坐标轴等静态部分只绘制一次，之后每帧恢复背景再重绘更新过的图形元素（与交互动画的 blitting 相同）。
+    """
+    fig, ax, artists = setup_figure(replay)
+    fig.set_dpi(dpi)
+    canvas = fig.canvas
+    canvas.draw()  # animated=True 的图形元素不在这里绘制
+    background = canvas.copy_from_bbox(fig.bbox)
+    try:
+        for frame in range(start, stop):
+            canvas.restore_region(background)
+            for artist in draw_frame(artists, replay, frame):
+                ax.draw_artist(artist)
+            yield np.asarray(canvas.buffer_rgba())
+    finally:
+        plt.close(fig)
+
+
+def _ffmpeg_command(ffmpeg, width, height, fps, output):
+    return [ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{height}",
+            "-r", str(fps), "-i", "-", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-c:v", "libx264",
+            "-pix_fmt", "yuv420p", output]
+
+
+def render_part(task):
+    """
+    渲染一段帧（工作进程的入口）。
+    :param task: dict(start, stop, dpi, fps, ffmpeg, output)；ffmpeg 为 None 时 output 为 PNG 目录，
+                 否则为该段视频文件
+    :return: 渲染的帧数
+    """
+    start, stop = task["start"], task["stop"]
+    frames = iter_frames(_replay, start, stop, task["dpi"])
+    if task["ffmpeg"] is None:
+        for frame, image in zip(range(start, stop), frames):
+            mpimg.imsave(os.path.join(task["output"], f"frame_{frame:06d}.png"), image)
+        return stop - start
+
+    first = next(frames)
+    height, width = first.shape[:2]
+    process = subprocess.Popen(_ffmpeg_command(task["ffmpeg"], width, height, task["fps"], task["output"]),
+                               stdin=subprocess.PIPE)
+    try:
+        process.stdin.write(first.tobytes())
+        for image in frames:
+            process.stdin.write(image.tobytes())
+    finally:
+        process.stdin.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg 编码 {task['output']} 失败（返回码 {process.returncode}）")
+    return stop - start
+
+
+def concat_videos(ffmpeg, parts, output):
+    """用 ffmpeg concat 分离器把各段视频按顺序直接拼接（不重新编码）。"""
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        for part in parts:
+            f.write(f"file '{os.path.abspath(part)}'\n")
+        list_file = f.name
+    try:
+        subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_file,
+                        "-c", "copy", output], check=True)
+    finally:
+        os.remove(list_file)
+
+
+def render(replay, output, workers=None, parts=None, fps=5, dpi=100, start=0, stop=None, frames_dir=None):
+    """
+    并行渲染回放。
+    :param replay: measurement_io.ReplayData
+    :param output: 视频文件名（需要 ffmpeg）
+    :param workers: 进程数，None 时为 CPU 核数；1 时在当前进程串行渲染
+    :param parts: 时间步范围切成的段数，None 时等于进程数
+    :param frames_dir: 不为 None 时不编码视频，把 PNG 帧写入该目录；找不到 ffmpeg 时默认为 output 去掉扩展名的目录
+    :return: (渲染帧数, 输出路径)
+    """
+    workers = workers or os.cpu_count() or 1
+    stop = len(replay) if stop is None else min(stop, len(replay))
+    ranges = [(start + lo, start + hi) for lo, hi in split_frames(max(stop - start, 0), parts or workers)]
+    ffmpeg = shutil.which("ffmpeg") if frames_dir is None else None
+    if ffmpeg is None:
+        frames_dir = frames_dir or os.path.splitext(output)[0] + "_frames"
+        os.makedirs(frames_dir, exist_ok=True)
+        part_dir = None
+        tasks = [{"output": frames_dir} for _ in ranges]
+    else:
+        part_dir = tempfile.mkdtemp(prefix="render_", dir=os.path.dirname(os.path.abspath(output)))
+        tasks = [{"output": os.path.join(part_dir, f"part_{i:04d}.mp4")} for i in range(len(ranges))]
+    for task, (lo, hi) in zip(tasks, ranges):
+        task.update(start=lo, stop=hi, dpi=dpi, fps=fps, ffmpeg=ffmpeg)
+
+    try:
+        if workers == 1:
+            _init_worker(replay)
+            rendered = sum(render_part(task) for task in tasks)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(replay,)) as pool:
+                rendered = sum(pool.map(render_part, tasks))
+        if ffmpeg is None:
+            return rendered, frames_dir
+        concat_videos(ffmpeg, [task["output"] for task in tasks], output)
+        return rendered, output
+    finally:
+        if part_dir is not None:
+            shutil.rmtree(part_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用多个进程离线渲染回放（Agg 后端，无需显示器），有 ffmpeg 时输出视频")
+    parser.add_argument("filename", nargs="?", default="measurement_data_vis.csv", help="宽表测量 CSV")
+    parser.add_argument("--output", default="replay.mp4", help="输出视频文件")
+    parser.add_argument("--frames-dir", default=None,
+                        help="只输出 PNG 帧到该目录，不编码视频（找不到 ffmpeg 时自动使用 <output>_frames）")
+    parser.add_argument("--workers", type=int, default=None, help="渲染进程数，默认为 CPU 核数")
+    parser.add_argument("--parts", type=int, default=None, help="时间步范围切成的段数，默认等于进程数")
+    parser.add_argument("--fps", type=float, default=5, help="视频帧率（交互动画为每帧 200 ms，即 5 帧/秒）")
+    parser.add_argument("--dpi", type=int, default=100, help="渲染分辨率")
+    parser.add_argument("--start", type=int, default=0, help="起始帧")
+    parser.add_argument("--stop", type=int, default=None, help="结束帧（不含）")
+    args = parser.parse_args()
+
+    replay = load_replay_csv(args.filename)
+    started = time.perf_counter()
+    rendered, path = render(replay, args.output, workers=args.workers, parts=args.parts, fps=args.fps, dpi=args.dpi,
+                            start=args.start, stop=args.stop, frames_dir=args.frames_dir)
+    elapsed = time.perf_counter() - started
+    print(f"Rendered {rendered} frames in {elapsed:.2f} s ({rendered / max(elapsed, 1e-9):.1f} frames/s) to {path}.")
+
+
+if __name__ == "__main__":
+    main()
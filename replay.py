@@ -0,0 +1,245 @@
+"""
+确定性回放：运行时只记录重现测量所需的最少信息，需要时再按时间段 / 导弹 / 传感器重新生成测量行。
+
+ReplayLog 保存：构造参数、种子熵、导弹速度、keyed 噪声密钥、每枚导弹的传感器误差分配，
+以及每次干扰释放事件（spawn_chaff / spawn_corner_reflector 的结果）。一次运行的日志只有几 KB，
+与步数 × 导弹数 × 5 行、每行 163 列的测量文件无关。
+
+MeasurementReplayer 按日志重建 SimulationCore，只推进运动学（step(measure=False)），
+在需要的时间步调用 Missile.measure_step 重新计算测量块。测量噪声为 keyed 模式
+（按 时间步/导弹/传感器/槽位 寻址，见 keyed_noise），因此任意切片与完整运行的对应行逐位一致。
+运动学状态每 keyframe_every 步缓存一个快照，随机访问时从最近的快照开始推进。
+"""
+import argparse
+import csv
+import json
+
+import numpy as np
+
+import measurement_io
+from fusion import FUSED_SENSOR_ID, fuse_block
+from missile import NUM_FIELDS, Missile
+from simulation_core import SimulationCore
+
+REPLAY_FORMAT_VERSION = 1
+
+
+def _to_list(value):
+    return None if value is None else np.asarray(value).tolist()
+
+
+class ReplayLog:
+    """一次运行的回放日志。用 from_core() 创建并挂到 core.recorder 上，运行结束后 save()。"""
+
+    def __init__(self, config, entropy, missile_speed, noise_key, sensor_error_matrix, detection_prob=0.9,
+                 spawns=None):
+        """
+        :param config: SimulationCore.get_config() 的结果
+        :param entropy: 种子熵（SimulationCore.entropy）
+        :param missile_speed: 导弹速度，标量或 (missile_count,) 列表
+        :param noise_key: keyed 噪声密钥
+        :param sensor_error_matrix: (missile_count, NUM_SENSORS) 传感器误差分配
+        :param detection_prob: 探测概率
+        :param spawns: 干扰释放事件列表，每个事件为 {"time_step", "kind", "lifetime", "positions"}
+                       或 {"time_step", "kind", "lifetime", "owners", "offsets"}
+        """
+        self.config = config
+        self.entropy = entropy
+        self.missile_speed = missile_speed
+        self.noise_key = noise_key
+        self.sensor_error_matrix = np.asarray(sensor_error_matrix, dtype=np.float64)
+        self.detection_prob = detection_prob
+        self.spawns = list(spawns or [])
+
+    @classmethod
+    def from_core(cls, core):
+        """
+        为尚未开始运行的 core 创建日志，并设置为它的 recorder。
+        core 必须使用 keyed 噪声，否则测量无法单独重新生成。
+        """
+        if core.noise != "keyed":
+            raise ValueError("回放日志需要 noise=\"keyed\"")
+        if core.time_step != 0:
+            raise ValueError("回放日志必须从第 0 步开始记录")
+        log = cls(core.get_config(), core.entropy, _to_list(core.missile_speed), core.noise_key,
+                  core.missile.sensor_error_matrix.copy(), getattr(core.missile, "detection_prob", 0.9))
+        core.recorder = log
+        return log
+
+    def record_spawn(self, time_step, kind, lifetime, positions=None, owners=None, offsets=None):
+        """SimulationCore.deploy_decoys 调用：记录一次干扰释放。"""
+        event = {"time_step": int(time_step), "kind": int(kind), "lifetime": int(lifetime)}
+        if owners is not None:
+            event["owners"] = _to_list(owners)
+            event["offsets"] = _to_list(offsets)
+        else:
+            event["positions"] = _to_list(positions)
+        self.spawns.append(event)
+
+    def spawn_schedule(self):
+        """{时间步: [事件, ...]}，供 SimulationCore.spawn_schedule 使用。"""
+        schedule = {}
+        for event in self.spawns:
+            schedule.setdefault(event["time_step"], []).append(event)
+        return schedule
+
+    def save(self, filename):
+        data = {
+            "format_version": REPLAY_FORMAT_VERSION,
+            "config": self.config,
+            "entropy": self.entropy,
+            "missile_speed": self.missile_speed,
+            "noise_key": self.noise_key,
+            "sensor_error_matrix": self.sensor_error_matrix.tolist(),
+            "detection_prob": self.detection_prob,
+            "spawns": self.spawns,
+        }
+        with open(filename, "w") as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename) as f:
+            data = json.load(f)
+        version = data.pop("format_version", None)
+        if version != REPLAY_FORMAT_VERSION:
+            raise ValueError(f"不支持的回放日志格式版本{version}")
+        return cls(**data)
+
+
+def _chunk(time_step, missile_ids, sensor_ids, block, valid, keep=None):
+    """
+    一个时间步的测量块 -> 列式数组，行按 (导弹, 传感器) 顺序。
+    :param keep: (导弹, 传感器) 布尔数组，只保留为 True 的行（与 append_block 的 row_mask 相同）；None 表示全部
+    """
+    M, S = block.shape[:2]
+    rows = slice(None) if keep is None else keep.reshape(-1)
+    return {
+        "time_step": np.full(M * S, time_step, dtype=np.int32)[rows],
+        "missile_id": np.repeat(missile_ids.astype(np.int32), S)[rows],
+        "sensor_id": np.tile(sensor_ids.astype(np.int16), M)[rows],
+        "values": block.reshape(M * S, Missile.MAX_TARGETS, NUM_FIELDS)[rows],
+        "valid": valid.reshape(M * S, Missile.MAX_TARGETS)[rows],
+    }
+
+
+class MeasurementReplayer:
+    """按回放日志重新生成任意时间段、导弹、传感器的测量。"""
+
+    def __init__(self, log, keyframe_every=1000):
+        """
+        :param log: ReplayLog 或其文件名
+        :param keyframe_every: 每多少步缓存一次运动学快照
+        """
+        if isinstance(log, str):
+            log = ReplayLog.load(log)
+        self.log = log
+        self.keyframe_every = keyframe_every
+
+        config = dict(log.config, seed=log.entropy)
+        speed = log.missile_speed
+        self.core = SimulationCore(missile_speed=speed if np.ndim(speed) == 0 else np.asarray(speed), **config)
+        if self.core.noise_key != log.noise_key:
+            raise ValueError("回放日志的噪声密钥与种子不一致")
+        self.core.spawn_schedule = log.spawn_schedule()
+        missile = self.core.missile
+        missile.set_sensor_errors(log.sensor_error_matrix)
+        missile.detection_prob = log.detection_prob
+        self._keyframes = {0: self.core.get_state()}
+
+    @property
+    def max_steps(self):
+        return self.core.max_steps
+
+    def _seek(self, time_step):
+        """把 core 推进到 time_step 步开始前的状态。"""
+        core = self.core
+        start = max(t for t in self._keyframes if t <= time_step)
+        if not start <= core.time_step <= time_step:
+            core.set_state(self._keyframes[start])
+        while core.time_step < time_step:
+            self._advance()
+
+    def _advance(self):
+        core = self.core
+        if core.time_step % self.keyframe_every == 0 and core.time_step not in self._keyframes:
+            self._keyframes[core.time_step] = core.get_state()
+        core.step(measure=False)
+
+    def blocks(self, start=0, stop=None, missiles=None):
+        """
+        逐步重新生成测量块。
+        :param start, stop: 时间步范围 [start, stop)，stop 为 None 时到 max_steps
+        :param missiles: 导弹下标列表，None 表示全部
+        :return: 生成器，每步产出 (time_step, block, valid)，block 形状 (len(missiles), NUM_SENSORS, MAX_TARGETS, 8)
+        """
+        core = self.core
+        if stop is None or (core.max_steps is not None and stop > core.max_steps):
+            if core.max_steps is None:
+                raise ValueError("max_steps为None时必须指定stop")
+            stop = core.max_steps
+        missile_ids = None if missiles is None else np.asarray(missiles, dtype=np.int64)
+        for t in range(start, stop):
+            self._seek(t)
+            self._advance()
+            block, valid, _ = core.missile.measure_step(
+                core.carrier.get_positions(), core.chaff_positions, core.current_corner_abs_positions,
+                self.log.detection_prob, t, missile_ids)
+            yield t, block, valid
+
+    def arrays(self, start=0, stop=None, missiles=None, sensors=None):
+        """
+        重新生成测量数据，格式同 measurement_io.rows_to_arrays（列式数组）。
+        有多速率调度时只输出到期的 (导弹, 传感器) 行；开启融合时按记录时的方式输出融合行
+        （sensor_id 为 FUSED_SENSOR_ID，"instead" 模式下没有原始行），与运行时记录的行一致。
+        :param sensors: 传感器下标列表，可包含 FUSED_SENSOR_ID 选择融合行；None 表示全部
+        """
+        missile = self.core.missile
+        missile_ids = np.arange(self.core.missile_count) if missiles is None else np.asarray(missiles)
+        sensor_ids = np.arange(Missile.NUM_SENSORS) if sensors is None else np.asarray(sensors)
+        include_fused = missile.fusion != "off" and (sensors is None or FUSED_SENSOR_ID in sensor_ids)
+        sensor_ids = sensor_ids[sensor_ids >= 0] if missile.fusion != "instead" else sensor_ids[:0]
+        chunks = []
+        for t, block, valid in self.blocks(start, stop, None if missiles is None else missile_ids):
+            due = None if missile.schedule is None else missile.schedule.due_mask(
+                t, None if missiles is None else missile_ids)
+            if len(sensor_ids):
+                keep = None if due is None else due[:, sensor_ids]
+                chunks.append(_chunk(t, missile_ids, sensor_ids, block[:, sensor_ids], valid[:, sensor_ids], keep))
+            if include_fused:
+                # 融合使用该导弹全部传感器的测量，与 sensors 的选择无关
+                fused, fused_valid = fuse_block(block, valid, missile.fusion_method)
+                keep = None if due is None else due.any(axis=1, keepdims=True)
+                chunks.append(_chunk(t, missile_ids, np.array([FUSED_SENSOR_ID]), fused[:, None],
+                                     fused_valid[:, None], keep))
+        if not chunks:
+            return measurement_io.rows_to_arrays([], Missile.MAX_TARGETS, NUM_FIELDS)
+        return {key: np.concatenate([c[key] for c in chunks]) for key in chunks[0]}
+
+    def rows(self, start=0, stop=None, missiles=None, sensors=None):
+        """重新生成测量行，格式与 Missile.measurement_data 的行相同（无效槽位为 None）。"""
+        return measurement_io.arrays_to_rows(self.arrays(start, stop, missiles, sensors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按回放日志重新生成一段测量数据")
+    parser.add_argument("log", help="simulation_core.py --record 生成的回放日志")
+    parser.add_argument("--start", type=int, default=0, help="起始时间步")
+    parser.add_argument("--stop", type=int, default=None, help="结束时间步（不含），默认到最后")
+    parser.add_argument("--missiles", type=int, nargs="+", default=None, help="导弹编号")
+    parser.add_argument("--sensors", type=int, nargs="+", default=None,
+                        help=f"传感器编号（{FUSED_SENSOR_ID} 为融合行）")
+    parser.add_argument("--out", default="replay_measurements.csv", help="输出 CSV 文件")
+    args = parser.parse_args()
+
+    replayer = MeasurementReplayer(args.log)
+    rows = replayer.rows(args.start, args.stop, args.missiles, args.sensors)
+    with open(args.out, mode='w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(measurement_io.measurement_csv_headers(Missile.MAX_TARGETS))
+        writer.writerows(rows)
+    print(f"Replayed {len(rows)} measurement rows to {args.out}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+多速率传感器调度：每个传感器（或每种精度类别的传感器）有自己的更新周期和相位，
+每个时间步只计算到期的传感器，测量开销随实际采样率变化，而不是 步数 × 导弹数 × 5。
+
+到期判断是向量化的掩码：(time_step - phase) % period == 0，形状 (导弹, 传感器)。
+"""
+import numpy as np
+
+
+def _parse_spec(spec, error_matrix, default):
+    """
+    把周期/相位的设定展开为 (导弹, 传感器) 整数矩阵。
+    :param spec: None（全部为 default）；整数（全部相同）；长度为 NUM_SENSORS 的序列（按传感器编号）；
+                 或 {误差类别: 值} 字典（按传感器的精度类别，未列出的类别取 default；键可以是字符串，便于 JSON 保存）
+    :param error_matrix: (num_missiles, NUM_SENSORS) 传感器误差分配
+    """
+    shape = error_matrix.shape
+    if spec is None:
+        return np.full(shape, default, dtype=np.int64)
+    if isinstance(spec, dict):
+        values = np.full(shape, default, dtype=np.int64)
+        for category, value in spec.items():
+            values[np.isclose(error_matrix, float(category))] = int(value)
+        return values
+    values = np.asarray(spec, dtype=np.int64)
+    if values.ndim == 1 and len(values) != shape[1]:
+        raise ValueError(f"按传感器设定时需要{shape[1]}个值")
+    return np.broadcast_to(values, shape).copy()
+
+
+class SensorSchedule:
+    """(导弹, 传感器) 的采样周期与相位。"""
+
+    def __init__(self, periods, phases=None):
+        """
+        :param periods: (num_missiles, NUM_SENSORS) 正整数采样周期（时间步）
+        :param phases: 同形状的相位偏移，None 表示全部为 0
+        """
+        self.periods = np.asarray(periods, dtype=np.int64)
+        self.phases = np.zeros_like(self.periods) if phases is None else np.broadcast_to(
+            np.asarray(phases, dtype=np.int64), self.periods.shape).copy()
+        if np.any(self.periods < 1):
+            raise ValueError("采样周期必须是正整数")
+        self.phases %= self.periods
+
+    @classmethod
+    def from_spec(cls, error_matrix, periods=None, phases=None):
+        """
+        按设定构造调度，设定格式见 _parse_spec，例如：
+            SensorSchedule.from_spec(errors, periods=[1, 2, 2, 4, 4])            # 按传感器编号
+            SensorSchedule.from_spec(errors, periods={0.2: 1, 0.8: 5}, phases={0.8: 2})  # 按精度类别
+        """
+        error_matrix = np.asarray(error_matrix, dtype=np.float64)
+        return cls(_parse_spec(periods, error_matrix, 1), _parse_spec(phases, error_matrix, 0))
+
+    @property
+    def every_step(self):
+        """是否所有传感器每步都采样（此时等价于没有调度）。"""
+        return bool(np.all(self.periods == 1))
+
+    def due_mask(self, time_step, missile_ids=None):
+        """
+        本步到期的传感器。
+        :param missile_ids: 只取这些导弹的行；None 表示全部
+        :return: (num_missiles, NUM_SENSORS) 布尔数组
+        """
+        periods, phases = self.periods, self.phases
+        if missile_ids is not None:
+            periods, phases = periods[missile_ids], phases[missile_ids]
+        return (time_step - phases) % periods == 0
+
+    def samples_per_step(self):
+        """平均每步采样的 (导弹, 传感器) 数。"""
+        return float(np.sum(1.0 / self.periods))
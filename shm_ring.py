@@ -0,0 +1,343 @@
+"""
+共享内存环形缓冲区：仿真运行时把每个时间步的测量块和船舶真实位置写入 POSIX 共享内存，
+外部程序（C++ 等）按固定的二进制布局直接映射读取，不需要拷贝和解析。
+
+二进制布局（全部小端，偏移单位为字节）
+========================================
+
+文件头，共 64 字节：
+
+    偏移  类型      字段
+    0     char[8]   magic          固定为 b"MSIMRING"
+    8     uint32    version        布局版本，当前为 1
+    12    uint32    header_size    文件头长度（64），第 0 个槽位从这里开始
+    16    uint32    num_slots      槽位数 N
+    20    uint32    slot_size      每个槽位的字节数（64 的整数倍）
+    24    uint32    num_missiles   M
+    28    uint32    num_sensors    S
+    32    uint32    max_targets    T
+    36    uint32    num_fields     F（8：x, y, z, MajorAxis, MinorAxis, AngleRad, Scatter, Confidence）
+    40    uint32    max_ships      C
+    44    uint32    values_offset  槽位内测量值的偏移
+    48    uint32    valid_offset   槽位内有效掩码的偏移
+    52    uint32    ships_offset   槽位内船舶位置的偏移
+    56    uint64    frames_written 已发布的帧数；最新一帧的编号为 frames_written - 1
+
+第 k 帧写在第 k % N 个槽位，槽位起始地址 = header_size + (k % N) * slot_size：
+
+    偏移           类型                     字段
+    0              uint64                   seq        序列号（seqlock），见下
+    8              uint64                   frame_no   帧编号 k
+    16             int64                    time_step  仿真时间步
+    24             uint32                   num_ships  本帧船的数量（<= C）
+    28             uint32                   reserved
+    values_offset  float64[M][S][T][F]      测量值，无测量的槽位为 NaN
+    valid_offset   uint8[M][S][T]           1 表示该目标槽位有测量值
+    ships_offset   float64[C][3]            船舶真实位置，超出 num_ships 的行为 NaN
+
+序列号协议（seqlock）
+=====================
+
+写端写第 k 帧时：先把槽位 seq 置为 2k+1（奇数，表示正在写），写入数据，
+再把 seq 置为 2k+2，最后把文件头 frames_written 置为 k+1。
+
+读端读第 k 帧时：读 seq 得 s1，若 s1 != 2k+2 说明该帧尚未写完或已被覆盖；
+否则拷贝（或直接使用）数据后再读一次 seq 得 s2，s1 == s2 时数据一致。
+原生读端应使用 acquire 语义读取 seq 和 frames_written（C++ 中 std::atomic_ref<uint64_t>::load(acquire)），
+零拷贝使用数据时在用完后再校验一次 seq。
+
+读端只需要跟上写端 N 帧以内就不会丢帧；落后更多时可以直接跳到 frames_written - 1 读最新帧。
+"""
+import threading
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+RING_MAGIC = b"MSIMRING"
+RING_VERSION = 1
+HEADER_SIZE = 64
+SLOT_HEADER_SIZE = 32
+
+HEADER_DTYPE = np.dtype({
+    "names": ["magic", "version", "header_size", "num_slots", "slot_size",
+              "num_missiles", "num_sensors", "max_targets", "num_fields", "max_ships",
+              "values_offset", "valid_offset", "ships_offset", "frames_written"],
+    "formats": ["S8", "<u4", "<u4", "<u4", "<u4",
+                "<u4", "<u4", "<u4", "<u4", "<u4",
+                "<u4", "<u4", "<u4", "<u8"],
+    "offsets": [0, 8, 12, 16, 20, 24, 28, 32, 36, 40, 44, 48, 52, 56],
+    "itemsize": HEADER_SIZE,
+})
+
+SLOT_HEADER_DTYPE = np.dtype({
+    "names": ["seq", "frame_no", "time_step", "num_ships", "reserved"],
+    "formats": ["<u8", "<u8", "<i8", "<u4", "<u4"],
+    "offsets": [0, 8, 16, 24, 28],
+    "itemsize": SLOT_HEADER_SIZE,
+})
+
+
+def _align(n, alignment):
+    return (n + alignment - 1) // alignment * alignment
+
+
+def frame_layout(num_missiles, num_sensors, max_targets, num_fields, max_ships):
+    """
+    计算槽位内各段的偏移。
+    :return: dict，包含 values_offset / valid_offset / ships_offset / slot_size
+    """
+    values_offset = SLOT_HEADER_SIZE
+    valid_offset = values_offset + num_missiles * num_sensors * max_targets * num_fields * 8
+    ships_offset = _align(valid_offset + num_missiles * num_sensors * max_targets, 8)
+    slot_size = _align(ships_offset + max_ships * 3 * 8, 64)
+    return {
+        "values_offset": values_offset,
+        "valid_offset": valid_offset,
+        "ships_offset": ships_offset,
+        "slot_size": slot_size,
+    }
+
+
+class _RingViews:
+    """在共享内存缓冲区上建立文件头和各槽位的 numpy 视图（不拷贝）。"""
+
+    def __init__(self, buf):
+        self.header = np.ndarray((), dtype=HEADER_DTYPE, buffer=buf)
+        h = self.header
+        self.num_slots = int(h["num_slots"])
+        self.slot_size = int(h["slot_size"])
+        M, S, T, F = (int(h["num_missiles"]), int(h["num_sensors"]),
+                      int(h["max_targets"]), int(h["num_fields"]))
+        C = int(h["max_ships"])
+        self.block_shape = (M, S, T, F)
+        self.max_ships = C
+
+        base = int(h["header_size"])
+        self.slot_headers = np.ndarray((self.num_slots,), dtype=SLOT_HEADER_DTYPE, buffer=buf,
+                                       offset=base, strides=(self.slot_size,))
+        self.seq = self.slot_headers["seq"]
+        self.values = np.ndarray((self.num_slots, M, S, T, F), dtype="<f8", buffer=buf,
+                                 offset=base + int(h["values_offset"]),
+                                 strides=(self.slot_size, S * T * F * 8, T * F * 8, F * 8, 8))
+        self.valid = np.ndarray((self.num_slots, M, S, T), dtype=np.uint8, buffer=buf,
+                                offset=base + int(h["valid_offset"]),
+                                strides=(self.slot_size, S * T, T, 1))
+        self.ships = np.ndarray((self.num_slots, C, 3), dtype="<f8", buffer=buf,
+                                offset=base + int(h["ships_offset"]),
+                                strides=(self.slot_size, 24, 8))
+
+
+class SharedFrameRing:
+    """
+    写端：创建共享内存并按上面的布局逐帧发布测量块。
+    一般通过 SimulationCore.publish_shared_memory() 创建，每步测量后自动 publish。
+    """
+
+    def __init__(self, name, num_missiles, num_sensors, max_targets, num_fields, max_ships, num_slots=64):
+        """
+        :param name: 共享内存名称（Linux 上对应 /dev/shm/<name>）
+        :param num_slots: 环形缓冲区槽位数，读端落后不超过该帧数时不会丢帧
+        """
+        layout = frame_layout(num_missiles, num_sensors, max_targets, num_fields, max_ships)
+        size = HEADER_SIZE + num_slots * layout["slot_size"]
+        self.name = name
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.shm.buf[:size] = bytes(size)
+
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self.shm.buf)
+        header["magic"] = RING_MAGIC
+        header["version"] = RING_VERSION
+        header["header_size"] = HEADER_SIZE
+        header["num_slots"] = num_slots
+        header["num_missiles"] = num_missiles
+        header["num_sensors"] = num_sensors
+        header["max_targets"] = max_targets
+        header["num_fields"] = num_fields
+        header["max_ships"] = max_ships
+        for key, value in layout.items():
+            header[key] = value
+        del header
+
+        self._views = _RingViews(self.shm.buf)
+        self.frames_written = 0
+
+    def publish(self, time_step, block, valid, ships):
+        """
+        写入一帧。
+        :param block: (M, S, T, F) 测量值，无测量处为 NaN
+        :param valid: (M, S, T) 有效掩码
+        :param ships: (num_ships, 3) 船舶真实位置，num_ships <= max_ships
+        :return: 帧编号
+        """
+        v = self._views
+        k = self.frames_written
+        slot = k % v.num_slots
+        num_ships = len(ships)
+        if num_ships > v.max_ships:
+            raise ValueError(f"船的数量{num_ships}超过共享内存布局的max_ships={v.max_ships}")
+
+        v.seq[slot] = 2 * k + 1
+        slot_header = v.slot_headers[slot]
+        slot_header["frame_no"] = k
+        slot_header["time_step"] = time_step
+        slot_header["num_ships"] = num_ships
+        v.values[slot] = block
+        v.valid[slot] = valid
+        v.ships[slot, :num_ships] = ships
+        v.ships[slot, num_ships:] = np.nan
+        v.seq[slot] = 2 * k + 2
+
+        self.frames_written = k + 1
+        v.header["frames_written"] = self.frames_written
+        return k
+
+    def on_frame(self, core):
+        """SimulationCore 每步回调：发布本步的测量块和船舶位置。"""
+        self.publish(core.time_step, core.missile.last_block, core.missile.last_valid,
+                     core.carrier.get_positions())
+
+    def close(self, unlink=True):
+        """
+        关闭写端。unlink 为 True 时删除共享内存名称，已经映射的读端仍可继续读取。
+        """
+        if self.shm is None:
+            return
+        del self._views
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+        self.shm = None
+
+
+class SharedFrameReader:
+    """
+    Python 参考读端，读取协议与原生读端相同（见模块文档）。
+    read() / latest() 返回拷贝出来的一致帧；views 属性可用于零拷贝访问。
+    """
+
+    def __init__(self, name, track=False):
+        """
+        :param name: 共享内存名称
+        :param track: 是否由本进程的 resource_tracker 管理该共享内存。
+                      独立的读进程应为 False，否则进程退出时会把写端的共享内存删除
+        """
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, track=track)
+        except TypeError:
+            # Python 3.13 之前没有 track 参数，附加时总会注册，这里手动注销
+            self.shm = shared_memory.SharedMemory(name=name)
+            if not track:
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self.shm.buf)
+        if bytes(header["magic"]) != RING_MAGIC:
+            raise ValueError(f"{name}不是测量帧共享内存")
+        if int(header["version"]) != RING_VERSION:
+            raise ValueError(f"不支持的共享内存布局版本{int(header['version'])}")
+        del header
+        self.views = _RingViews(self.shm.buf)
+
+    @property
+    def frames_written(self):
+        return int(self.views.header["frames_written"])
+
+    def read(self, frame_no):
+        """
+        读取第 frame_no 帧。
+        :return: dict(frame_no, time_step, values, valid, ships)；该帧尚未写完或已被覆盖时返回 None
+        """
+        v = self.views
+        slot = frame_no % v.num_slots
+        expected = 2 * frame_no + 2
+        if int(v.seq[slot]) != expected:
+            return None
+        slot_header = v.slot_headers[slot]
+        num_ships = min(int(slot_header["num_ships"]), v.max_ships)
+        frame = {
+            "frame_no": int(slot_header["frame_no"]),
+            "time_step": int(slot_header["time_step"]),
+            "values": v.values[slot].copy(),
+            "valid": v.valid[slot].astype(bool),
+            "ships": v.ships[slot, :num_ships].copy(),
+        }
+        if int(v.seq[slot]) != expected:
+            return None
+        return frame
+
+    def latest(self, retries=8):
+        """读取最新一帧；还没有帧时返回 None。"""
+        for _ in range(retries):
+            n = self.frames_written
+            if n == 0:
+                return None
+            frame = self.read(n - 1)
+            if frame is not None:
+                return frame
+        return None
+
+    def close(self):
+        if self.shm is None:
+            return
+        del self.views
+        self.shm.close()
+        self.shm = None
+
+
+def _self_check():
+    """
+    自检：仿真线程逐步发布，读线程并发轮询最新帧；
+    结束后核对读到的每一帧都与仿真内存中的测量数据一致，并检查被覆盖的帧能被识别。
+    """
+    import os
+    from simulation_core import SimulationCore
+
+    name = f"msim_selfcheck_{os.getpid()}"
+    core = SimulationCore(carrier_count=3, missile_count=4, max_steps=300, seed=0, chaff_appear_times=10)
+    ring = core.publish_shared_memory(name, num_slots=16)
+    reader = SharedFrameReader(name, track=True)
+
+    try:
+        frames = {}
+        done = threading.Event()
+
+        def poll():
+            while not done.is_set():
+                frame = reader.latest()
+                if frame is not None:
+                    frames[frame["time_step"]] = frame
+
+        thread = threading.Thread(target=poll)
+        thread.start()
+        try:
+            core.run()
+        finally:
+            done.set()
+            thread.join()
+
+        arrays = core.missile.measurement_data.to_arrays()
+        M, S = core.missile_count, core.missile.NUM_SENSORS
+        values = arrays["values"].reshape(-1, M, S, *arrays["values"].shape[1:])
+        valid = arrays["valid"].reshape(-1, M, S, arrays["valid"].shape[1])
+        ships = core.missile.ship_locations_data.positions_array()
+        for t, frame in frames.items():
+            assert frame["frame_no"] == t
+            assert np.array_equal(frame["valid"], valid[t])
+            assert np.array_equal(frame["values"], values[t], equal_nan=True)
+            assert np.array_equal(frame["ships"], ships[t])
+
+        assert reader.frames_written == core.time_step
+        assert reader.read(0) is None, "已被覆盖的帧应返回 None"
+        assert reader.read(core.time_step) is None, "尚未写入的帧应返回 None"
+        last = reader.read(core.time_step - 1)
+        assert np.array_equal(last["values"], values[-1], equal_nan=True)
+
+        slot_size = reader.views.slot_size
+    finally:
+        reader.close()
+        ring.close()
+    print(f"shm_ring self-check passed: {len(frames)} of {core.time_step} frames read concurrently, "
+          f"slot size {slot_size} bytes.")
+
+
+if __name__ == "__main__":
+    _self_check()
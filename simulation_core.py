@@ -0,0 +1,710 @@
+import argparse
+import logging
+import time
+
+import numpy as np
+
+import checkpoint
+from carrier import Carrier
+from decoys import DECOY_CHAFF, DECOY_FIXED_CORNER, DECOY_MOVING_CORNER, DecoyManager
+from fusion import FUSION_METHODS
+from guidance import GUIDANCE_LAWS, MissileGuidance
+from instrumentation import NULL_INSTRUMENTATION, CsvSink, Instrumentation, LogSink
+from keyed_noise import make_noise_key
+from missile import NUM_FIELDS, Missile
+from shm_ring import SharedFrameRing
+from stream_server import MeasurementStreamServer
+from tracking import GATE_CHI2_99, Tracker
+from truth import CompressedTruth
+
+
+class SimulationCore:
+    """
+    不依赖 Tk / Matplotlib 的仿真核心：持有载具、导弹位置、箔条与角反射器状态机以及测量步骤。
+    step() / run(n) 以 CPU 允许的最快速度推进仿真，GUI 只负责读取状态进行显示。
+    """
+    CHAFF_DURATION = 50               # 箔条每次出现持续的时间步
+    CORNER_REFLECTOR_DURATION = 100   # 角反射器每次出现持续的时间步
+    DECOY_SPAWN_PROB = 0.01           # 每个时间步生成干扰的概率
+    TRUTH_MODES = ("dense", "compressed", "none")  # 船舶真实位置的记录方式
+
+    def __init__(self, carrier_count=2, missile_count=1, carrier_speed=0.0015, missile_speed=0.03,
+                 max_steps=500, chaff_appear_times=3, corner_reflector_appear_times=2,
+                 missile_start=(0.0, 0.0, 15.0), engine="vectorized", seed=None,
+                 target_selection="first", max_range=None, fov_deg=None,
+                 guidance_law="pure_pursuit", assignments=None,
+                 max_active_chaff=1, max_active_corner_reflectors=1, noise="stream",
+                 record_format="wide", sensor_periods=None, sensor_phases=None, truth="dense",
+                 fusion="off", fusion_method="information"):
+        """
+        :param carrier_count: 船的数量
+        :param missile_count: 导弹数量
+        :param carrier_speed: 船的移动速度
+        :param missile_speed: 导弹每步的飞行距离，标量或 (missile_count,) 数组
+        :param max_steps: 最大时间步，None 表示不限
+        :param chaff_appear_times: 箔条最多出现次数
+        :param corner_reflector_appear_times: 角反射器最多出现次数
+        :param missile_start: 所有导弹的初始位置
+        :param engine: Missile 的测量引擎（"vectorized" 或 "loop"）
+        :param seed: 随机种子。相同种子的两次运行逐位一致；为 None 时每次 reset 使用新的系统熵
+        :param target_selection: 传感器目标选取方式（"first" 或 "nearest"），见 Missile
+        :param max_range: "nearest" 模式下的最大探测距离
+        :param fov_deg: "nearest" 模式下的视场全角(度)，视场轴为导弹本步的飞行方向
+        :param guidance_law: 制导律名称，见 guidance.GUIDANCE_LAWS
+        :param assignments: (missile_count,) 每枚导弹追踪的船索引；None 时第 i 枚导弹追踪第 i % 船数 艘
+        :param max_active_chaff: 同时在场的箔条批次上限
+        :param max_active_corner_reflectors: 同时在场的角反射器批次上限
+        :param noise: 测量噪声来源（"stream" 或 "keyed"），见 Missile；"keyed" 时测量可由 replay 按需重新生成
+        :param record_format: 测量数据的存储方式（"wide" 或 "sparse"），见 Missile
+        :param sensor_periods: 传感器采样周期（整数、按传感器编号的列表或 {误差类别: 周期}），见 sensor_schedule
+        :param sensor_phases: 传感器采样相位，格式同 sensor_periods
+        :param truth: 船舶真实位置的记录方式："dense" 每步记录（Missile.ship_locations_data，导出 ship_loc.csv）；
+                      "compressed" 只记录初始状态和反弹事件（self.compressed_truth，见 truth.CompressedTruth）；
+                      "none" 不记录
+        :param fusion: 多传感器融合行（"off"、"alongside" 或 "instead"），见 Missile 与 fusion.fuse_block
+        :param fusion_method: 融合方法（"information" 或 "ci"）
+        """
+        self.carrier_count = carrier_count
+        self.missile_count = missile_count
+        self.carrier_speed = carrier_speed
+        self.missile_speed = missile_speed
+        self.max_steps = max_steps
+        self.chaff_appear_times = chaff_appear_times
+        self.corner_reflector_appear_times = corner_reflector_appear_times
+        self.missile_start = missile_start
+        self.engine = engine
+        self.seed = seed
+        self.target_selection = target_selection
+        self.max_range = max_range
+        self.fov_deg = fov_deg
+        self.guidance_law = guidance_law
+        self.assignments = assignments
+        self.max_active_chaff = max_active_chaff
+        self.max_active_corner_reflectors = max_active_corner_reflectors
+        self.noise = noise
+        self.record_format = record_format
+        self.sensor_periods = sensor_periods
+        self.sensor_phases = sensor_phases
+        if truth not in self.TRUTH_MODES:
+            raise ValueError(f"truth必须是{self.TRUTH_MODES}之一")
+        self.truth = truth
+        self.fusion = fusion
+        self.fusion_method = fusion_method
+        # 每步测量完成后调用的回调 listener(core)，用于实时接口；reset() 不清空
+        self.frame_listeners = []
+        # 量测-航迹关联的 tracking.Tracker，见 enable_tracking()
+        self.tracker = None
+        # 定期保存快照的 checkpoint.CheckpointWriter，见 enable_checkpoints()
+        self.checkpointer = None
+        # 分阶段计时与计数器，见 set_instrumentation()
+        self.instrumentation = NULL_INSTRUMENTATION
+        # 记录干扰释放事件的 replay.ReplayLog，见 record_spawn 调用处
+        self.recorder = None
+        # 不为 None 时为 {时间步: [释放事件, ...]}，按记录的事件释放干扰而不再随机生成（回放用）
+        self.spawn_schedule = None
+
+        self.reset()
+
+    def reset(self):
+        """重新初始化载具、导弹和干扰状态，时间步归零。"""
+        if getattr(self, "missile", None) is not None:
+            self.missile.disable_parallel()
+        self.time_step = 0
+
+        # (0) 随机数流：由种子派生出载具、导弹、干扰三条相互独立的流，
+        #     这样某个子系统多抽一次随机数不会扰动其他子系统；第四个子序列派生 keyed 噪声的密钥
+        seed_sequence = np.random.SeedSequence(self.seed)
+        self.entropy = seed_sequence.entropy  # 未指定种子时，可用它复现本次运行
+        carrier_ss, missile_ss, decoy_ss, noise_ss = seed_sequence.spawn(4)
+        self.rng = np.random.default_rng(decoy_ss)
+        self.noise_key = make_noise_key(noise_ss)
+
+        # (1) 初始化载具
+        self.carrier = Carrier(self.carrier_count, self.carrier_speed, rng=np.random.default_rng(carrier_ss))
+
+        # (2) 初始化导弹，所有导弹初始都在 missile_start 处
+        self.missiles = np.array([self.missile_start for _ in range(self.missile_count)], dtype=np.float64)
+        self.missile = Missile(self.missiles, engine=self.engine, rng=np.random.default_rng(missile_ss),
+                               target_selection=self.target_selection, max_range=self.max_range,
+                               fov_deg=self.fov_deg, noise=self.noise, noise_key=self.noise_key,
+                               record_format=self.record_format, sensor_periods=self.sensor_periods,
+                               sensor_phases=self.sensor_phases, fusion=self.fusion,
+                               fusion_method=self.fusion_method)
+        self.missile.instrumentation = self.instrumentation
+        self.missile.headings = np.zeros_like(self.missiles)
+        self.missile.record_truth = self.truth == "dense"
+        self._start_truth()
+        self.guidance = MissileGuidance(self.missile_count, law=self.guidance_law, assignments=self.assignments)
+
+        # (3) 干扰池（箔条 + 角反射器）与出现次数
+        self.decoys = DecoyManager()
+        self.chaff_appear_count = 0
+        self.corner_reflector_appear_count = 0
+
+    @property
+    def finished(self):
+        """是否已到达最大步数。"""
+        return self.max_steps is not None and self.time_step >= self.max_steps
+
+    def step(self, measure=True):
+        """
+        推进一个时间步：载具移动、干扰更新、导弹制导、测量。
+        :param measure: False 时只推进运动学和干扰状态，跳过测量和每步回调（回放时用）
+        """
+        inst = self.instrumentation
+        inst.begin_step(self.time_step)
+
+        # 1) 载具移动
+        with inst.phase("carrier.move"):
+            bounced = self.carrier.move()
+            if self.compressed_truth is not None:
+                self.compressed_truth.record_move(bounced)
+
+        # 2) 随机生成或移除干扰：先记下本步开始时在场的批次数，再统一扣减寿命
+        with inst.phase("decoys"):
+            active_chaff = self.decoys.active_deployments(DECOY_CHAFF)
+            active_corner = self.decoys.active_deployments(DECOY_FIXED_CORNER, DECOY_MOVING_CORNER)
+            self.decoys.tick()
+            if self.spawn_schedule is not None:
+                self.apply_spawn_events(self.spawn_schedule.get(self.time_step, ()))
+            else:
+                self.update_chaff(active_chaff)
+                self.update_corner_reflector(active_corner)
+
+        # 3) 更新导弹位置（所有导弹一次数组运算）
+        carrier_positions = self.carrier.get_positions()
+        with inst.phase("guidance"):
+            self.missile.headings = self.guidance.step(self.missiles, self.missile_speed,
+                                                       carrier_positions, self.carrier.directions)
+
+        # 4) 跟随船移动的角反射器，计算本帧的绝对坐标
+        with inst.phase("decoys.attached"):
+            self.decoys.update_attached(carrier_positions)
+
+        # 5) 让导弹执行一次测量
+        if measure:
+            with inst.phase("measurements"):
+                self.missile.generate_sensor_measurements(
+                    carriers_positions=carrier_positions,
+                    chaff_positions=self.chaff_positions,
+                    corner_positions=self.current_corner_abs_positions,
+                    time_step=self.time_step
+                )
+            if self.frame_listeners:
+                with inst.phase("listeners"):
+                    for listener in self.frame_listeners:
+                        listener(self)
+
+        # 6) 时间步+1
+        self.time_step += 1
+
+        if self.checkpointer is not None:
+            with inst.phase("checkpoint"):
+                self.checkpointer.on_step(self)
+        inst.end_step(self.time_step)
+
+    def run(self, n=None, measure=True):
+        """
+        连续推进 n 个时间步；n 为 None 时一直运行到 max_steps。
+        :param measure: 见 step()
+        :return: 实际执行的步数
+        """
+        if n is None and self.max_steps is None:
+            raise ValueError("max_steps为None时必须指定运行步数n")
+        done = 0
+        while (n is None or done < n) and not self.finished:
+            self.step(measure)
+            done += 1
+        return done
+
+    # ========== 插桩 ==========
+
+    def set_instrumentation(self, instrumentation):
+        """
+        设置插桩对象（instrumentation.Instrumentation），None 表示关闭。
+        reset() 之后仍然有效。
+        """
+        self.instrumentation = instrumentation if instrumentation is not None else NULL_INSTRUMENTATION
+        self.missile.instrumentation = self.instrumentation
+
+    # ========== 检查点 ==========
+
+    def get_config(self):
+        """构造参数，用于从检查点重建同样规模的 SimulationCore。"""
+        return {
+            "carrier_count": self.carrier_count,
+            "missile_count": self.missile_count,
+            "carrier_speed": self.carrier_speed,
+            "max_steps": self.max_steps,
+            "chaff_appear_times": self.chaff_appear_times,
+            "corner_reflector_appear_times": self.corner_reflector_appear_times,
+            "missile_start": list(self.missile_start),
+            "engine": self.engine,
+            "seed": self.seed,
+            "target_selection": self.target_selection,
+            "max_range": self.max_range,
+            "fov_deg": self.fov_deg,
+            "guidance_law": self.guidance_law,
+            "assignments": None if self.assignments is None else np.asarray(self.assignments).tolist(),
+            "max_active_chaff": self.max_active_chaff,
+            "max_active_corner_reflectors": self.max_active_corner_reflectors,
+            "noise": self.noise,
+            "record_format": self.record_format,
+            "sensor_periods": self.sensor_periods,
+            "sensor_phases": self.sensor_phases,
+            "truth": self.truth,
+            "fusion": self.fusion,
+            "fusion_method": self.fusion_method,
+        }
+
+    def get_state(self):
+        """
+        导出完整的可恢复状态（数组均为拷贝）：载具、导弹、制导、干扰池、计数器和所有随机数流。
+        已记录的测量数据不包含在内，从快照恢复后输出的是快照时间步之后的数据。
+        :return: 嵌套字典，可用 checkpoint.save_checkpoint 保存
+        """
+        return {
+            "config": self.get_config(),
+            "core": {
+                "time_step": self.time_step,
+                "entropy": self.entropy,
+                "noise_key": self.noise_key,
+                "missile_speed": np.array(self.missile_speed, dtype=np.float64),
+                "missiles": self.missiles.copy(),
+                "chaff_appear_count": self.chaff_appear_count,
+                "corner_reflector_appear_count": self.corner_reflector_appear_count,
+                "rng": self.rng.bit_generator.state,
+            },
+            "carrier": self.carrier.get_state(),
+            "missile": self.missile.get_state(),
+            "guidance": self.guidance.get_state(),
+            "decoys": self.decoys.get_state(),
+        }
+
+    def set_state(self, state):
+        """从 get_state() 的结果恢复，之后的运行与未中断时逐位一致。规模必须与当前配置一致。"""
+        core = state["core"]
+        self.time_step = int(core["time_step"])
+        self.entropy = core["entropy"]
+        # keyed 噪声密钥；旧快照没有保存它时，按 reset() 的派生方式从熵重新得到
+        noise_key = core.get("noise_key")
+        if noise_key is None:
+            noise_key = make_noise_key(np.random.SeedSequence(self.entropy).spawn(4)[3])
+        self.noise_key = self.missile.noise_key = int(noise_key)
+        missile_speed = np.asarray(core["missile_speed"], dtype=np.float64)
+        self.missile_speed = float(missile_speed) if missile_speed.ndim == 0 else missile_speed
+        self.missiles[...] = core["missiles"]
+        self.chaff_appear_count = int(core["chaff_appear_count"])
+        self.corner_reflector_appear_count = int(core["corner_reflector_appear_count"])
+        self.rng.bit_generator.state = core["rng"]
+        self.carrier.set_state(state["carrier"])
+        self.missile.set_state(state["missile"])
+        self.guidance.set_state(state["guidance"])
+        self.decoys.set_state(state["decoys"])
+        self._start_truth()
+
+    @classmethod
+    def from_state(cls, state):
+        """按快照中的配置新建 SimulationCore 并恢复状态。"""
+        core = cls(**state["config"])
+        core.set_state(state)
+        return core
+
+    @classmethod
+    def from_checkpoint(cls, filename):
+        """从快照文件恢复。"""
+        return cls.from_state(checkpoint.load_checkpoint(filename))
+
+    def save_checkpoint(self, filename, compressed=False):
+        """立即在当前线程保存一个快照。"""
+        checkpoint.save_checkpoint(filename, self.get_state(), compressed=compressed)
+
+    def enable_checkpoints(self, directory, every=1000, keep=3, compressed=False):
+        """
+        每 every 步在后台线程保存一次快照到 directory，结束后调用 disable_checkpoints() 等待写完。
+        :return: checkpoint.CheckpointWriter
+        """
+        self.disable_checkpoints()
+        self.checkpointer = checkpoint.CheckpointWriter(directory, every=every, keep=keep, compressed=compressed)
+        return self.checkpointer
+
+    def disable_checkpoints(self):
+        if self.checkpointer is not None:
+            self.checkpointer.close()
+            self.checkpointer = None
+
+    # ========== 船舶真实位置 ==========
+
+    def _start_truth(self):
+        """truth="compressed" 时从当前载具状态开始记录反弹事件。"""
+        self.compressed_truth = None
+        if self.truth == "compressed":
+            self.compressed_truth = CompressedTruth.from_carrier(self.carrier, start_step=self.time_step)
+
+    def export_truth(self, filename="ship_truth.npz"):
+        """保存压缩的船舶真实轨迹（truth="compressed"），读取见 truth.CompressedTruth.load。"""
+        self.compressed_truth.save(filename)
+        print(f"Ship truth exported to {filename} ({self.compressed_truth.num_events} bounce events).")
+
+    # ========== 并行测量 ==========
+
+    def enable_parallel(self, num_workers):
+        """
+        按导弹分片，由 num_workers 个工作进程并行计算测量（需要 noise="keyed"，结果与串行逐位一致）。
+        结束后调用 disable_parallel() 停止工作进程；reset() 会新建 Missile，需要重新开启。
+        :return: parallel_measure.ShardedMeasurement
+        """
+        return self.missile.enable_parallel(num_workers)
+
+    def disable_parallel(self):
+        self.missile.disable_parallel()
+
+    # ========== 实时接口 ==========
+
+    def add_frame_listener(self, listener):
+        """
+        注册每步回调 listener(core)：在测量完成、time_step 加一之前调用，
+        此时 core.missile.last_block / last_valid 为本步的测量块。
+        """
+        self.frame_listeners.append(listener)
+
+    def remove_frame_listener(self, listener):
+        self.frame_listeners.remove(listener)
+
+    def enable_tracking(self, **kwargs):
+        """
+        开启量测-航迹关联：每步测量后由 tracking.Tracker 更新每枚导弹的航迹。
+        航迹不保存在检查点中，从快照恢复后重新开始起始航迹。
+        :param kwargs: 传给 Tracker 的参数（gate、confirm_hits、max_misses、source 等）
+        :return: Tracker
+        """
+        if kwargs.get("source") == "fused" and self.fusion == "off":
+            raise ValueError("source=\"fused\" 需要开启 fusion")
+        self.disable_tracking()
+        self.tracker = Tracker(self.missile_count, **kwargs)
+        self.add_frame_listener(self.tracker.on_frame)
+        return self.tracker
+
+    def disable_tracking(self):
+        if self.tracker is not None:
+            self.remove_frame_listener(self.tracker.on_frame)
+            self.tracker = None
+
+    def publish_shared_memory(self, name="missile_sim_frames", num_slots=64):
+        """
+        创建共享内存环形缓冲区，之后每步把测量块和船舶真实位置写入其中，布局见 shm_ring。
+        结束后由调用方调用返回对象的 close()。
+        :return: SharedFrameRing
+        """
+        ring = SharedFrameRing(name, self.missile_count, Missile.NUM_SENSORS, Missile.MAX_TARGETS,
+                               NUM_FIELDS, self.carrier_count, num_slots=num_slots)
+        self.add_frame_listener(ring.on_frame)
+        return ring
+
+    def start_stream_server(self, host="127.0.0.1", port=0, unix_path=None, max_pending=8, policy="drop"):
+        """
+        启动实时推送服务，之后每步的测量块和船舶真实位置都会推送给所有订阅者，参数见 stream_server。
+        结束后由调用方调用返回对象的 stop()。
+        :return: MeasurementStreamServer，监听地址见其 address 属性
+        """
+        server = MeasurementStreamServer(host, port, unix_path=unix_path, max_pending=max_pending, policy=policy)
+        server.attach(self)
+        server.start()
+        return server
+
+    def export_to_csv(self, measurement_filename="measurement_data.csv", ship_loc_filename="ship_loc.csv"):
+        """导出测量数据与船舶真实位置。"""
+        self.missile.export_to_csv(measurement_filename, ship_loc_filename)
+
+    def start_streaming(self, measurement_filename="measurement_data.csv", ship_loc_filename="ship_loc.csv",
+                        flush_every=50):
+        """开启流式 CSV 输出，参数见 Missile.start_streaming；结束时调用 export_to_csv 关闭文件。"""
+        self.missile.start_streaming(measurement_filename, ship_loc_filename, flush_every=flush_every)
+
+    def export_to_npz(self, filename="measurement_data.npz", **kwargs):
+        """以列式二进制格式导出测量数据与船舶真实位置，参数见 Missile.export_to_npz。"""
+        self.missile.export_to_npz(filename, **kwargs)
+
+    def export_detections_csv(self, filename="detections.csv"):
+        """以长表 CSV 导出实际探测记录，见 Missile.export_detections_csv。"""
+        self.missile.export_detections_csv(filename)
+
+    # ========== 干扰状态 ==========
+
+    @property
+    def chaff_positions(self):
+        """当前在场箔条的绝对坐标 (N, 3)。"""
+        return self.decoys.positions_of(DECOY_CHAFF)
+
+    @property
+    def current_corner_abs_positions(self):
+        """当前在场角反射器（固定 + 移动）的绝对坐标 (N, 3)。"""
+        return self.decoys.positions_of(DECOY_FIXED_CORNER, DECOY_MOVING_CORNER)
+
+    @property
+    def is_chaff_active(self):
+        return self.decoys.active_deployments(DECOY_CHAFF) > 0
+
+    @property
+    def is_corner_reflector_active(self):
+        return self.decoys.active_deployments(DECOY_FIXED_CORNER, DECOY_MOVING_CORNER) > 0
+
+    # ========== 箔条干扰（Chaff） ==========
+
+    def update_chaff(self, active_chaff):
+        """
+        随机生成箔条干扰（到期移除由干扰池的 tick 完成）：
+        - 每次出现持续 CHAFF_DURATION 个时间步
+        - 总共可出现 chaff_appear_times 次，同时最多 max_active_chaff 批
+        :param active_chaff: 本步开始时在场的箔条批次数
+        """
+        # 如果在场箔条未达上限，且出现次数还不超限，则有一定概率生成一次
+        if active_chaff < self.max_active_chaff and self.chaff_appear_count < self.chaff_appear_times:
+            if self.rng.random() < self.DECOY_SPAWN_PROB:
+                self.spawn_chaff()
+
+    def spawn_chaff(self):
+        self.chaff_appear_count += 1
+        # 由 carrier.generate_chaff() 生成箔条的绝对坐标
+        self.deploy_decoys(DECOY_CHAFF, self.CHAFF_DURATION, positions=self.carrier.generate_chaff())
+
+    # ========== 角反射器（Corner Reflector） ==========
+
+    def update_corner_reflector(self, active_corner):
+        """
+        随机生成角反射器（到期移除由干扰池的 tick 完成）：
+        - 每次出现持续 CORNER_REFLECTOR_DURATION 个时间步
+        - 总共可出现 corner_reflector_appear_times 次，同时最多 max_active_corner_reflectors 批
+        - 出现时随机决定 "fixed" 或 "moving"
+        :param active_corner: 本步开始时在场的角反射器批次数
+        """
+        if (active_corner < self.max_active_corner_reflectors
+                and self.corner_reflector_appear_count < self.corner_reflector_appear_times):
+            if self.rng.random() < self.DECOY_SPAWN_PROB:
+                self.spawn_corner_reflector()
+
+    def spawn_corner_reflector(self):
+        self.corner_reflector_appear_count += 1
+
+        corner_reflector_type = str(self.rng.choice(["fixed", "moving"]))
+        if corner_reflector_type == "fixed":
+            # 固定角反射器直接是绝对坐标
+            self.deploy_decoys(DECOY_FIXED_CORNER, self.CORNER_REFLECTOR_DURATION,
+                               positions=self.carrier.generate_fixed_corner_reflectors())
+        else:
+            # 移动角反射器 [ship_idx, offset_x, offset_y, 0] => 所属船 + 相对偏移
+            moving = self.carrier.generate_moving_corner_reflectors()
+            offsets = np.zeros((moving.shape[0], 3))
+            offsets[:, :2] = moving[:, 1:3]
+            self.deploy_decoys(DECOY_MOVING_CORNER, self.CORNER_REFLECTOR_DURATION,
+                               owners=moving[:, 0].astype(np.int64), offsets=offsets)
+
+    # ========== 干扰释放事件 ==========
+
+    def deploy_decoys(self, kind, lifetime, positions=None, owners=None, offsets=None):
+        """释放一批干扰（参数见 DecoyManager.deploy），并把释放事件交给 recorder。"""
+        self.decoys.deploy(kind, lifetime, positions=positions, owners=owners, offsets=offsets,
+                           ship_positions=self.carrier.get_positions())
+        if self.recorder is not None:
+            self.recorder.record_spawn(self.time_step, kind, lifetime, positions=positions,
+                                       owners=owners, offsets=offsets)
+
+    def apply_spawn_events(self, events):
+        """
+        按记录的事件释放干扰（spawn_schedule 模式），出现次数与原运行一致。
+        :param events: 释放事件列表，每个事件为 {"kind", "lifetime", "positions"} 或 {"kind", "lifetime", "owners", "offsets"}
+        """
+        for event in events:
+            if event["kind"] == DECOY_CHAFF:
+                self.chaff_appear_count += 1
+            else:
+                self.corner_reflector_appear_count += 1
+            self.deploy_decoys(event["kind"], event["lifetime"], positions=event.get("positions"),
+                               owners=event.get("owners"), offsets=event.get("offsets"))
+
+
+def parse_sensor_spec(values):
+    """命令行的传感器周期/相位设定：["1", "2", ...] -> 列表，["0.2:1", ...] -> {误差类别: 值}。"""
+    if values is None:
+        return None
+    if any(":" in v for v in values):
+        return {float(k): int(v) for k, v in (item.split(":") for item in values)}
+    return [int(v) for v in values]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无界面运行导弹-载具仿真并导出测量数据")
+    parser.add_argument("--carriers", type=int, default=2, help="船的数量")
+    parser.add_argument("--missiles", type=int, default=1, help="导弹数量")
+    parser.add_argument("--carrier-speed", type=float, default=0.0015, help="船的移动速度")
+    parser.add_argument("--missile-speed", type=float, default=0.03, help="导弹速度")
+    parser.add_argument("--steps", type=int, default=500, help="最大时间步")
+    parser.add_argument("--chaff-times", type=int, default=3, help="箔条最多出现次数")
+    parser.add_argument("--corner-times", type=int, default=2, help="角反射器最多出现次数")
+    parser.add_argument("--engine", choices=Missile.ENGINES, default="vectorized", help="测量引擎")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--target-selection", choices=Missile.TARGET_SELECTIONS, default="first",
+                        help="传感器目标选取方式")
+    parser.add_argument("--max-range", type=float, default=None, help="nearest 模式下的最大探测距离")
+    parser.add_argument("--fov", type=float, default=None, help="nearest 模式下的视场全角(度)")
+    parser.add_argument("--guidance", choices=sorted(GUIDANCE_LAWS), default="pure_pursuit", help="制导律")
+    parser.add_argument("--max-active-chaff", type=int, default=1, help="同时在场的箔条批次上限")
+    parser.add_argument("--max-active-corners", type=int, default=1, help="同时在场的角反射器批次上限")
+    parser.add_argument("--noise", choices=Missile.NOISE_MODES, default="stream",
+                        help="测量噪声来源；keyed 时测量可由回放日志按需重新生成")
+    parser.add_argument("--record", default=None,
+                        help="保存回放日志（种子、参数、干扰释放事件、传感器误差），需要 --noise keyed")
+    parser.add_argument("--no-measurements", action="store_true",
+                        help="只推进运动学、不计算和输出测量（配合 --record，之后用 replay.py 按需生成）")
+    parser.add_argument("--records", choices=Missile.RECORD_FORMATS, default="wide",
+                        help="测量数据在内存中的存储方式：wide 固定槽位宽表，sparse 每次探测一条记录")
+    parser.add_argument("--sensor-periods", nargs="+", default=None,
+                        help="传感器采样周期：5 个整数按传感器编号，或 误差:周期 按精度类别（如 0.2:1 0.8:4）")
+    parser.add_argument("--sensor-phases", nargs="+", default=None, help="传感器采样相位，格式同 --sensor-periods")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="按导弹分片并行计算测量的工作进程数（需要 --noise keyed）")
+    parser.add_argument("--truth", choices=SimulationCore.TRUTH_MODES, default="dense",
+                        help="船舶真实位置：dense 每步记录到 --ship-file；compressed 只记录反弹事件到 --truth-file")
+    parser.add_argument("--truth-file", default="ship_truth.npz", help="压缩真实轨迹的输出文件")
+    parser.add_argument("--fusion", choices=Missile.FUSION_MODES, default="off",
+                        help="多传感器融合：alongside 在原始行之外每枚导弹再输出一行融合估计（sensor_id=-1），"
+                             "instead 只输出融合行")
+    parser.add_argument("--fusion-method", choices=FUSION_METHODS, default="information",
+                        help="融合方法：information 逆协方差加权，ci 协方差交叉")
+    parser.add_argument("--track", default=None, metavar="CSV",
+                        help="开启量测-航迹关联（tracking.Tracker），把每步已确认的航迹写入该 CSV 文件")
+    parser.add_argument("--track-gate", type=float, default=GATE_CHI2_99, help="航迹关联的马氏距离平方门限")
+    parser.add_argument("--format", choices=["csv", "npz", "detections"], default="csv",
+                        help="输出格式：csv 宽表、npz 列式二进制、detections 每次探测一行的长表 CSV")
+    parser.add_argument("--measurement-file", default=None,
+                        help="测量数据输出文件，默认 measurement_data.csv / measurement_data.npz / detections.csv")
+    parser.add_argument("--ship-file", default="ship_loc.csv", help="船舶真实位置输出文件（仅 csv 格式）")
+    parser.add_argument("--stream", action="store_true", help="运行过程中流式写出 CSV，内存占用不随步数增长")
+    parser.add_argument("--flush-every", type=int, default=50, help="流式输出时每多少步写出一次")
+    parser.add_argument("--shm", default=None, help="把每步测量帧发布到该名称的共享内存环形缓冲区")
+    parser.add_argument("--shm-slots", type=int, default=64, help="共享内存环形缓冲区的槽位数")
+    parser.add_argument("--serve-port", type=int, default=None, help="在该 TCP 端口上实时推送测量帧")
+    parser.add_argument("--serve-unix", default=None, help="在该路径的 Unix socket 上实时推送测量帧")
+    parser.add_argument("--serve-policy", choices=MeasurementStreamServer.POLICIES, default="drop",
+                        help="订阅者跟不上时丢弃新帧(drop)或只保留最新帧(coalesce)")
+    parser.add_argument("--wait-subscribers", type=int, default=0, help="开始仿真前等待的订阅者数量")
+    parser.add_argument("--checkpoint-dir", default=None, help="定期保存快照的目录")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="每多少步保存一次快照")
+    parser.add_argument("--resume", action="store_true",
+                        help="从 --checkpoint-dir 中最新的快照继续运行（仿真参数取自快照）")
+    parser.add_argument("--stats-every", type=int, default=None, help="每多少步输出一次分阶段耗时与计数器到日志")
+    parser.add_argument("--stats-csv", default=None, help="把分阶段耗时与计数器写入该 CSV 文件")
+    parser.add_argument("--profile-every", type=int, default=None, help="每多少步用 cProfile 采样一步")
+    parser.add_argument("--profile-out", default=None, help="采样结果保存文件（pstats 格式）")
+    args = parser.parse_args()
+
+    if args.record and args.noise != "keyed":
+        parser.error("--record 需要 --noise keyed")
+    if args.workers and args.noise != "keyed" and not args.resume:
+        parser.error("--workers 需要 --noise keyed")
+    if args.record and args.resume:
+        parser.error("--record 不能与 --resume 同时使用")
+    if args.resume:
+        if args.checkpoint_dir is None:
+            parser.error("--resume 需要指定 --checkpoint-dir")
+        path = checkpoint.latest_checkpoint(args.checkpoint_dir)
+        if path is None:
+            parser.error(f"{args.checkpoint_dir} 中没有快照")
+        core = SimulationCore.from_checkpoint(path)
+        print(f"Resumed from {path} at step {core.time_step}.")
+    else:
+        core = SimulationCore(
+            carrier_count=args.carriers,
+            missile_count=args.missiles,
+            carrier_speed=args.carrier_speed,
+            missile_speed=args.missile_speed,
+            max_steps=args.steps,
+            chaff_appear_times=args.chaff_times,
+            corner_reflector_appear_times=args.corner_times,
+            engine=args.engine,
+            seed=args.seed,
+            target_selection=args.target_selection,
+            max_range=args.max_range,
+            fov_deg=args.fov,
+            guidance_law=args.guidance,
+            max_active_chaff=args.max_active_chaff,
+            max_active_corner_reflectors=args.max_active_corners,
+            noise=args.noise,
+            record_format=args.records,
+            sensor_periods=parse_sensor_spec(args.sensor_periods),
+            sensor_phases=parse_sensor_spec(args.sensor_phases),
+            truth=args.truth,
+            fusion=args.fusion,
+            fusion_method=args.fusion_method,
+        )
+    log = None
+    if args.record:
+        from replay import ReplayLog
+        log = ReplayLog.from_core(core)
+    if args.stream:
+        if args.format != "csv":
+            parser.error("--stream 只支持 csv 格式")
+        core.start_streaming(args.measurement_file or "measurement_data.csv", args.ship_file,
+                             flush_every=args.flush_every)
+    ring = core.publish_shared_memory(args.shm, num_slots=args.shm_slots) if args.shm else None
+    server = None
+    if args.serve_port is not None or args.serve_unix is not None:
+        server = core.start_stream_server(port=args.serve_port or 0, unix_path=args.serve_unix,
+                                          policy=args.serve_policy)
+        print(f"Streaming measurements on {server.address}.")
+        while server.num_connected() < args.wait_subscribers:
+            time.sleep(0.05)
+    if args.workers:
+        core.enable_parallel(args.workers)
+    if args.track:
+        core.enable_tracking(gate=args.track_gate)
+    if args.checkpoint_dir is not None:
+        core.enable_checkpoints(args.checkpoint_dir, every=args.checkpoint_every)
+    inst = None
+    if args.stats_every or args.stats_csv or args.profile_every:
+        sinks = []
+        if args.stats_every:
+            logging.basicConfig(level=logging.INFO, format="%(message)s")
+            sinks.append(LogSink())
+        if args.stats_csv:
+            sinks.append(CsvSink(args.stats_csv))
+        inst = Instrumentation(sinks, report_every=args.stats_every or 100, profile_every=args.profile_every,
+                               profile_file=args.profile_out)
+        core.set_instrumentation(inst)
+    start = time.perf_counter()
+    try:
+        steps = core.run(measure=not args.no_measurements)
+    finally:
+        if ring is not None:
+            ring.close()
+        if server is not None:
+            server.stop()
+        core.disable_checkpoints()
+        core.disable_parallel()
+    elapsed = time.perf_counter() - start
+    if inst is not None:
+        inst.flush(core.time_step)
+        inst.close()
+        if args.profile_every and not args.profile_out:
+            print(f"Profile of {inst.profiled_steps} sampled steps:")
+            print(inst.profile_summary(limit=15))
+    print(f"Simulated {steps} steps in {elapsed:.3f} s ({steps / max(elapsed, 1e-9):.1f} steps/s).")
+    if log is not None:
+        log.save(args.record)
+        print(f"Replay log saved to {args.record} ({len(log.spawns)} decoy spawns).")
+    if core.compressed_truth is not None:
+        core.export_truth(args.truth_file)
+    if core.tracker is not None:
+        core.tracker.export_csv(args.track)
+    if args.no_measurements:
+        return
+    if args.format == "npz":
+        core.export_to_npz(args.measurement_file or "measurement_data.npz")
+    elif args.format == "detections":
+        core.export_detections_csv(args.measurement_file or "detections.csv")
+    else:
+        core.export_to_csv(args.measurement_file or "measurement_data.csv", args.ship_file)
+
+
+if __name__ == "__main__":
+    main()
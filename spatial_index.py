@@ -0,0 +1,242 @@
+import numpy as np
+
+
+class UniformGridIndex:
+    """
+    x-y 平面上的均匀网格空间索引，用于按距离查找最近的 k 个目标。
+    目标基本都在海面附近，因此只在 x-y 上分格；距离按三维欧氏距离计算。
+    每个时间步用 build() 重建（一次排序），query_knn() 对全部查询点一起做数组运算、只访问查询点周围的网格，
+    单次查询的代价与目标总数无关，只与附近目标的密度有关。
+    """
+
+    def __init__(self, cell_size=None):
+        """
+        :param cell_size: 网格边长；为 None 时在 build() 中按目标密度自动选取
+        """
+        self.cell_size = cell_size
+        self._cell = 1.0
+        self._points = np.empty((0, 3))
+        self._order = np.empty(0, dtype=np.int64)
+        self._keys = np.empty(0, dtype=np.int64)
+        self._starts = np.empty(0, dtype=np.int64)
+        self._ends = np.empty(0, dtype=np.int64)
+        self._min_cell = np.zeros(2, dtype=np.int64)
+        self._max_cell = np.zeros(2, dtype=np.int64)
+        self._z_range = (0.0, 0.0)
+        self._groups = None
+        self._group_keys = np.empty(0, dtype=np.int64)
+        self._group_order = np.empty(0, dtype=np.int64)
+        self._num_groups = 1
+
+    # 网格坐标 (i, j) 编码为一个整数键: i * _KEY_STRIDE + j
+    _KEY_STRIDE = 1 << 31
+
+    def __len__(self):
+        return self._points.shape[0]
+
+    def build(self, points, groups=None):
+        """
+        用当前目标位置重建索引。
+        :param points: (N, 3) 目标位置
+        :param groups: (N,) 非负整数分组编号，query_pairs 只在同组之间配对；None 表示全部同组
+        """
+        self._points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        n = self._points.shape[0]
+        self._groups = None if groups is None else np.asarray(groups, dtype=np.int64).reshape(-1)
+        if n == 0:
+            self._keys = np.empty(0, dtype=np.int64)
+            self._group_keys = np.empty(0, dtype=np.int64)
+            return
+
+        if self.cell_size is not None:
+            self._cell = float(self.cell_size)
+        else:
+            # 平均每个网格约 4 个目标
+            extent = np.ptp(self._points[:, :2], axis=0).max()
+            self._cell = max(extent * np.sqrt(4.0 / n), 1e-6) if extent > 0 else 1.0
+
+        self._z_range = (self._points[:, 2].min(), self._points[:, 2].max())
+        cells = np.floor(self._points[:, :2] / self._cell).astype(np.int64)
+        self._min_cell = cells.min(axis=0)
+        self._max_cell = cells.max(axis=0)
+        keys = self._encode(cells)
+
+        self._order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[self._order]
+        self._keys, self._starts = np.unique(sorted_keys, return_index=True)
+        self._ends = np.append(self._starts[1:], n)
+
+        # query_pairs 使用的紧凑键：(网格行号 * 网格列数 + 列号) * 组数 + 组号，按键排序
+        self._num_groups = 1 if self._groups is None else int(self._groups.max()) + 1
+        group_keys = self._compact_key(cells, self._groups)
+        self._group_order = np.argsort(group_keys, kind="stable")
+        self._group_keys = group_keys[self._group_order]
+
+    def query_knn(self, queries, k, max_range=None, headings=None, fov_deg=None):
+        """
+        为每个查询点找出距离最近的 k 个目标（可选距离门限与视场门限）。
+
+        :param queries: (Q, 3) 查询点（导弹位置）
+        :param k: 每个查询点返回的最大目标数
+        :param max_range: 最大探测距离，None 表示不限
+        :param headings: (Q, 3) 查询点朝向，与 fov_deg 一起使用；朝向为零向量的查询点不做视场门限
+        :param fov_deg: 视场全角(度)，None 表示不限
+        :return: (indices, distances)，形状均为 (Q, k)，按距离从近到远排列；
+                 不足 k 个的位置 indices 为 -1、distances 为 inf
+        """
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        num_queries = queries.shape[0]
+        indices = np.full((num_queries, k), -1, dtype=np.int64)
+        distances = np.full((num_queries, k), np.inf)
+        if len(self) == 0 or k == 0:
+            return indices, distances
+
+        cos_half_fov = None
+        if fov_deg is not None and headings is not None:
+            cos_half_fov = np.cos(np.radians(fov_deg) / 2.0)
+            headings = np.asarray(headings, dtype=np.float64).reshape(-1, 3)
+
+        range_limit = np.inf if max_range is None else float(max_range)
+        centers = np.floor(queries[:, :2] / self._cell).astype(np.int64)
+        # 搜索圈数上限：覆盖整个网格，或超过最大探测距离
+        max_ring = np.maximum(np.abs(centers - self._min_cell), np.abs(centers - self._max_cell)).max(axis=1)
+        if np.isfinite(range_limit):
+            max_ring = np.minimum(max_ring, int(np.ceil(range_limit / self._cell)) + 1)
+        # 所有目标与查询点的最小高度差，用于收紧未搜索区域的距离下界
+        dz_min = np.maximum(0.0, np.maximum(self._z_range[0] - queries[:, 2], queries[:, 2] - self._z_range[1]))
+        # 初始圈数：到网格的切比雪夫距离，再加上平均约有 k 个目标的圈数（平均每格约 len/网格数 个目标）
+        density = len(self) / np.prod(self._max_cell - self._min_cell + 1)
+        first_ring = int(np.ceil((np.sqrt(k / density) - 1) / 2))
+        gap = np.maximum(self._min_cell - centers, centers - self._max_cell).clip(0).max(axis=1)
+        rings = np.minimum(gap + first_ring, max_ring)
+
+        unit_headings = None
+        if cos_half_fov is not None:
+            norms = np.linalg.norm(headings, axis=1)
+            unit_headings = np.divide(headings, norms[:, None], out=np.zeros_like(headings),
+                                      where=norms[:, None] > 0)
+
+        # 所有未完成的查询点一起搜索 [-ring, ring]² 范围内的网格；第 k 近的目标比方块外的区域更近
+        # （或已覆盖全部网格）的查询点完成，其余查询点把圈数扩大一倍再搜索
+        active = np.arange(num_queries)
+        while active.size:
+            owner, candidates = self._square_members(centers[active], rings[active])
+            query_idx = active[owner]
+            d = self._points[candidates] - queries[query_idx]
+            dist = np.sqrt(np.einsum("ij,ij->i", d, d))
+            keep = dist <= range_limit
+            if unit_headings is not None:
+                heading = unit_headings[query_idx]
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    cos_angle = np.einsum("ij,ij->i", d, heading) / dist
+                keep &= (cos_angle >= cos_half_fov) | (dist == 0) | ~heading.any(axis=1)
+            owner, candidates, dist = owner[keep], candidates[keep], dist[keep]
+
+            # 按 (查询点, 距离, 目标编号) 排序，每个查询点的前 k 个即最近的 k 个
+            order = np.lexsort((candidates, dist, owner))
+            owner, candidates, dist = owner[order], candidates[order], dist[order]
+            starts = np.searchsorted(owner, np.arange(len(active)))
+            found = np.bincount(owner, minlength=len(active))
+            kth = np.full(len(active), np.inf)
+            enough = found >= k
+            kth[enough] = dist[starts[enough] + k - 1]
+            ring = rings[active]
+            done = (enough & (kth <= np.hypot(ring * self._cell, dz_min[active]))) | (ring >= max_ring[active])
+
+            rank = np.arange(len(owner)) - starts[owner]
+            take = (rank < k) & done[owner]
+            indices[active[owner[take]], rank[take]] = candidates[take]
+            distances[active[owner[take]], rank[take]] = dist[take]
+            active = active[~done]
+            rings[active] = np.minimum(2 * rings[active] + 1, max_ring[active])
+        return indices, distances
+
+    def query_pairs(self, queries, radius, groups=None):
+        """
+        找出所有 x-y 平面距离不超过 radius 的 (查询点, 目标) 对，全部为数组运算：
+        展开每个查询点周围的网格，用 searchsorted 取出各网格的候选区间，再按距离精确筛选，
+        代价与访问的网格数和候选对数成正比。
+
+        :param queries: (Q, 2) 或 (Q, 3) 查询点，只使用 x, y
+        :param radius: 标量或 (Q,) 每个查询点的搜索半径
+        :param groups: (Q,) 查询点的分组编号，只与 build() 时同组的目标配对；None 表示全部同组
+        :return: (query_idx, point_idx, dist2)，按 query_idx 排序；dist2 为 x-y 平面距离的平方
+        """
+        queries = np.asarray(queries, dtype=np.float64)
+        queries = queries.reshape(len(queries), -1)[:, :2]
+        num_queries = len(queries)
+        radius = np.broadcast_to(np.asarray(radius, dtype=np.float64), (num_queries,))
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+        if len(self) == 0 or num_queries == 0:
+            return empty
+        if groups is None:
+            groups = np.zeros(num_queries, dtype=np.int64)
+        groups = np.asarray(groups, dtype=np.int64)
+        # 不存在于索引中的组没有候选目标
+        in_range = (groups >= 0) & (groups < self._num_groups)
+
+        # 每个查询点需要检查的网格偏移量 (di, dj) ∈ [-ring, ring]²，一次性展开
+        rings = np.ceil(radius / self._cell).astype(np.int64)
+        sides = 2 * rings + 1
+        counts = np.where(in_range, sides * sides, 0)
+        q = np.repeat(np.arange(num_queries), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = np.floor(queries / self._cell).astype(np.int64)[q]
+        cells[:, 0] += local // sides[q] - rings[q]
+        cells[:, 1] += local % sides[q] - rings[q]
+        inside = np.all((cells >= self._min_cell) & (cells <= self._max_cell), axis=1)
+        q, cells = q[inside], cells[inside]
+
+        keys = self._compact_key(cells, groups[q])
+        starts = np.searchsorted(self._group_keys, keys, side="left")
+        counts = np.searchsorted(self._group_keys, keys, side="right") - starts
+        hit = counts > 0
+        if not hit.any():
+            return empty
+        q, starts, counts = q[hit], starts[hit], counts[hit]
+        # 把每个 (查询点, 网格) 的 [start, end) 区间展开为候选对
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        query_idx = np.repeat(q, counts)
+        point_idx = self._group_order[np.repeat(starts, counts) + offsets]
+        d = self._points[point_idx, :2] - queries[query_idx]
+        dist2 = np.einsum("ij,ij->i", d, d)
+        keep = dist2 <= radius[query_idx] ** 2
+        query_idx, point_idx, dist2 = query_idx[keep], point_idx[keep], dist2[keep]
+        order = np.argsort(query_idx, kind="stable")
+        return query_idx[order], point_idx[order], dist2[order]
+
+    def _compact_key(self, cells, groups):
+        width = self._max_cell[1] - self._min_cell[1] + 1
+        key = (cells[:, 0] - self._min_cell[0]) * width + (cells[:, 1] - self._min_cell[1])
+        if groups is None:
+            return key
+        return key * self._num_groups + groups
+
+    def _square_members(self, centers, rings):
+        """
+        每个中心周围 [-ring, ring]² 网格（裁剪到索引范围内）中的全部目标。
+        :return: (owner, point_idx)，owner 为 centers 中的下标
+        """
+        lo = np.maximum(centers - rings[:, None], self._min_cell)
+        hi = np.minimum(centers + rings[:, None], self._max_cell)
+        size = (hi - lo + 1).clip(0)
+        owner, local = _expand(size[:, 0] * size[:, 1])
+        cells = lo[owner] + np.stack([local // size[owner, 1], local % size[owner, 1]], axis=1)
+        keys = self._encode(cells)
+        pos = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+        hit = self._keys[pos] == keys
+        owner, pos = owner[hit], pos[hit]
+        counts = self._ends[pos] - self._starts[pos]
+        cell_of, offsets = _expand(counts)
+        return owner[cell_of], self._order[self._starts[pos][cell_of] + offsets]
+
+    def _encode(self, cells):
+        offset = self._KEY_STRIDE // 2  # 网格坐标范围为 ±2^30
+        return (cells[..., 0] + offset) * self._KEY_STRIDE + (cells[..., 1] + offset)
+
+
+def _expand(counts):
+    """把每段长度 counts[i] 展开为 (段号, 段内序号) 两个数组。"""
+    counts = np.asarray(counts, dtype=np.int64)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    return owner, np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
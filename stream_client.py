@@ -0,0 +1,132 @@
+"""
+stream_server 的客户端库：连接推送服务，逐帧读取测量数据。
+
+    client = MeasurementStreamClient(port=5555)
+    for frame in client:
+        rows = frame_to_rows(frame)   # 与 measurement_data.csv 相同的行格式
+"""
+import asyncio
+import json
+import socket
+
+import numpy as np
+
+from stream_server import LENGTH_STRUCT, MSG_BYE, MSG_FRAME, MSG_HELLO, decode_frame
+
+
+class MeasurementStreamClient:
+    """阻塞式客户端，可以迭代得到每一帧；服务端结束或断开时迭代结束。"""
+
+    def __init__(self, host="127.0.0.1", port=None, unix_path=None, timeout=None):
+        """
+        :param unix_path: 不为 None 时连接 Unix socket，否则连接 host:port
+        :param timeout: socket 超时（秒），None 表示一直等待
+        """
+        if unix_path is not None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(unix_path)
+        else:
+            self.sock = socket.create_connection((host, port), timeout=timeout)
+        self._file = self.sock.makefile("rb")
+        self.bytes_received = 0
+        self.frames_received = 0
+        self.frames_missed = 0  # 根据 frame_no 跳号统计的被丢弃/合并的帧
+        self._last_frame_no = None
+
+        msg_type, payload = self._read_message()
+        if msg_type != MSG_HELLO:
+            raise ConnectionError("服务端未发送MSG_HELLO")
+        self.meta = json.loads(payload[1:].decode("utf-8"))
+
+    def _read_message(self):
+        prefix = self._file.read(LENGTH_STRUCT.size)
+        if len(prefix) < LENGTH_STRUCT.size:
+            return None, b""
+        (length,) = LENGTH_STRUCT.unpack(prefix)
+        payload = self._file.read(length)
+        if len(payload) < length:
+            return None, b""
+        self.bytes_received += LENGTH_STRUCT.size + length
+        return payload[0], payload
+
+    def recv_frame(self):
+        """
+        读取下一帧。
+        :return: decode_frame 的结果；服务端结束或连接断开时返回 None
+        """
+        msg_type, payload = self._read_message()
+        if msg_type != MSG_FRAME:
+            return None if msg_type in (None, MSG_BYE) else self.recv_frame()
+        frame = decode_frame(payload, self.meta)
+        if self._last_frame_no is not None:
+            self.frames_missed += frame["frame_no"] - self._last_frame_no - 1
+        self._last_frame_no = frame["frame_no"]
+        self.frames_received += 1
+        return frame
+
+    def __iter__(self):
+        while True:
+            frame = self.recv_frame()
+            if frame is None:
+                return
+            yield frame
+
+    def close(self):
+        self._file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def aiter_frames(host="127.0.0.1", port=None, unix_path=None):
+    """
+    asyncio 版本：异步迭代每一帧。
+        async for meta, frame in aiter_frames(port=5555): ...
+    """
+    if unix_path is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    meta = None
+    try:
+        while True:
+            try:
+                prefix = await reader.readexactly(LENGTH_STRUCT.size)
+                payload = await reader.readexactly(LENGTH_STRUCT.unpack(prefix)[0])
+            except asyncio.IncompleteReadError:
+                return
+            if payload[0] == MSG_HELLO:
+                meta = json.loads(payload[1:].decode("utf-8"))
+            elif payload[0] == MSG_FRAME:
+                yield meta, decode_frame(payload, meta)
+            elif payload[0] == MSG_BYE:
+                return
+    finally:
+        writer.close()
+
+
+def frame_to_rows(frame):
+    """
+    把一帧展开为 measurement_data 的行格式：
+    [time_step, missile_id, sensor_id, 8 × MAX_TARGETS 个字段]，无测量的槽位为 None。
+    """
+    values = frame["values"]
+    M, S, T, F = values.shape
+    rows = np.empty((M * S, 3 + T * F), dtype=object)
+    rows[:, 0] = frame["time_step"]
+    rows[:, 1] = np.repeat(np.arange(M), S).tolist()
+    rows[:, 2] = np.tile(np.arange(S), M).tolist()
+    flat = values.reshape(M * S, T * F).astype(object)
+    flat[~np.repeat(frame["valid"].reshape(M * S, T), F, axis=1)] = None
+    rows[:, 3:] = flat
+    return rows.tolist()
+
+
+def frame_ship_row(frame):
+    """船舶真实位置行 [time_step, x1, y1, z1, x2, ...]，与 ship_loc.csv 相同。"""
+    return [frame["time_step"]] + frame["ships"].reshape(-1).tolist()
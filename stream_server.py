@@ -0,0 +1,315 @@
+"""
+基于 asyncio 的实时测量数据推送服务。
+
+仿真每步把 generate_sensor_measurements 产生的测量块和船舶真实位置编码为一帧，
+推送给所有连接的订阅者（本地 TCP 或 Unix socket）。服务运行在独立线程的事件循环中，
+仿真线程只负责编码一次并把帧交给事件循环，不会因为客户端慢而阻塞。
+
+帧格式（全部小端）
+==================
+
+每条消息 = uint32 长度 + 消息体（长度不含这 4 个字节），消息体第一个字节为消息类型：
+
+- MSG_HELLO (1)：连接建立后发送一次，后跟 UTF-8 JSON 元数据
+  {"version", "num_missiles", "num_sensors", "max_targets", "num_fields", "max_ships", "field_names"}
+- MSG_FRAME (2)：一个时间步，固定 28 字节头
+
+      uint8   type
+      uint8   reserved[3]
+      uint64  frame_no    帧编号，连续递增；客户端看到跳号即说明中间的帧被丢弃/合并
+      int64   time_step
+      uint32  num_valid   有效测量槽位数 V
+      uint32  num_ships   船的数量 C
+
+  之后依次为：
+      uint8[ceil(M*S*T/8)]  有效掩码，按 (导弹, 传感器, 目标槽位) 行优先展开后 np.packbits（高位在前）
+      float64[V][F]         有效槽位的测量值，顺序与掩码中 1 的顺序相同
+      float64[C][3]         船舶真实位置
+- MSG_BYE (3)：服务端正常结束时发送，无消息体
+
+背压：每个订阅者有自己的待发送队列，发送协程在 drain() 上等待的只是该订阅者自己。
+队列满时按 policy 处理：
+- "drop"：丢弃新帧，已排队的帧按顺序发出
+- "coalesce"：只保留最新一帧，未发出的旧帧直接丢弃
+"""
+import asyncio
+import json
+import struct
+import threading
+from collections import deque
+
+import numpy as np
+
+from measurement_io import FIELD_NAMES
+
+STREAM_VERSION = 1
+MSG_HELLO = 1
+MSG_FRAME = 2
+MSG_BYE = 3
+
+LENGTH_STRUCT = struct.Struct("<I")
+FRAME_HEADER = struct.Struct("<B3xQqII")
+
+
+def encode_message(payload):
+    """加上 4 字节长度前缀。"""
+    return LENGTH_STRUCT.pack(len(payload)) + payload
+
+
+def encode_hello(meta):
+    return encode_message(bytes([MSG_HELLO]) + json.dumps(meta).encode("utf-8"))
+
+
+def encode_bye():
+    return encode_message(bytes([MSG_BYE]))
+
+
+def encode_frame(frame_no, time_step, block, valid, ships):
+    """
+    把一个时间步编码为 MSG_FRAME 消息（含长度前缀）。
+    :param block: (M, S, T, F) 测量值
+    :param valid: (M, S, T) 有效掩码
+    :param ships: (C, 3) 船舶真实位置
+    """
+    valid = np.asarray(valid, dtype=bool)
+    values = np.ascontiguousarray(block[valid], dtype="<f8")
+    ships = np.ascontiguousarray(ships, dtype="<f8")
+    header = FRAME_HEADER.pack(MSG_FRAME, frame_no, time_step, values.shape[0], ships.shape[0])
+    return encode_message(b"".join([header, np.packbits(valid.reshape(-1)).tobytes(),
+                                    values.tobytes(), ships.tobytes()]))
+
+
+def decode_frame(payload, meta):
+    """
+    解码 MSG_FRAME 消息体（不含长度前缀）。
+    :param meta: MSG_HELLO 中的元数据
+    :return: dict(frame_no, time_step, values (M, S, T, F)，无测量处为 NaN, valid (M, S, T), ships (C, 3))
+    """
+    _, frame_no, time_step, num_valid, num_ships = FRAME_HEADER.unpack_from(payload)
+    shape = (meta["num_missiles"], meta["num_sensors"], meta["max_targets"])
+    num_fields = meta["num_fields"]
+    num_slots = shape[0] * shape[1] * shape[2]
+
+    offset = FRAME_HEADER.size
+    mask_bytes = (num_slots + 7) // 8
+    valid = np.unpackbits(np.frombuffer(payload, np.uint8, mask_bytes, offset), count=num_slots).astype(bool)
+    offset += mask_bytes
+    compact = np.frombuffer(payload, "<f8", num_valid * num_fields, offset).reshape(num_valid, num_fields)
+    offset += compact.nbytes
+    ships = np.frombuffer(payload, "<f8", num_ships * 3, offset).reshape(num_ships, 3)
+
+    values = np.full((num_slots, num_fields), np.nan)
+    values[valid] = compact
+    return {
+        "frame_no": frame_no,
+        "time_step": time_step,
+        "values": values.reshape(shape + (num_fields,)),
+        "valid": valid.reshape(shape),
+        "ships": ships,
+    }
+
+
+class _Subscriber:
+    """一个客户端连接：待发送队列、发送协程和统计。"""
+
+    def __init__(self, writer, max_pending, policy):
+        self.writer = writer
+        self.max_pending = max_pending
+        self.policy = policy
+        self.pending = deque()
+        self.wakeup = asyncio.Event()
+        self.closing = False
+        self.sent = 0
+        self.dropped = 0
+        self.peer = writer.get_extra_info("peername")
+
+    def offer(self, message):
+        """在事件循环线程中调用：按背压策略把一帧放入待发送队列。"""
+        if self.policy == "coalesce":
+            self.dropped += len(self.pending)
+            self.pending.clear()
+        elif len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self.pending.append(message)
+        self.wakeup.set()
+
+    async def send_loop(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.pending:
+                    self.writer.write(self.pending.popleft())
+                    self.sent += 1
+                    await self.writer.drain()
+                if self.closing:
+                    return
+        except ConnectionError:
+            # 客户端已断开，由 _handle_client 清理
+            return
+
+
+class MeasurementStreamServer:
+    """
+    实时推送服务。典型用法：
+
+        server = core.start_stream_server(port=5555)
+        core.run()
+        server.stop()
+
+    也可以手动 start() 后用 attach(core) 注册为 SimulationCore 的帧回调。
+    """
+    POLICIES = ("drop", "coalesce")
+
+    def __init__(self, host="127.0.0.1", port=0, unix_path=None, max_pending=8, policy="drop"):
+        """
+        :param host: TCP 监听地址
+        :param port: TCP 端口，0 表示由系统分配（启动后见 address）
+        :param unix_path: 不为 None 时监听该路径的 Unix socket，忽略 host/port
+        :param max_pending: 每个订阅者最多排队的帧数（"drop" 策略）
+        :param policy: 订阅者跟不上时的处理方式，"drop" 或 "coalesce"
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy必须是{self.POLICIES}之一")
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.max_pending = max_pending
+        self.policy = policy
+        self.meta = None
+        self.address = None
+        self.frames_published = 0
+
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._subscribers = set()
+        self._finished = []  # 已断开订阅者的统计
+
+    # ========== 生命周期 ==========
+
+    def start(self):
+        """在后台线程中启动事件循环并开始监听，返回监听地址。"""
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self._listen())
+            except Exception as e:
+                errors.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="MeasurementStreamServer", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        return self.address
+
+    async def _listen(self):
+        if self.unix_path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_client, path=self.unix_path)
+            self.address = self.unix_path
+        else:
+            self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+            self.address = self._server.sockets[0].getsockname()[:2]
+
+    def stop(self, timeout=5.0):
+        """发出剩余帧和 MSG_BYE，关闭所有连接并结束后台线程。"""
+        if self._thread is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(timeout), self._loop)
+        future.result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    async def _shutdown(self, timeout):
+        self._server.close()
+        subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.pending.append(encode_bye())
+            sub.closing = True
+            sub.wakeup.set()
+        if subscribers:
+            await asyncio.wait([sub.task for sub in subscribers], timeout=timeout)
+        for sub in subscribers:
+            # 超时仍未发完的订阅者直接断开
+            sub.task.cancel()
+            sub.writer.close()
+        await self._server.wait_closed()
+
+    # ========== 仿真侧 ==========
+
+    def attach(self, core):
+        """按 SimulationCore 的规模设置元数据，并注册为每步回调。"""
+        missile = core.missile
+        self.meta = {
+            "version": STREAM_VERSION,
+            "num_missiles": core.missile_count,
+            "num_sensors": missile.NUM_SENSORS,
+            "max_targets": missile.MAX_TARGETS,
+            "num_fields": len(FIELD_NAMES),
+            "max_ships": core.carrier_count,
+            "field_names": FIELD_NAMES,
+        }
+        core.add_frame_listener(self.on_frame)
+
+    def on_frame(self, core):
+        """SimulationCore 每步回调：没有订阅者时只计数，否则编码一次后交给事件循环广播。"""
+        self.publish(core.time_step, core.missile.last_block, core.missile.last_valid,
+                     core.carrier.get_positions())
+
+    def publish(self, time_step, block, valid, ships):
+        """发布一帧，可在任意线程调用，不会阻塞。"""
+        frame_no = self.frames_published
+        self.frames_published += 1
+        if not self._subscribers:
+            return
+        message = encode_frame(frame_no, time_step, block, valid, ships)
+        self._loop.call_soon_threadsafe(self._broadcast, message)
+
+    def _broadcast(self, message):
+        for sub in self._subscribers:
+            if not sub.closing:
+                sub.offer(message)
+
+    # ========== 客户端连接 ==========
+
+    async def _handle_client(self, reader, writer):
+        sub = _Subscriber(writer, self.max_pending, self.policy)
+        writer.write(encode_hello(self.meta))
+        sub.task = asyncio.ensure_future(sub.send_loop())
+        self._subscribers.add(sub)
+        try:
+            # 客户端不发送数据；读到 EOF 或发送出错即认为断开
+            read_task = asyncio.ensure_future(reader.read())
+            await asyncio.wait([read_task, sub.task], return_when=asyncio.FIRST_COMPLETED)
+            read_task.cancel()
+            if not sub.closing:
+                sub.task.cancel()
+        finally:
+            self._subscribers.discard(sub)
+            self._finished.append(sub)
+            if not sub.closing:
+                writer.close()
+
+    def num_connected(self):
+        """当前仍连接的订阅者数量（不含已断开的）。"""
+        return len(self._subscribers)
+
+    def stats(self):
+        """
+        各订阅者的发送统计。
+        :return: list of dict(peer, sent, dropped, connected)
+        """
+        return [{"peer": sub.peer, "sent": sub.sent, "dropped": sub.dropped, "connected": sub in self._subscribers}
+                for sub in list(self._subscribers) + self._finished]
@@ -0,0 +1,358 @@
+"""
+量测-航迹关联：每步读取 Missile.generate_sensor_measurements 的测量块，为每枚导弹维护一组目标航迹。
+
+测量行中的 TargetN 槽位没有身份（船、箔条、角反射器混在一起，漏检也不会让后续槽位移动），
+这里按位置把测量关联到航迹上：
+1) 预测：每条航迹是 x-y 平面上的匀速 (CV) 卡尔曼滤波器，状态 [x, y, vx, vy]；
+2) 门限：以航迹预测位置为中心、按协方差给出的半径在 UniformGridIndex.query_pairs 中取候选测量，
+   再用误差椭圆（测量协方差）加航迹协方差计算马氏距离 d²，d² < gate 的对才参与分配；
+3) 分配：在稀疏的候选对上做拍卖算法（auction_assign），每条航迹至多分到一个测量，
+   也可以不分配（相当于代价为 gate 的虚拟测量）；
+4) 更新 / 起始 / 删除：分到测量的航迹做卡尔曼更新，未分配的测量起始新航迹，
+   连续 confirm_hits 步有更新的航迹确认，长时间未更新的航迹删除。
+
+同一枚导弹的 5 个传感器依次作为 5 次扫描处理（顺序更新）；开启融合时直接使用融合行。
+所有步骤都对全部导弹的航迹/测量一次性做数组运算，代价与候选对数近似成线性，而不是 航迹数 × 测量数。
+"""
+import csv
+
+import numpy as np
+
+from fusion import ellipse_covariance
+from missile import error_ellipse
+from spatial_index import UniformGridIndex
+
+GATE_CHI2_99 = 9.21  # 2 自由度卡方分布的 99% 分位数
+
+TRACK_DTYPE = np.dtype([
+    ("time_step", np.int32), ("missile_id", np.int32), ("track_id", np.int64),
+    ("x", np.float64), ("y", np.float64), ("vx", np.float64), ("vy", np.float64),
+    ("major_axis", np.float64), ("minor_axis", np.float64), ("angle_rad", np.float64),
+    ("confidence", np.float64), ("hits", np.int32), ("misses", np.int32), ("confirmed", np.bool_),
+])
+
+# 误差椭圆退化时测量方差的下限
+_MIN_VARIANCE = 1e-12
+
+
+def _segments(sorted_keys):
+    """已排序键数组中每段相同键的起点。"""
+    if len(sorted_keys) == 0:
+        return np.empty(0, dtype=np.int64)
+    change = np.empty(len(sorted_keys), dtype=bool)
+    change[0] = True
+    np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=change[1:])
+    return np.flatnonzero(change)
+
+
+def auction_assign(rows, cols, benefit, num_rows, num_cols, eps=1e-3, max_rounds=100000):
+    """
+    稀疏分配的拍卖算法（Jacobi 形式：所有未分配的行同时出价，每轮全部为数组运算）。
+    每行可以分到一个列，也可以不分配（收益 0）；只有给出的 (行, 列) 对可以分配。
+    结果的总收益与最优解相差不超过 行数 × eps。
+
+    :param rows, cols: (K,) 候选对的行号（航迹）和列号（测量）
+    :param benefit: (K,) 候选对的收益，只有正收益的对才可能被分配
+    :param num_rows, num_cols: 行数和列数
+    :param eps: 每次出价的最小加价
+    :return: (num_rows,) 每行分到的列号，未分配为 -1
+    """
+    assigned = np.full(num_rows, -1, dtype=np.int64)
+    if len(rows) == 0:
+        return assigned
+    order = np.argsort(rows, kind="stable")
+    rows, cols, benefit = rows[order], cols[order], np.asarray(benefit, dtype=np.float64)[order]
+    prices = np.zeros(num_cols)
+    owner = np.full(num_cols, -1, dtype=np.int64)
+    active = np.zeros(num_rows, dtype=bool)
+    active[rows] = True
+
+    for _ in range(max_rounds):
+        sel = np.flatnonzero(active[rows])
+        if sel.size == 0:
+            break
+        r, c = rows[sel], cols[sel]
+        value = benefit[sel] - prices[c]
+        starts = _segments(r)
+        bidders = r[starts]
+        seg = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(r))))
+
+        # 每行的最优与次优（次优至少为不分配的 0）
+        best = np.maximum.reduceat(value, starts)
+        is_best = np.flatnonzero(value == best[seg])
+        best_pos = is_best[np.unique(seg[is_best], return_index=True)[1]]
+        masked = value.copy()
+        masked[best_pos] = -np.inf
+        second = np.maximum(np.maximum.reduceat(masked, starts), 0.0)
+
+        # 最优值不为正的行放弃（不分配）
+        bidding = best > 0
+        active[bidders[~bidding]] = False
+        bidders, best_pos = bidders[bidding], best_pos[bidding]
+        if bidders.size == 0:
+            continue
+        targets = c[best_pos]
+        bids = prices[targets] + (best[bidding] - second[bidding]) + eps
+
+        # 每列出价最高者中标，原持有者重新参与下一轮
+        order = np.lexsort((-bids, targets))
+        targets, bids, bidders = targets[order], bids[order], bidders[order]
+        first = _segments(targets)
+        won, price, winner = targets[first], bids[first], bidders[first]
+        displaced = owner[won]
+        displaced = displaced[displaced >= 0]
+        assigned[displaced] = -1
+        active[displaced] = True
+        owner[won] = winner
+        assigned[winner] = won
+        prices[won] = price
+        active[winner] = False
+    return assigned
+
+
+class Tracker:
+    """
+    按导弹分组的多目标跟踪器。用 SimulationCore.enable_tracking() 挂到仿真上，
+    或直接对测量块调用 step()。航迹状态以数组保存，第 i 条航迹属于导弹 groups[i]。
+    """
+
+    SOURCES = ("auto", "sensors", "fused")
+
+    def __init__(self, num_groups, gate=GATE_CHI2_99, process_noise=1e-4, confirm_hits=3, max_misses=5,
+                 initial_velocity_std=0.1, merge_gate=4.0, source="auto", record=True, auction_eps=1e-3):
+        """
+        :param num_groups: 分组数（导弹数量）
+        :param gate: 马氏距离平方的门限，默认为 2 自由度卡方分布的 99% 分位数
+        :param process_noise: 匀速模型的加速度噪声谱密度（每时间步）
+        :param confirm_hits: 有更新的步数达到该值后航迹确认
+        :param max_misses: 已确认航迹连续未更新超过该步数时删除；未确认航迹未更新一步即删除
+        :param initial_velocity_std: 新航迹速度的初始标准差
+        :param merge_gate: 同一导弹的两条航迹位置的马氏距离平方小于该值时视为重复，保留命中次数多的一条；
+                           0 表示不合并
+        :param source: "sensors" 把 5 个传感器依次作为扫描；"fused" 使用融合行（需要 Missile 开启 fusion）；
+                       "auto" 有融合行时用融合行
+        :param record: 是否保存每步的航迹快照，供 export_csv() 导出
+        :param auction_eps: 拍卖算法的最小加价
+        """
+        if source not in self.SOURCES:
+            raise ValueError(f"source必须是{self.SOURCES}之一")
+        self.num_groups = num_groups
+        self.gate = gate
+        self.process_noise = process_noise
+        self.confirm_hits = confirm_hits
+        self.max_misses = max_misses
+        self.initial_velocity_std = initial_velocity_std
+        self.merge_gate = merge_gate
+        self.source = source
+        self.record = record
+        self.auction_eps = auction_eps
+        self.index = UniformGridIndex()
+
+        self.ids = np.empty(0, dtype=np.int64)
+        self.groups = np.empty(0, dtype=np.int64)
+        self.state = np.empty((0, 4))
+        self.cov = np.empty((0, 4, 4))
+        self.hits = np.empty(0, dtype=np.int32)
+        self.misses = np.empty(0, dtype=np.int32)
+        self.updates = np.empty(0, dtype=np.int64)
+        self.confidence = np.empty(0)
+        self.confirmed = np.empty(0, dtype=bool)
+        self.next_id = 0
+        self.time_step = None
+        self.history = []
+        # 最近一步的统计：候选对数、门限内的对数、分配数、新航迹数
+        self.last_stats = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ========== 每步处理 ==========
+
+    def on_frame(self, core):
+        """SimulationCore 的每步回调（见 SimulationCore.add_frame_listener）。"""
+        missile = core.missile
+        use_fused = self.source == "fused" or (self.source == "auto" and missile.last_fused is not None)
+        if use_fused and missile.last_fused is None:
+            raise ValueError("source=\"fused\" 需要 Missile 开启 fusion")
+        if use_fused:
+            self.step(core.time_step, missile.last_fused[:, None], missile.last_fused_valid[:, None])
+        else:
+            self.step(core.time_step, missile.last_block, missile.last_valid)
+
+    def step(self, time_step, block, valid):
+        """
+        处理一个时间步的测量。
+        :param block: (num_groups, num_scans, max_targets, 8) 测量块（字段同 Missile 的输出）
+        :param valid: (num_groups, num_scans, max_targets) 有效掩码
+        """
+        if self.time_step is not None:
+            self._predict(time_step - self.time_step)
+        self.time_step = time_step
+        self.last_stats = {"candidates": 0, "gated": 0, "assigned": 0, "created": 0}
+        updated = np.zeros(len(self), dtype=bool)
+        for scan in range(block.shape[1]):
+            groups, slots = np.nonzero(valid[:, scan])
+            updated = self._scan(groups, block[groups, scan, slots], updated)
+        self._maintain(updated)
+        if self.record:
+            self.history.append(self.tracks(confirmed_only=True))
+
+    def _predict(self, dt):
+        if dt == 0 or len(self) == 0:
+            return
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        q = self.process_noise
+        Q = np.zeros((4, 4))
+        Q[[0, 1], [0, 1]] = q * dt ** 3 / 3
+        Q[[0, 1], [2, 3]] = Q[[2, 3], [0, 1]] = q * dt ** 2 / 2
+        Q[[2, 3], [2, 3]] = q * dt
+        self.state = self.state @ F.T
+        self.cov = F @ self.cov @ F.T + Q
+
+    def _scan(self, groups, detections, updated):
+        """一次扫描：门限、分配、更新，未分配的测量起始新航迹。"""
+        n = len(groups)
+        if n == 0:
+            return updated
+        z = detections[:, :2]
+        r_xx, r_xy, r_yy = ellipse_covariance(detections[:, 3], detections[:, 4], detections[:, 5])
+        r_xx, r_yy = np.maximum(r_xx, _MIN_VARIANCE), np.maximum(r_yy, _MIN_VARIANCE)
+        # 已分配或落在某条航迹门限内的测量不起始新航迹（避免同一目标产生重复航迹）
+        used = np.zeros(n, dtype=bool)
+
+        if len(self):
+            # 候选半径：马氏距离门限对应的欧氏距离上界 sqrt(gate · (λmax(P) + λmax(R)))
+            p_xx, p_xy, p_yy = self.cov[:, 0, 0], self.cov[:, 0, 1], self.cov[:, 1, 1]
+            lam_p = 0.5 * (p_xx + p_yy) + np.sqrt((0.5 * (p_xx - p_yy)) ** 2 + p_xy * p_xy)
+            lam_r = 0.5 * (r_xx + r_yy) + np.sqrt((0.5 * (r_xx - r_yy)) ** 2 + r_xy * r_xy)
+            radius = np.sqrt(self.gate * (lam_p + lam_r.max()))
+            # 网格边长取候选半径的 90% 分位数：大多数航迹只需检查 3×3 个网格，个别不确定的航迹多查几圈
+            self.index.cell_size = max(float(np.percentile(radius, 90)), 1e-6)
+            self.index.build(detections[:, :3], groups)
+            ti, di, _ = self.index.query_pairs(self.state[:, :2], radius, self.groups)
+
+            # 马氏距离 d² = νᵀ S⁻¹ ν，S = P_pos + R
+            s_xx, s_xy, s_yy = p_xx[ti] + r_xx[di], p_xy[ti] + r_xy[di], p_yy[ti] + r_yy[di]
+            det = s_xx * s_yy - s_xy * s_xy
+            nu = z[di] - self.state[ti, :2]
+            d2 = (s_yy * nu[:, 0] ** 2 - 2 * s_xy * nu[:, 0] * nu[:, 1] + s_xx * nu[:, 1] ** 2) / det
+            gated = d2 < self.gate
+            ti, di, d2 = ti[gated], di[gated], d2[gated]
+            self.last_stats["candidates"] += len(gated)
+            self.last_stats["gated"] += len(ti)
+            used[di] = True
+
+            assignment = auction_assign(ti, di, self.gate - d2, len(self), n, eps=self.auction_eps)
+            tracks = np.flatnonzero(assignment >= 0)
+            if tracks.size:
+                dets = assignment[tracks]
+                R = np.stack([np.stack([r_xx[dets], r_xy[dets]], -1), np.stack([r_xy[dets], r_yy[dets]], -1)], -2)
+                self._update(tracks, z[dets], R, detections[dets, 7])
+                updated[tracks] = True
+                self.last_stats["assigned"] += len(tracks)
+
+        new = np.flatnonzero(~used)
+        if new.size:
+            self._create(groups[new], z[new], r_xx[new], r_xy[new], r_yy[new], detections[new, 7])
+            updated = np.append(updated, np.ones(new.size, dtype=bool))
+            self.last_stats["created"] += new.size
+        return updated
+
+    def _update(self, tracks, z, R, confidence):
+        """对分到测量的航迹做卡尔曼更新（Joseph 形式，保持协方差对称正定）。"""
+        P = self.cov[tracks]
+        S = P[:, :2, :2] + R
+        K = P[:, :, :2] @ np.linalg.inv(S)                # (k, 4, 2)
+        nu = z - self.state[tracks, :2]
+        self.state[tracks] += np.einsum("kij,kj->ki", K, nu)
+        I_KH = np.broadcast_to(np.eye(4), P.shape).copy()
+        I_KH[:, :, :2] -= K
+        self.cov[tracks] = I_KH @ P @ I_KH.transpose(0, 2, 1) + K @ R @ K.transpose(0, 2, 1)
+        self.updates[tracks] += 1
+        self.confidence[tracks] += (confidence - self.confidence[tracks]) / self.updates[tracks]
+
+    def _create(self, groups, z, r_xx, r_xy, r_yy, confidence):
+        k = len(groups)
+        cov = np.zeros((k, 4, 4))
+        cov[:, 0, 0], cov[:, 0, 1], cov[:, 1, 0], cov[:, 1, 1] = r_xx, r_xy, r_xy, r_yy
+        cov[:, 2, 2] = cov[:, 3, 3] = self.initial_velocity_std ** 2
+        self.ids = np.append(self.ids, np.arange(self.next_id, self.next_id + k))
+        self.next_id += k
+        self.groups = np.append(self.groups, groups)
+        self.state = np.concatenate([self.state, np.hstack([z, np.zeros((k, 2))])])
+        self.cov = np.concatenate([self.cov, cov])
+        self.hits = np.append(self.hits, np.zeros(k, dtype=np.int32))
+        self.misses = np.append(self.misses, np.zeros(k, dtype=np.int32))
+        self.updates = np.append(self.updates, np.ones(k, dtype=np.int64))
+        self.confidence = np.append(self.confidence, confidence)
+        self.confirmed = np.append(self.confirmed, np.zeros(k, dtype=bool))
+
+    def _maintain(self, updated):
+        """更新命中/丢失计数，确认、合并或删除航迹。"""
+        self.hits[updated] += 1
+        self.misses[updated] = 0
+        self.misses[~updated] += 1
+        self.confirmed |= self.hits >= self.confirm_hits
+        keep = self.misses <= np.where(self.confirmed, self.max_misses, 0)
+        if self.merge_gate > 0 and len(self) > 1:
+            keep &= ~self._duplicates()
+        if not keep.all():
+            for name in ("ids", "groups", "state", "cov", "hits", "misses", "updates", "confidence", "confirmed"):
+                setattr(self, name, getattr(self, name)[keep])
+
+    def _duplicates(self):
+        """
+        找出重复航迹：同一导弹的两条航迹位置差的马氏距离平方（协方差取两者之和）小于 merge_gate 时，
+        命中次数少（相同时编号大）的一条为重复。多个目标交会时两条真实航迹也可能被合并，merge_gate 不宜过大。
+        :return: (num_tracks,) 布尔数组
+        """
+        p_xx, p_xy, p_yy = self.cov[:, 0, 0], self.cov[:, 0, 1], self.cov[:, 1, 1]
+        lam_p = 0.5 * (p_xx + p_yy) + np.sqrt((0.5 * (p_xx - p_yy)) ** 2 + p_xy * p_xy)
+        radius = np.sqrt(self.merge_gate * (lam_p + lam_p.max()))
+        self.index.cell_size = max(float(np.percentile(radius, 90)), 1e-6)
+        positions = np.hstack([self.state[:, :2], np.zeros((len(self), 1))])
+        self.index.build(positions, self.groups)
+        a, b, _ = self.index.query_pairs(positions, radius, self.groups)
+        pair = a < b
+        a, b = a[pair], b[pair]
+        s_xx, s_xy, s_yy = p_xx[a] + p_xx[b], p_xy[a] + p_xy[b], p_yy[a] + p_yy[b]
+        nu = self.state[a, :2] - self.state[b, :2]
+        d2 = (s_yy * nu[:, 0] ** 2 - 2 * s_xy * nu[:, 0] * nu[:, 1] + s_xx * nu[:, 1] ** 2) / (
+            s_xx * s_yy - s_xy * s_xy)
+        close = d2 < self.merge_gate
+        a, b = a[close], b[close]
+        # 编号越小越早起始；命中次数相同时保留较早的航迹
+        a_wins = (self.hits[a] > self.hits[b]) | ((self.hits[a] == self.hits[b]) & (self.ids[a] < self.ids[b]))
+        duplicate = np.zeros(len(self), dtype=bool)
+        duplicate[np.where(a_wins, b, a)] = True
+        return duplicate
+
+    # ========== 输出 ==========
+
+    def tracks(self, confirmed_only=True):
+        """当前航迹（TRACK_DTYPE 结构化数组），位置误差椭圆由航迹协方差计算。"""
+        rows = np.flatnonzero(self.confirmed) if confirmed_only else np.arange(len(self))
+        out = np.empty(len(rows), dtype=TRACK_DTYPE)
+        out["time_step"] = -1 if self.time_step is None else self.time_step
+        out["missile_id"] = self.groups[rows]
+        out["track_id"] = self.ids[rows]
+        out["x"], out["y"], out["vx"], out["vy"] = self.state[rows].T
+        cov = self.cov[rows]
+        out["major_axis"], out["minor_axis"], out["angle_rad"] = error_ellipse(cov[:, 0, 0], cov[:, 0, 1],
+                                                                              cov[:, 1, 1])
+        out["confidence"] = self.confidence[rows]
+        out["hits"] = self.hits[rows]
+        out["misses"] = self.misses[rows]
+        out["confirmed"] = self.confirmed[rows]
+        return out
+
+    def export_csv(self, filename="tracks.csv"):
+        """导出每步已确认航迹的快照，每条航迹每步一行。"""
+        with open(filename, mode='w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(TRACK_DTYPE.names)
+            for snapshot in self.history:
+                writer.writerows(snapshot.tolist())
+        print(f"Tracks exported to {filename}.")
+
@@ -0,0 +1,301 @@
+"""
+船舶真实轨迹（ground truth）的存储。
+
+TruthRecorder：预分配、按块增长的 (时间步, 船, 3) 浮点数组，按时间步 O(1) 随机访问。
+接口与原来的 ship_locations_data 行列表兼容（append / len / 迭代得到行），CSV 输出不变。
+
+CompressedTruth：只保存初始位置、速度（方向向量）和 Carrier.move 报告的反弹事件，
+存储量为 O(反弹次数)，任意时间步的位置按分段线性公式即时重建。
+船的运动是 p += d，越界时 d 的对应分量取反，因此第 n 次移动后
+    p_n = p_0 + d_0 * Σ_{j<n} s_j，s_j = (-1)^(第 j 次移动之前的反弹次数)
+重建值与逐步累加的结果只差浮点舍入（约 1e-12），不要求逐位一致时使用。
+"""
+import argparse
+import csv
+
+import numpy as np
+
+import measurement_io
+
+# 反弹事件键：船-轴序号 << _KEY_SHIFT | 移动序号
+_KEY_SHIFT = 40
+
+
+class TruthRecorder:
+    """按块存储的船舶真实位置。"""
+
+    def __init__(self, chunk_steps=4096):
+        """
+        :param chunk_steps: 每块的时间步数；块满时新分配一块，已有数据不拷贝
+        """
+        self.chunk_steps = chunk_steps
+        self.clear()
+
+    def clear(self):
+        self._chunks = []       # 每块 (chunk_steps, 船数容量, 3)，缺失为 NaN
+        self._steps = []        # 每块 (chunk_steps,) 时间步
+        self._widths = []       # 每块 (chunk_steps,) 该步行宽（当时的最大船数）
+        self._capacity = 0
+        self.size = 0
+        self.max_ships = 0
+        self._step_index = None  # 时间步 -> 下标（时间步不连续时使用）
+        self._first_step = None
+
+    def __len__(self):
+        return self.size
+
+    def __bool__(self):
+        return self.size > 0
+
+    def __iter__(self):
+        """逐行返回 [time_step, x1, y1, z1, ...]，与原 ship_locations_data 的行相同。"""
+        for start in range(0, self.size, self.chunk_steps):
+            yield from self.rows(start, min(start + self.chunk_steps, self.size))
+
+    def append(self, time_step, positions, width=None):
+        """
+        记录一个时间步所有船的位置。
+        :param positions: (num_ships, 3)
+        :param width: 该步的行宽（船数），不足的部分输出为 None；默认为至今的最大船数
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        width = max(len(positions), self.max_ships if width is None else width)
+        if width > self.max_ships:
+            self.max_ships = width
+            if width > self._capacity:
+                self._widen(width)
+        chunk, row = divmod(self.size, self.chunk_steps)
+        if chunk == len(self._chunks):
+            self._chunks.append(np.full((self.chunk_steps, self._capacity, 3), np.nan))
+            self._steps.append(np.zeros(self.chunk_steps, dtype=np.int64))
+            self._widths.append(np.zeros(self.chunk_steps, dtype=np.int32))
+        self._chunks[chunk][row, :len(positions)] = positions
+        self._steps[chunk][row] = time_step
+        self._widths[chunk][row] = self.max_ships
+
+        if self._first_step is None:
+            self._first_step = time_step
+        elif self._step_index is None and time_step != self._first_step + self.size:
+            # 时间步不连续（例如流式输出清空后从中间开始），改用字典索引
+            self._step_index = {int(t): i for i, t in enumerate(self.time_steps())}
+        if self._step_index is not None:
+            self._step_index[int(time_step)] = self.size
+        self.size += 1
+
+    def _widen(self, num_ships):
+        capacity = max(num_ships, 2 * self._capacity)
+        for i, chunk in enumerate(self._chunks):
+            wider = np.full((self.chunk_steps, capacity, 3), np.nan)
+            wider[:, :self._capacity] = chunk
+            self._chunks[i] = wider
+        self._capacity = capacity
+
+    def index_of(self, time_step):
+        """时间步 -> 记录下标。"""
+        if self._step_index is not None:
+            return self._step_index[int(time_step)]
+        index = int(time_step) - self._first_step if self._first_step is not None else -1
+        if not 0 <= index < self.size:
+            raise KeyError(time_step)
+        return index
+
+    def positions(self, time_step):
+        """某个时间步所有船的位置 (max_ships, 3)，该步不存在的船为 NaN。"""
+        chunk, row = divmod(self.index_of(time_step), self.chunk_steps)
+        return self._chunks[chunk][row, :self.max_ships].copy()
+
+    def time_steps(self):
+        return self._concat(self._steps)
+
+    def positions_array(self, start=0, stop=None):
+        """下标 [start, stop) 的位置 (K, max_ships, 3)。"""
+        stop = self.size if stop is None else stop
+        return self._concat(self._chunks, start, stop)[:, :self.max_ships]
+
+    def _concat(self, chunks, start=0, stop=None):
+        stop = self.size if stop is None else stop
+        parts = []
+        for i in range(start // self.chunk_steps, (stop - 1) // self.chunk_steps + 1 if stop > start else 0):
+            lo = max(start - i * self.chunk_steps, 0)
+            hi = min(stop - i * self.chunk_steps, self.chunk_steps)
+            parts.append(chunks[i][lo:hi])
+        if not parts:
+            return chunks[0][:0] if chunks else np.empty((0,))
+        return np.concatenate(parts)
+
+    def rows(self, start=0, stop=None):
+        """下标 [start, stop) 的行列表，每行按当时的最大船数补 None。"""
+        stop = self.size if stop is None else stop
+        if stop <= start:
+            return []
+        steps = self._concat(self._steps, start, stop)
+        widths = self._concat(self._widths, start, stop)
+        flat = self._concat(self._chunks, start, stop).reshape(stop - start, -1).tolist()
+        rows = []
+        for t, width, values in zip(steps.tolist(), widths.tolist(), flat):
+            values = values[:3 * width]
+            rows.append([t] + [None if v != v else v for v in values])  # NaN -> None
+        return rows
+
+    def to_arrays(self, max_ships=None):
+        """
+        measurement_io.ship_rows_to_arrays 格式（ship_time_step / ship_positions / ship_valid）。
+        :param max_ships: 船数维的宽度，默认为记录到的最大船数
+        """
+        max_ships = self.max_ships if max_ships is None else max(max_ships, self.max_ships)
+        positions = np.full((self.size, max_ships, 3), np.nan)
+        if self.size:
+            positions[:, :self.max_ships] = self.positions_array()
+        return {
+            "ship_time_step": (self.time_steps() if self.size else np.empty(0)).astype(np.int32),
+            "ship_positions": positions,
+            "ship_valid": ~np.isnan(positions[..., 0]),
+        }
+
+    @property
+    def nbytes(self):
+        return sum(c.nbytes for c in self._chunks)
+
+
+class CompressedTruth:
+    """
+    由初始状态和反弹事件表示的船舶轨迹。用 from_carrier() 在运行开始时创建，
+    之后每次 Carrier.move() 后调用 record_move(bounced)。
+    """
+
+    def __init__(self, start_step, initial_positions, initial_directions, events=None, num_moves=0):
+        """
+        :param start_step: 第一次移动所在的时间步（该步记录的是第 1 次移动后的位置）
+        :param initial_positions: (num_ships, 3) 第一次移动前的位置
+        :param initial_directions: (num_ships, 3) 第一次移动前的方向向量（每步位移）
+        :param events: 反弹事件键数组，见 _KEY_SHIFT
+        :param num_moves: 已记录的移动次数
+        """
+        self.start_step = int(start_step)
+        self.initial_positions = np.array(initial_positions, dtype=np.float64)
+        self.initial_directions = np.array(initial_directions, dtype=np.float64)
+        self.num_ships = len(self.initial_positions)
+        self.num_moves = int(num_moves)
+        self._events = [np.asarray(events, dtype=np.int64)] if events is not None else []
+        self._index = None
+
+    @classmethod
+    def from_carrier(cls, carrier, start_step=0):
+        return cls(start_step, carrier.positions, carrier.directions)
+
+    def record_move(self, bounced):
+        """
+        记录一次移动。
+        :param bounced: Carrier.move() 返回的 (num_ships, 2) 反弹掩码
+        """
+        ships, axes = np.nonzero(bounced)
+        if len(ships):
+            pairs = ships.astype(np.int64) * 2 + axes
+            self._events.append((pairs << _KEY_SHIFT) | self.num_moves)
+            self._index = None
+        self.num_moves += 1
+
+    def events(self):
+        """所有反弹事件，按 (船-轴, 移动序号) 排序的键数组。"""
+        self._build_index()
+        return self._index[0]
+
+    def _build_index(self):
+        """
+        排序事件并预计算每个事件处的累计有符号移动数：
+        同一船-轴的第 r 个事件（从 0 计）发生在第 b 次移动，之后的移动符号为 (-1)^(r+1)，
+        cum = Σ_{j<=b} s_j = 上一事件的 cum + (-1)^r * (b - 上一事件的 b)。
+        """
+        if self._index is not None:
+            return
+        keys = np.sort(np.concatenate(self._events)) if self._events else np.empty(0, dtype=np.int64)
+        self._events = [keys]
+        pairs = keys >> _KEY_SHIFT
+        moves = keys & ((1 << _KEY_SHIFT) - 1)
+        idx = np.arange(len(keys))
+        first = np.r_[True, pairs[1:] != pairs[:-1]] if len(keys) else np.empty(0, dtype=bool)
+        group_start = np.maximum.accumulate(np.where(first, idx, 0)) if len(keys) else idx
+        rank = idx - group_start
+        prev_moves = np.where(first, -1, np.r_[-1, moves[:-1]])
+        seg = np.where(rank % 2 == 0, 1, -1) * (moves - prev_moves)
+        seg_cum = np.cumsum(seg)
+        cum = seg_cum - np.where(group_start > 0, seg_cum[np.maximum(group_start - 1, 0)], 0)
+        self._index = (keys, moves, cum, rank)
+
+    def positions(self, time_steps):
+        """
+        重建位置。
+        :param time_steps: 标量或 (K,) 时间步（start_step <= t < start_step + num_moves）
+        :return: (num_ships, 3) 或 (K, num_ships, 3)
+        """
+        scalar = np.ndim(time_steps) == 0
+        steps = np.atleast_1d(np.asarray(time_steps, dtype=np.int64))
+        n = steps - self.start_step + 1  # 该时间步记录的是第 n 次移动后的位置
+        if np.any(n < 1) or np.any(n > self.num_moves):
+            raise IndexError("时间步超出已记录的范围")
+        self._build_index()
+        keys, moves, cum, rank = self._index
+
+        # Σ_{j<n} s_j：对每个 (时间步, 船-轴) 找最后一个 b <= n-2 的事件（影响第 n-1 次及之前移动的反弹）
+        pairs = np.arange(self.num_ships * 2, dtype=np.int64)
+        signed = np.broadcast_to(n[:, None], (len(n), len(pairs))).copy()
+        if len(keys):
+            query = (pairs[None, :] << _KEY_SHIFT) + (n[:, None] - 2)
+            k = np.searchsorted(keys, query, side="right") - 1
+            kc = np.maximum(k, 0)
+            has = (k >= 0) & ((keys[kc] >> _KEY_SHIFT) == pairs[None, :])
+            after = np.where(rank[kc] % 2 == 0, -1, 1) * (n[:, None] - 1 - moves[kc])
+            signed = np.where(has, cum[kc] + after, signed)
+
+        result = np.repeat(self.initial_positions[None], len(steps), axis=0)
+        result[..., :2] += self.initial_directions[None, :, :2] * signed.reshape(len(steps), self.num_ships, 2)
+        return result[0] if scalar else result
+
+    def to_arrays(self):
+        """重建全部时间步，格式同 TruthRecorder.to_arrays。"""
+        steps = np.arange(self.start_step, self.start_step + self.num_moves)
+        positions = self.positions(steps) if len(steps) else np.empty((0, self.num_ships, 3))
+        return {
+            "ship_time_step": steps.astype(np.int32),
+            "ship_positions": positions,
+            "ship_valid": np.ones(positions.shape[:2], dtype=bool),
+        }
+
+    @property
+    def num_events(self):
+        return len(self.events())
+
+    def save(self, filename):
+        np.savez(filename, start_step=self.start_step, num_moves=self.num_moves,
+                 initial_positions=self.initial_positions, initial_directions=self.initial_directions,
+                 events=self.events())
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as data:
+            return cls(int(data["start_step"]), data["initial_positions"], data["initial_directions"],
+                       data["events"], int(data["num_moves"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把压缩的船舶真实轨迹还原为 ship_loc.csv 格式")
+    parser.add_argument("truth", help="simulation_core.py --truth compressed 保存的 .npz 文件")
+    parser.add_argument("--csv", default="ship_loc.csv", help="输出 CSV 文件")
+    parser.add_argument("--start", type=int, default=None, help="起始时间步")
+    parser.add_argument("--stop", type=int, default=None, help="结束时间步（不含）")
+    args = parser.parse_args()
+
+    truth = CompressedTruth.load(args.truth)
+    start = truth.start_step if args.start is None else args.start
+    stop = truth.start_step + truth.num_moves if args.stop is None else args.stop
+    steps = np.arange(start, stop)
+    positions = truth.positions(steps).reshape(len(steps), -1)
+    with open(args.csv, mode='w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(measurement_io.ship_csv_headers(truth.num_ships))
+        writer.writerows([t] + row for t, row in zip(steps.tolist(), positions.tolist()))
+    print(f"{len(steps)} steps ({truth.num_events} bounce events) written to {args.csv}.")
+
+
+if __name__ == "__main__":
+    main()